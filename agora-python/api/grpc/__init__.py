@@ -5,6 +5,8 @@ gRPC API Package
 
 Доступные серверы:
     - transcription_server: gRPC сервер для транскрипции аудио
+    - job_server: API асинхронных задач транскрипции (submit/poll/fetch)
+    - model_router: Маршрутизация запросов между моделями реестра
 
 Документация: См. главный README.md в корне проекта
 """
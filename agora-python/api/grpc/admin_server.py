@@ -0,0 +1,154 @@
+"""
+Admin API: чтение и изменение настроек производительности без перезапуска.
+
+Сервис agora.v1.TranscriptionAdminService регистрируется как generic handler
+на отдельном gRPC сервере, слушающем только 127.0.0.1:ADMIN_PORT:
+
+    GetSettings(JSON {})                                  -> JSON {"settings", "overrides", "metrics"}
+    UpdateSettings(JSON {"settings": {имя: значение}})    -> JSON {"before", "after", "throughput_before"}
+
+Изменяемые настройки - services.transcription.runtime_settings.RUNTIME_SETTINGS
+(значение null возвращает значение из окружения). Изменение применяется
+атомарно; запросы, уже начавшие обработку, дорабатывают со старыми значениями.
+
+Каждое изменение логируется с пропускной способностью до него (с прошлого
+изменения или старта) и после (через ADMIN_METRICS_WINDOW секунд).
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+from resources.config import config
+from services.transcription.metrics import metrics
+from services.transcription.runtime_settings import apply_updates, current_overrides, current_settings
+
+
+ADMIN_SERVICE_NAME = 'agora.v1.TranscriptionAdminService'
+
+# Счетчики, по которым считается пропускная способность (в секунду)
+THROUGHPUT_COUNTERS = (
+    'audio_seconds_processed_total',
+    'chunks_processed_total',
+    'decode_tokens_total',
+    'requests_rejected_total',
+)
+
+
+def _json_deserializer(data):
+    """
+    JSON запрос; некорректный JSON - исключение разбора (отклоняется обработчиком
+    с INVALID_ARGUMENT). Не None: его gRPC считает ошибкой десериализации и отвечает INTERNAL
+    """
+    try:
+        return json.loads(data.decode('utf-8')) if data else {}
+    except ValueError as e:
+        return e
+
+
+def _json_serializer(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _throughput_snapshot():
+    return time.time(), {name: metrics.get(name, 0) for name in THROUGHPUT_COUNTERS}
+
+
+def _throughput_between(start, end):
+    """Скорость роста счетчиков между двумя снимками {счетчик/s: значение}"""
+    (start_time, start_counters), (end_time, end_counters) = start, end
+    elapsed = max(end_time - start_time, 1e-9)
+    rates = {f"{name}/s": round((end_counters[name] - start_counters[name]) / elapsed, 3)
+             for name in THROUGHPUT_COUNTERS}
+    rates['window_s'] = round(elapsed, 1)
+    return rates
+
+
+def _format_rates(rates):
+    return ", ".join(f"{name}={value}" for name, value in rates.items())
+
+
+class TranscriptionAdminServicer:
+    """Обработчики admin API"""
+
+    def __init__(self, metrics_window=60.0):
+        self.metrics_window = metrics_window
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        # Изменения применяются по одному: окно "до" начинается с прошлого изменения
+        self._lock = threading.Lock()
+        self._window_start = _throughput_snapshot()
+
+    def GetSettings(self, request, context):
+        return {
+            'settings': current_settings(),
+            'overrides': current_overrides(),
+            'metrics': metrics.snapshot(),
+        }
+
+    def UpdateSettings(self, request, context):
+        if isinstance(request, ValueError):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Некорректный JSON: {request}")
+
+        updates = request.get('settings') if isinstance(request, dict) else None
+        if not isinstance(updates, dict) or not updates:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Ожидается {\"settings\": {имя: значение, ...}}")
+
+        with self._lock:
+            try:
+                before, after = apply_updates(updates)
+            except ValueError as e:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+            changed_at = _throughput_snapshot()
+            throughput_before = _throughput_between(self._window_start, changed_at)
+            self._window_start = changed_at
+
+        changes = ", ".join(f"{name}: {before[name]} → {after[name]}" for name in after if before[name] != after[name])
+        self.logger.info(f"🛠️  Настройки изменены: {changes or 'без изменений'}")
+        self.logger.info(f"📈 Пропускная способность до изменения: {_format_rates(throughput_before)}")
+        metrics.inc('runtime_settings_changes_total')
+
+        timer = threading.Timer(self.metrics_window, self._log_after, args=(changes, changed_at))
+        timer.daemon = True
+        timer.start()
+
+        return {'before': before, 'after': after, 'throughput_before': throughput_before}
+
+    def _log_after(self, changes, changed_at):
+        rates = _throughput_between(changed_at, _throughput_snapshot())
+        self.logger.info(f"📈 Пропускная способность после изменения ({changes or 'без изменений'}): "
+                         f"{_format_rates(rates)}")
+
+
+def add_admin_service_to_server(server, metrics_window=60.0):
+    """Регистрирует TranscriptionAdminService на gRPC сервере"""
+    servicer = TranscriptionAdminServicer(metrics_window)
+
+    handlers = {
+        'GetSettings': grpc.unary_unary_rpc_method_handler(
+            servicer.GetSettings,
+            request_deserializer=_json_deserializer,
+            response_serializer=_json_serializer,
+        ),
+        'UpdateSettings': grpc.unary_unary_rpc_method_handler(
+            servicer.UpdateSettings,
+            request_deserializer=_json_deserializer,
+            response_serializer=_json_serializer,
+        ),
+    }
+
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(ADMIN_SERVICE_NAME, handlers),))
+
+
+def start_admin_server(port):
+    """Запускает admin API на 127.0.0.1:port (отдельный сервер, недоступный снаружи)"""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    add_admin_service_to_server(server, config.ADMIN_METRICS_WINDOW)
+    server.add_insecure_port(f'127.0.0.1:{port}')
+    server.start()
+    return server
@@ -0,0 +1,153 @@
+"""
+gRPC API для асинхронных задач транскрипции.
+
+Сервис agora.v1.TranscriptionJobService регистрируется как generic handler
+рядом с TranscriptionService на том же сервере:
+
+    SubmitJob(AudioRequest)          -> JSON {"job_id", "status"}
+    GetJob(JSON {"job_id"})          -> JSON {"job_id", "status", "chunks_done", "chunk_count", ...}
+    GetJobResult(JSON {"job_id"})    -> TranscriptionResponse
+
+SubmitJob и GetJobResult переиспользуют сообщения transcription.proto,
+короткие служебные сообщения передаются как JSON (UTF-8). SubmitJob
+проверяет запрос без загрузки модели: имя модели (metadata 'model'),
+сырой PCM - как TranscribeAudio (формат, размер, metadata 'sample-rate'),
+контейнерные форматы - на пустые данные. Остальные проверки контейнера
+выполняет сервис модели при запуске задачи.
+"""
+
+import json
+
+import grpc
+
+from generated.v1 import transcription_pb2
+from services.transcription.job_store import JOB_DONE, JOB_FAILED
+from services.transcription.raw_audio import is_raw_pcm_format, sample_rate_from_metadata, validate_raw_pcm
+
+
+JOB_SERVICE_NAME = 'agora.v1.TranscriptionJobService'
+
+
+def _json_deserializer(data):
+    """
+    JSON запрос; некорректный JSON - исключение разбора (отклоняется обработчиком
+    с INVALID_ARGUMENT). Не None: его gRPC считает ошибкой десериализации и отвечает INTERNAL
+    """
+    try:
+        return json.loads(data.decode('utf-8')) if data else {}
+    except ValueError as e:
+        return e
+
+
+def _json_serializer(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+class TranscriptionJobServicer:
+    """Обработчики gRPC методов поверх TranscriptionJobManager"""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def SubmitJob(self, request, context):
+        metadata = context.invocation_metadata()
+        model = next((value for key, value in metadata or () if key == 'model'), None)
+
+        # Без registry.acquire: проверка не загружает модель и не вытесняет другие
+        sample_rate = 0
+        if is_raw_pcm_format(request.format):
+            sample_rate = sample_rate_from_metadata(metadata)
+            is_valid, error_msg = validate_raw_pcm(request.audio_data, request.format, sample_rate)
+        else:
+            is_valid, error_msg = bool(request.audio_data), "Аудио данные пусты"
+
+        if not is_valid:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, error_msg)
+
+        try:
+            job_id = self.manager.submit(request.audio_data, request.filename, request.format, sample_rate, model)
+        except KeyError:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Неизвестная модель: {model}")
+        return {'job_id': job_id, 'status': 'QUEUED'}
+
+    def _get_job_or_abort(self, request, context):
+        if not isinstance(request, dict) or not isinstance(request.get('job_id'), str):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Ожидается JSON {\"job_id\": \"...\"}")
+
+        job = self.manager.get_job(request['job_id'])
+        if job is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Задача не найдена: {request['job_id']}")
+        return job
+
+    def GetJob(self, request, context):
+        job = self._get_job_or_abort(request, context)
+        return {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'filename': job['filename'],
+            'chunks_done': job['chunks_done'],
+            'chunk_count': job['chunk_count'],
+            'audio_duration': job['audio_duration'],
+            'error_message': job['error_message'] or "",
+        }
+
+    def GetJobResult(self, request, context):
+        job = self._get_job_or_abort(request, context)
+
+        if job['status'] == JOB_FAILED:
+            return transcription_pb2.TranscriptionResponse(
+                transcript="",
+                success=False,
+                error_message=job['error_message'] or "",
+                processing_time=job['updated_at'] - job['created_at'],
+                audio_duration=job['audio_duration'] or 0.0,
+                stats=transcription_pb2.TranscriptionStats(word_count=0, char_count=0, speed_factor=0.0)
+            )
+
+        if job['status'] != JOB_DONE:
+            context.abort(
+                grpc.StatusCode.FAILED_PRECONDITION,
+                f"Задача {job['job_id']} еще не завершена ({job['chunks_done']}/{job['chunk_count'] or '?'} чанков)"
+            )
+
+        transcript = job['transcript'] or ""
+        processing_time = job['updated_at'] - job['created_at']
+        audio_duration = job['audio_duration'] or 0.0
+
+        return transcription_pb2.TranscriptionResponse(
+            transcript=transcript,
+            success=True,
+            error_message="",
+            processing_time=processing_time,
+            audio_duration=audio_duration,
+            stats=transcription_pb2.TranscriptionStats(
+                word_count=len(transcript.split()),
+                char_count=len(transcript),
+                speed_factor=audio_duration / processing_time if processing_time > 0 else 0.0
+            )
+        )
+
+
+def add_job_service_to_server(manager, server):
+    """Регистрирует TranscriptionJobService на gRPC сервере"""
+    servicer = TranscriptionJobServicer(manager)
+
+    handlers = {
+        'SubmitJob': grpc.unary_unary_rpc_method_handler(
+            servicer.SubmitJob,
+            request_deserializer=transcription_pb2.AudioRequest.FromString,
+            response_serializer=_json_serializer,
+        ),
+        'GetJob': grpc.unary_unary_rpc_method_handler(
+            servicer.GetJob,
+            request_deserializer=_json_deserializer,
+            response_serializer=_json_serializer,
+        ),
+        'GetJobResult': grpc.unary_unary_rpc_method_handler(
+            servicer.GetJobResult,
+            request_deserializer=_json_deserializer,
+            response_serializer=transcription_pb2.TranscriptionResponse.SerializeToString,
+        ),
+    }
+
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(JOB_SERVICE_NAME, handlers),))
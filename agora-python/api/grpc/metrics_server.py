@@ -0,0 +1,46 @@
+"""
+gRPC API для чтения in-process метрик сервиса.
+
+Сервис agora.v1.TranscriptionMetricsService регистрируется как generic handler
+рядом с TranscriptionService на том же сервере (только чтение):
+
+    GetMetrics(JSON {})    -> JSON {"counters": {...}, "gauges": {...}}
+
+Среди gauge - effective_batch_size:<модель> (текущий адаптивный размер
+батча модели реестра), среди счетчиков - oom_events_total.
+"""
+
+import json
+
+import grpc
+
+from services.transcription.metrics import metrics
+
+
+METRICS_SERVICE_NAME = 'agora.v1.TranscriptionMetricsService'
+
+
+def _json_deserializer(data):
+    return json.loads(data.decode('utf-8')) if data else {}
+
+
+def _json_serializer(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def get_metrics(request, context):
+    """Снимок всех счетчиков и gauge значений процесса"""
+    return metrics.snapshot()
+
+
+def add_metrics_service_to_server(server):
+    """Регистрирует TranscriptionMetricsService на gRPC сервере"""
+    handlers = {
+        'GetMetrics': grpc.unary_unary_rpc_method_handler(
+            get_metrics,
+            request_deserializer=_json_deserializer,
+            response_serializer=_json_serializer,
+        ),
+    }
+
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(METRICS_SERVICE_NAME, handlers),))
@@ -0,0 +1,69 @@
+"""
+Маршрутизация запросов TranscriptionService между моделями реестра.
+
+Модель выбирается по gRPC metadata 'model' (без нее - модель по умолчанию).
+Реализация загружается при первом запросе и не вытесняется, пока
+обрабатывает запрос.
+
+При SERVER_MAX_CONCURRENT_REQUESTS > 0 запросы сверх лимита сразу
+получают RESOURCE_EXHAUSTED (клиент повторяет их с задержкой). Лимит
+читается на каждый запрос и может меняться через admin API.
+"""
+
+import threading
+
+import grpc
+
+from generated.v1 import transcription_pb2_grpc
+from resources.config import config
+from services.transcription.metrics import metrics
+
+
+MODEL_METADATA_KEY = 'model'
+
+
+class RoutingTranscriptionServicer(transcription_pb2_grpc.TranscriptionServiceServicer):
+    """Делегирует методы TranscriptionService реализации, выбранной из ModelRegistry"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def _model_name(self, context):
+        for key, value in context.invocation_metadata() or ():
+            if key == MODEL_METADATA_KEY:
+                return value
+        return None
+
+    def _call(self, method, request, context):
+        name = self._model_name(context)
+        if name is not None and name not in self.registry.names:
+            context.abort(grpc.StatusCode.NOT_FOUND,
+                          f"Неизвестная модель: {name} (доступно: {', '.join(self.registry.names)})")
+
+        limit = config.MAX_CONCURRENT_REQUESTS
+        with self._in_flight_lock:
+            admitted = not limit or self._in_flight < limit
+            if admitted:
+                self._in_flight += 1
+                metrics.set_gauge('requests_in_flight', self._in_flight)
+
+        if not admitted:
+            metrics.inc('requests_rejected_total')
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                          f"Превышен лимит одновременных запросов ({limit})")
+
+        try:
+            with self.registry.acquire(name) as service:
+                return getattr(service, method)(request, context)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+                metrics.set_gauge('requests_in_flight', self._in_flight)
+
+    def TranscribeAudio(self, request, context):
+        return self._call('TranscribeAudio', request, context)
+
+    def TranscribeAudioStream(self, request_iterator, context):
+        return self._call('TranscribeAudioStream', request_iterator, context)
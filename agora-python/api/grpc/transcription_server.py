@@ -7,6 +7,7 @@ gRPC API Server для TranscriptionService.
 
 import sys
 import grpc
+import functools
 from concurrent import futures
 import time
 import logging
@@ -16,13 +17,22 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from generated.v1 import transcription_pb2_grpc
+from api.grpc.admin_server import start_admin_server
+from api.grpc.job_server import add_job_service_to_server
+from api.grpc.metrics_server import add_metrics_service_to_server
+from api.grpc.model_router import RoutingTranscriptionServicer
 from services.transcription.implementations.borealis_service import BorealisTranscriptionService
+from services.transcription.implementations.stub_service import StubTranscriptionService
+from services.transcription.job_manager import TranscriptionJobManager
+from services.transcription.job_store import JobStore
+from services.transcription.model_registry import ModelRegistry, parse_models_spec
 from resources.config import TranscriptionServiceConfig, config
 
 
 # Доступные реализации сервиса
 AVAILABLE_IMPLEMENTATIONS = {
     'borealis': BorealisTranscriptionService,
+    'stub': StubTranscriptionService,  # Без модели, для нагрузочных тестов
     # Здесь можно добавить другие реализации:
     # 'whisper': WhisperTranscriptionService,
     # 'google-speech': GoogleSpeechTranscriptionService,
@@ -55,9 +65,27 @@ def serve(port=None, implementation='borealis'):
         logger.info(f"Доступные реализации: {', '.join(AVAILABLE_IMPLEMENTATIONS.keys())}")
         return
 
-    service_class = AVAILABLE_IMPLEMENTATIONS[implementation]
-    service_impl = service_class()
-    logger.info(f"Используется реализация: {implementation}")
+    # Реестр моделей: без MODELS - одна модель с именем реализации
+    models = parse_models_spec(config.MODELS) or {implementation: (implementation, None)}
+    for name, (model_impl, _) in models.items():
+        if model_impl not in AVAILABLE_IMPLEMENTATIONS:
+            logger.error(f"Неизвестная реализация модели '{name}': {model_impl}")
+            return
+
+    factories = {
+        name: functools.partial(AVAILABLE_IMPLEMENTATIONS[model_impl], model_name=model_name, metrics_name=name)
+        for name, (model_impl, model_name) in models.items()
+    }
+    default_model = config.DEFAULT_MODEL or next(iter(models))
+    registry = ModelRegistry(factories, default_model, config.MODELS_MEMORY_BUDGET_MB * 1024 * 1024,
+                             config.MODELS_ESTIMATED_MB * 1024 * 1024)
+    service_impl = RoutingTranscriptionServicer(registry)
+
+    logger.info(f"Модели: {', '.join(models)} (по умолчанию: {default_model})")
+    # По умолчанию модель по умолчанию загружается при старте, а не первым запросом
+    if config.MODELS_PRELOAD.strip().lower() != 'none':
+        preload = [name.strip() for name in config.MODELS_PRELOAD.split(',') if name.strip()]
+        registry.preload(preload or [default_model])
 
     # Создание gRPC сервера с настройками из конфигурации
     server = grpc.server(
@@ -69,18 +97,46 @@ def serve(port=None, implementation='borealis'):
     )
     transcription_pb2_grpc.add_TranscriptionServiceServicer_to_server(service_impl, server)
 
+    # Метрики процесса (effective_batch_size:<модель>, oom_events_total, ...) только на чтение
+    add_metrics_service_to_server(server)
+
+    # Асинхронные задачи (submit/poll/fetch) с возобновлением после перезапуска
+    job_manager = None
+    if config.JOBS_ENABLED:
+        job_manager = TranscriptionJobManager(registry, JobStore(config.JOBS_DB_PATH, config.JOBS_STORAGE_DIR))
+        add_job_service_to_server(job_manager, server)
+        job_manager.start()
+
     # Привязка к порту
     server.add_insecure_port(f'[::]:{port}')
 
+    # Unix domain socket: локальные клиенты без TCP стека
+    if config.UNIX_SOCKET_PATH:
+        Path(config.UNIX_SOCKET_PATH).parent.mkdir(parents=True, exist_ok=True)
+        server.add_insecure_port(f'unix:{config.UNIX_SOCKET_PATH}')
+
     # Запуск сервера
     server.start()
 
+    # Admin API: изменение настроек производительности без перезапуска (только localhost)
+    admin_server = start_admin_server(config.ADMIN_PORT) if config.ADMIN_PORT else None
+
     logger.info("=" * 80)
     logger.info(f"🚀 TranscriptionService gRPC API ({implementation}) запущен на порту {port}")
     logger.info("=" * 80)
     logger.info(f"📡 Доступные методы:")
     logger.info(f"   - TranscribeAudio (унарный)")
     logger.info(f"   - TranscribeAudioStream (стриминговый)")
+    logger.info(f"   - TranscriptionMetricsService: GetMetrics (effective_batch_size:<модель>, oom_events_total, ...)")
+    logger.info(f"   Модель выбирается metadata 'model': {', '.join(models)}")
+    if config.UNIX_SOCKET_PATH:
+        logger.info(f"   Unix socket: unix:{config.UNIX_SOCKET_PATH}")
+    if admin_server is not None:
+        logger.info(f"   - TranscriptionAdminService: GetSettings / UpdateSettings на 127.0.0.1:{config.ADMIN_PORT}")
+    if config.LOCAL_AUDIO_ALLOWED_DIRS:
+        logger.info(f"   Аудио по ссылке (audio-path / shm-name) из: {config.LOCAL_AUDIO_ALLOWED_DIRS}")
+    if job_manager is not None:
+        logger.info(f"   - TranscriptionJobService: SubmitJob / GetJob / GetJobResult (асинхронные задачи)")
     logger.info("=" * 80)
     logger.info("💡 Нажмите Ctrl+C для остановки сервера")
     logger.info("=" * 80)
@@ -92,6 +148,10 @@ def serve(port=None, implementation='borealis'):
     except KeyboardInterrupt:
         logger.info("\n⏹️  Остановка сервера...")
         server.stop(0)
+        if admin_server is not None:
+            admin_server.stop(0)
+        if job_manager is not None:
+            job_manager.stop()
         logger.info("✅ Сервер остановлен")
 
 
@@ -0,0 +1,13 @@
+"""
+Client Package
+
+Python клиент для TranscriptionService.
+
+Доступные клиенты:
+    - TranscriptionClient: синхронный клиент с пулом каналов
+    - AsyncTranscriptionClient: asyncio клиент (grpc.aio)
+"""
+
+from client.transcription_client import TranscriptionClient, AsyncTranscriptionClient
+
+__all__ = ['TranscriptionClient', 'AsyncTranscriptionClient']
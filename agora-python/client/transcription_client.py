@@ -0,0 +1,346 @@
+"""
+Клиент TranscriptionService.
+
+Возможности:
+    - пул gRPC каналов (round-robin) вместо одного соединения
+    - большие файлы отправляются через TranscribeAudioStream чанками,
+      файл читается с диска по частям, а не целиком
+    - параллельная обработка многих файлов с ограничением конкурентности
+    - повторы при RESOURCE_EXHAUSTED / UNAVAILABLE с экспоненциальной задержкой
+    - синхронный (TranscriptionClient) и asyncio (AsyncTranscriptionClient) API
+    - method='local': на том же хосте передается только путь к файлу
+      (metadata audio-path), сервер читает файл сам; подключение через
+      Unix socket - target 'unix:/run/agora/transcription.sock'
+
+Использование:
+    from client import TranscriptionClient
+
+    with TranscriptionClient('localhost:50051') as client:
+        response = client.transcribe('audio.mp3')
+        responses = client.transcribe_many(['a.mp3', 'b.wav'])
+
+    python -m client.transcription_client audio.mp3 --server localhost:50051
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent import futures
+from pathlib import Path
+
+import grpc
+
+# Добавляем корневую директорию в путь для импортов
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from generated.v1 import transcription_pb2
+from generated.v1 import transcription_pb2_grpc
+
+
+# Коды, при которых запрос повторяется
+RETRYABLE_CODES = (grpc.StatusCode.RESOURCE_EXHAUSTED, grpc.StatusCode.UNAVAILABLE)
+
+# Размер чанка стрима: достаточно крупный, чтобы накладные расходы gRPC были малы,
+# и достаточно мелкий, чтобы не держать большие буферы
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Файлы больше этого размера отправляются через стрим
+DEFAULT_STREAM_THRESHOLD = 4 * 1024 * 1024
+
+DEFAULT_MAX_MESSAGE_LENGTH = 200 * 1024 * 1024
+
+
+def _channel_options(max_message_length):
+    # Локальный пул подканалов: иначе каналы пула с одинаковыми опциями делят
+    # одно TCP соединение из глобального пула gRPC
+    return [
+        ('grpc.max_send_message_length', max_message_length),
+        ('grpc.max_receive_message_length', max_message_length),
+        ('grpc.use_local_subchannel_pool', 1),
+    ]
+
+
+def _audio_format(path: Path, audio_format=None):
+    return audio_format or path.suffix.lstrip('.').lower()
+
+
+def _iter_file_chunks(path: Path, chunk_size, audio_format, sample_rate):
+    """Генератор AudioChunk: файл читается с диска по частям"""
+    with open(path, 'rb') as f:
+        first = True
+        while True:
+            data = f.read(chunk_size)
+            if not data and not first:
+                break
+
+            if first:
+                yield transcription_pb2.AudioChunk(
+                    chunk_data=data, filename=path.name, format=audio_format, sample_rate=sample_rate
+                )
+                first = False
+            else:
+                yield transcription_pb2.AudioChunk(chunk_data=data)
+
+            if len(data) < chunk_size:
+                break
+
+
+def _local_request(path: Path, audio_format, sample_rate):
+    """AudioRequest без данных и metadata со ссылкой на файл (method='local')"""
+    request = transcription_pb2.AudioRequest(filename=path.name, format=audio_format)
+    metadata = (('audio-path', str(path.resolve())),)
+    if sample_rate:
+        metadata += (('sample-rate', str(sample_rate)),)
+    return request, metadata
+
+
+def _backoff_delay(attempt, initial_backoff, max_backoff):
+    """Экспоненциальная задержка с jitter"""
+    delay = min(max_backoff, initial_backoff * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class TranscriptionClient:
+    """
+    Синхронный клиент TranscriptionService.
+
+    Args:
+        target: Адрес сервера (host:port)
+        pool_size: Количество gRPC каналов в пуле
+        max_concurrency: Максимум одновременных запросов в transcribe_many
+        chunk_size: Размер чанка для TranscribeAudioStream (байт)
+        stream_threshold: Файлы больше этого размера отправляются стримом
+        max_retries: Количество повторов при RESOURCE_EXHAUSTED / UNAVAILABLE
+        initial_backoff: Начальная задержка повтора (сек)
+        max_backoff: Максимальная задержка повтора (сек)
+        timeout: Таймаут одного вызова (сек), None - без таймаута
+    """
+
+    def __init__(self, target='localhost:50051', pool_size=4, max_concurrency=8,
+                 chunk_size=DEFAULT_CHUNK_SIZE, stream_threshold=DEFAULT_STREAM_THRESHOLD,
+                 max_retries=5, initial_backoff=0.5, max_backoff=30.0, timeout=None,
+                 max_message_length=DEFAULT_MAX_MESSAGE_LENGTH):
+        self.target = target
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.stream_threshold = stream_threshold
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._channels = [
+            grpc.insecure_channel(target, options=_channel_options(max_message_length))
+            for _ in range(max(1, pool_size))
+        ]
+        self._stubs = [transcription_pb2_grpc.TranscriptionServiceStub(ch) for ch in self._channels]
+        self._stub_cycle = itertools.cycle(self._stubs)
+        self._stub_lock = threading.Lock()
+
+    def _next_stub(self):
+        with self._stub_lock:
+            return next(self._stub_cycle)
+
+    def _call_with_retry(self, call):
+        """Выполняет call(stub) с повторами на следующих каналах пула"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call(self._next_stub())
+            except grpc.RpcError as e:
+                if e.code() not in RETRYABLE_CODES or attempt == self.max_retries:
+                    raise
+                delay = _backoff_delay(attempt, self.initial_backoff, self.max_backoff)
+                self.logger.warning(f"{e.code().name}, повтор {attempt + 1}/{self.max_retries} через {delay:.1f}s")
+                time.sleep(delay)
+
+    def transcribe(self, path, audio_format=None, sample_rate=0, method=None):
+        """
+        Транскрибирует один файл.
+
+        Маленькие файлы отправляются унарным TranscribeAudio,
+        большие - через TranscribeAudioStream чанками.
+
+        Args:
+            method: 'unary', 'stream' или 'local' - принудительный выбор метода,
+                    None - по размеру файла (stream_threshold).
+                    'local' требует, чтобы файл был в LOCAL_AUDIO_ALLOWED_DIRS сервера
+
+        Returns:
+            TranscriptionResponse
+        """
+        path = Path(path)
+        audio_format = _audio_format(path, audio_format)
+
+        if method == 'local':
+            request, metadata = _local_request(path, audio_format, sample_rate)
+            return self._call_with_retry(lambda stub: stub.TranscribeAudio(
+                request, timeout=self.timeout, metadata=metadata
+            ))
+
+        if method == 'stream' or (method is None and path.stat().st_size > self.stream_threshold):
+            return self._call_with_retry(lambda stub: stub.TranscribeAudioStream(
+                _iter_file_chunks(path, self.chunk_size, audio_format, sample_rate), timeout=self.timeout
+            ))
+
+        request = transcription_pb2.AudioRequest(
+            audio_data=path.read_bytes(), filename=path.name, format=audio_format
+        )
+        metadata = (('sample-rate', str(sample_rate)),) if sample_rate else None
+        return self._call_with_retry(lambda stub: stub.TranscribeAudio(
+            request, timeout=self.timeout, metadata=metadata
+        ))
+
+    def transcribe_many(self, paths, audio_format=None, sample_rate=0):
+        """
+        Транскрибирует много файлов параллельно (не более max_concurrency одновременно).
+
+        Returns:
+            Словарь {путь: TranscriptionResponse или исключение} в порядке paths
+        """
+        results = {}
+        with futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            future_to_path = {
+                executor.submit(self.transcribe, path, audio_format, sample_rate): str(path)
+                for path in paths
+            }
+            for future in futures.as_completed(future_to_path):
+                path = future_to_path[future]
+                try:
+                    results[path] = future.result()
+                except Exception as e:
+                    results[path] = e
+
+        return {str(path): results[str(path)] for path in paths}
+
+    def close(self):
+        for channel in self._channels:
+            channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AsyncTranscriptionClient:
+    """
+    asyncio клиент TranscriptionService (grpc.aio).
+
+    Параметры такие же, как у TranscriptionClient.
+    """
+
+    def __init__(self, target='localhost:50051', pool_size=4, max_concurrency=8,
+                 chunk_size=DEFAULT_CHUNK_SIZE, stream_threshold=DEFAULT_STREAM_THRESHOLD,
+                 max_retries=5, initial_backoff=0.5, max_backoff=30.0, timeout=None,
+                 max_message_length=DEFAULT_MAX_MESSAGE_LENGTH):
+        self.target = target
+        self.chunk_size = chunk_size
+        self.stream_threshold = stream_threshold
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._channels = [
+            grpc.aio.insecure_channel(target, options=_channel_options(max_message_length))
+            for _ in range(max(1, pool_size))
+        ]
+        self._stubs = [transcription_pb2_grpc.TranscriptionServiceStub(ch) for ch in self._channels]
+        self._stub_cycle = itertools.cycle(self._stubs)
+
+    async def _call_with_retry(self, call):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call(next(self._stub_cycle))
+            except grpc.aio.AioRpcError as e:
+                if e.code() not in RETRYABLE_CODES or attempt == self.max_retries:
+                    raise
+                delay = _backoff_delay(attempt, self.initial_backoff, self.max_backoff)
+                self.logger.warning(f"{e.code().name}, повтор {attempt + 1}/{self.max_retries} через {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def transcribe(self, path, audio_format=None, sample_rate=0, method=None):
+        """Транскрибирует один файл (см. TranscriptionClient.transcribe)"""
+        path = Path(path)
+        audio_format = _audio_format(path, audio_format)
+
+        async with self._semaphore:
+            if method == 'local':
+                request, metadata = _local_request(path, audio_format, sample_rate)
+                return await self._call_with_retry(lambda stub: stub.TranscribeAudio(
+                    request, timeout=self.timeout, metadata=metadata
+                ))
+
+            if method == 'stream' or (method is None and path.stat().st_size > self.stream_threshold):
+                return await self._call_with_retry(lambda stub: stub.TranscribeAudioStream(
+                    _iter_file_chunks(path, self.chunk_size, audio_format, sample_rate), timeout=self.timeout
+                ))
+
+            request = transcription_pb2.AudioRequest(
+                audio_data=path.read_bytes(), filename=path.name, format=audio_format
+            )
+            metadata = (('sample-rate', str(sample_rate)),) if sample_rate else None
+            return await self._call_with_retry(lambda stub: stub.TranscribeAudio(
+                request, timeout=self.timeout, metadata=metadata
+            ))
+
+    async def transcribe_many(self, paths, audio_format=None, sample_rate=0):
+        """
+        Транскрибирует много файлов конкурентно (не более max_concurrency одновременно).
+
+        Returns:
+            Словарь {путь: TranscriptionResponse или исключение} в порядке paths
+        """
+        responses = await asyncio.gather(
+            *(self.transcribe(path, audio_format, sample_rate) for path in paths),
+            return_exceptions=True
+        )
+        return {str(path): response for path, response in zip(paths, responses)}
+
+    async def close(self):
+        for channel in self._channels:
+            await channel.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+def main():
+    """Консольный клиент: транскрипция одного или нескольких файлов"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TranscriptionService клиент')
+    parser.add_argument('files', nargs='+', help='Аудио файлы')
+    parser.add_argument('--server', default='localhost:50051', help='Адрес сервера (по умолчанию: localhost:50051)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Максимум одновременных запросов')
+    parser.add_argument('--pool-size', type=int, default=4, help='Количество gRPC каналов')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Размер чанка стрима (байт)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with TranscriptionClient(args.server, pool_size=args.pool_size, max_concurrency=args.concurrency,
+                             chunk_size=args.chunk_size) as client:
+        for path, response in client.transcribe_many(args.files).items():
+            if isinstance(response, Exception):
+                print(f"❌ {path}: {response}")
+            elif not response.success:
+                print(f"❌ {path}: {response.error_message}")
+            else:
+                print(f"✅ {path} ({response.audio_duration:.1f}s, {response.processing_time:.1f}s):")
+                print(response.transcript)
+
+
+if __name__ == '__main__':
+    main()
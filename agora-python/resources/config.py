@@ -2,15 +2,17 @@
 Конфигурация для TranscriptionService.
 
 Загружает настройки из:
-1. Переменные окружения (высший приоритет)
-2. .env файл в корне проекта (если существует)
-3. Значения по умолчанию
+1. Переопределения во время работы (admin API, см. set_overrides)
+2. Переменные окружения
+3. .env файл в корне проекта (если существует)
+4. Значения по умолчанию
 
 Это стандартный подход для Python проектов.
 Для использования .env файла установите: pip install python-dotenv
 """
 
 import os
+import threading
 from pathlib import Path
 
 
@@ -47,6 +49,39 @@ def load_env_file():
 load_env_file()
 
 
+# Переопределения во время работы: {ключ окружения: строковое значение}.
+# Словарь не изменяется, а заменяется целиком, поэтому читатели без блокировки
+# видят либо старый, либо новый набор значений.
+_overrides = {}
+_overrides_lock = threading.Lock()
+
+
+def set_overrides(values: dict) -> dict:
+    """
+    Атомарно применяет переопределения {ключ окружения: значение}.
+    Значение None снимает переопределение.
+
+    Returns:
+        Предыдущий набор переопределений
+    """
+    global _overrides
+    with _overrides_lock:
+        previous = _overrides
+        updated = dict(previous)
+        for key, value in values.items():
+            if value is None:
+                updated.pop(key, None)
+            else:
+                updated[key] = str(value)
+        _overrides = updated
+    return previous
+
+
+def get_overrides() -> dict:
+    """Текущие переопределения {ключ окружения: значение}"""
+    return dict(_overrides)
+
+
 def get_env(key: str, default=None, cast_type=str):
     """
     Получить значение из переменных окружения с приведением типа.
@@ -59,7 +94,9 @@ def get_env(key: str, default=None, cast_type=str):
     Returns:
         Значение с приведенным типом
     """
-    value = os.getenv(key)
+    value = _overrides.get(key)
+    if value is None:
+        value = os.getenv(key)
 
     if value is None:
         return default
@@ -107,6 +144,31 @@ class TranscriptionServiceConfig:
         """Максимальное количество worker потоков"""
         return get_env('SERVER_MAX_WORKERS', 10, int)
 
+    @property
+    def MAX_CONCURRENT_REQUESTS(self) -> int:
+        """Одновременных запросов транскрипции, остальные получают RESOURCE_EXHAUSTED (0 - без ограничения)"""
+        return get_env('SERVER_MAX_CONCURRENT_REQUESTS', 0, int)
+
+    @property
+    def ADMIN_PORT(self) -> int:
+        """Порт admin API на 127.0.0.1 (0 - отключен)"""
+        return get_env('ADMIN_PORT', 0, int)
+
+    @property
+    def ADMIN_METRICS_WINDOW(self) -> float:
+        """Через сколько секунд после изменения настроек логировать метрики "после" """
+        return get_env('ADMIN_METRICS_WINDOW', 60.0, float)
+
+    @property
+    def UNIX_SOCKET_PATH(self) -> str:
+        """Путь Unix domain socket для локальных клиентов (пусто - не слушать)"""
+        return get_env('SERVER_UNIX_SOCKET', '')
+
+    @property
+    def LOCAL_AUDIO_ALLOWED_DIRS(self) -> str:
+        """Директории через запятую, из которых разрешено читать аудио по ссылке (пусто - отключено)"""
+        return get_env('LOCAL_AUDIO_ALLOWED_DIRS', '')
+
     # ========================================
     # Настройки ML модели
     # ========================================
@@ -116,6 +178,11 @@ class TranscriptionServiceConfig:
         """Название модели"""
         return get_env('MODEL_NAME', 'Vikhrmodels/Borealis')
 
+    @property
+    def MODEL_REVISION(self) -> str:
+        """Ревизия модели (commit hash / тег), пусто - последняя"""
+        return get_env('MODEL_REVISION', '')
+
     @property
     def MODEL_LOCAL_FILES_ONLY(self) -> bool:
         """Использовать локальные файлы модели"""
@@ -126,6 +193,21 @@ class TranscriptionServiceConfig:
         """Устройство для обработки (cuda, cpu)"""
         return get_env('MODEL_DEVICE', 'cuda')
 
+    @property
+    def MODEL_PRECISION(self) -> str:
+        """Точность инференса (fp32, bf16, fp16). На CPU fp16 заменяется на bf16"""
+        return get_env('MODEL_PRECISION', 'fp32').lower()
+
+    @property
+    def PRECISION_REFERENCE_DIR(self) -> str:
+        """Эталонный набор (аудио + <имя>.txt транскрипции fp32) для проверки пониженной точности"""
+        return get_env('MODEL_PRECISION_REFERENCE_DIR', '')
+
+    @property
+    def PRECISION_MAX_WER(self) -> float:
+        """Допустимый средний WER относительно эталона fp32, при превышении - возврат к fp32"""
+        return get_env('MODEL_PRECISION_MAX_WER', 0.05, float)
+
     @property
     def BATCH_SIZE(self) -> int:
         """Batch size для обработки"""
@@ -136,6 +218,109 @@ class TranscriptionServiceConfig:
         """Целевая длительность чанка в секундах"""
         return get_env('MODEL_CHUNK_DURATION', 30, int)
 
+    @property
+    def SEGMENTATION_MODE(self) -> str:
+        """Режим нарезки: fixed - тихие точки, привязанные к содержимому, packed - упаковка в окна модели"""
+        return get_env('MODEL_SEGMENTATION_MODE', 'fixed').lower()
+
+    @property
+    def PREFETCH_BATCHES(self) -> int:
+        """Глубина очереди подготовленных батчей между CPU и GPU потоками"""
+        return get_env('MODEL_PREFETCH_BATCHES', 2, int)
+
+    @property
+    def CHUNK_CACHE_SIZE(self) -> int:
+        """Размер кэша транскрипций чанков (количество чанков), 0 - кэш отключен"""
+        return get_env('MODEL_CHUNK_CACHE_SIZE', 10000, int)
+
+    @property
+    def BATCH_ITEM_MEMORY_MB(self) -> int:
+        """Оценка памяти устройства на один элемент батча (МБ), 0 - не подбирать batch size по памяти"""
+        return get_env('MODEL_BATCH_ITEM_MEMORY_MB', 256, int)
+
+    @property
+    def ADAPTIVE_BATCH_GROW_AFTER(self) -> int:
+        """Количество успешных батчей подряд до увеличения batch size после OOM"""
+        return get_env('MODEL_BATCH_GROW_AFTER', 20, int)
+
+    # ========================================
+    # Настройки генерации
+    # ========================================
+
+    @property
+    def STATIC_SHAPES(self) -> bool:
+        """Статические формы для torch.compile: buckets размеров батча и заранее выделенный KV кэш"""
+        return get_env('STATIC_SHAPES', False, bool)
+
+    @property
+    def STATIC_BATCH_BUCKETS(self) -> str:
+        """Размеры батча через запятую (пусто - степени двойки до BATCH_SIZE)"""
+        return get_env('STATIC_BATCH_BUCKETS', '')
+
+    @property
+    def REPETITION_STOP_ENABLED(self) -> bool:
+        """Останавливать зацикленные последовательности до max_new_tokens"""
+        return get_env('REPETITION_STOP_ENABLED', True, bool)
+
+    @property
+    def REPETITION_STOP_MAX_NGRAM(self) -> int:
+        """Максимальная длина повторяющейся n-граммы (в токенах)"""
+        return get_env('REPETITION_STOP_MAX_NGRAM', 10, int)
+
+    @property
+    def REPETITION_STOP_MIN_REPEATS(self) -> int:
+        """Сколько раз подряд должна повториться n-грамма"""
+        return get_env('REPETITION_STOP_MIN_REPEATS', 4, int)
+
+    @property
+    def REPETITION_STOP_MAX_TOKEN_RUN(self) -> int:
+        """Длина серии одинаковых токенов для остановки"""
+        return get_env('REPETITION_STOP_MAX_TOKEN_RUN', 12, int)
+
+    @property
+    def DECODING_PROFILE(self) -> str:
+        """Профиль декодирования: sampling (по умолчанию) или greedy"""
+        return get_env('DECODING_PROFILE', 'sampling').lower()
+
+    @property
+    def MAX_NEW_TOKENS(self) -> int:
+        """Максимум новых токенов на чанк"""
+        return get_env('MAX_NEW_TOKENS', 350, int)
+
+    @property
+    def DECODE_ENGINE(self) -> str:
+        """Декодирование: 'generate' (батч целиком) или 'continuous' (пошаговый continuous batching)"""
+        return get_env('DECODE_ENGINE', 'generate').lower()
+
+    @property
+    def DECODE_MAX_SLOTS(self) -> int:
+        """Одновременно декодируемых последовательностей в режиме 'continuous' (0 - BATCH_SIZE)"""
+        return get_env('DECODE_MAX_SLOTS', 0, int)
+
+    @property
+    def DECODE_ENCODE_METHOD(self) -> str:
+        """Метод модели (mel, att_mask) -> (inputs_embeds, attention_mask) для режима 'continuous'"""
+        return get_env('DECODE_ENCODE_METHOD', '')
+
+    @property
+    def DECODE_LANGUAGE_MODEL_ATTR(self) -> str:
+        """Атрибут модели с языковой моделью transformers для режима 'continuous'"""
+        return get_env('DECODE_LANGUAGE_MODEL_ATTR', '')
+
+    # ========================================
+    # Stub реализация (нагрузочные тесты)
+    # ========================================
+
+    @property
+    def STUB_BATCH_SECONDS(self) -> float:
+        """Фиксированное время "декодирования" батча stub моделью (сек)"""
+        return get_env('STUB_BATCH_SECONDS', 0.5, float)
+
+    @property
+    def STUB_ITEM_SECONDS(self) -> float:
+        """Дополнительное время на каждый элемент батча stub моделью (сек)"""
+        return get_env('STUB_ITEM_SECONDS', 0.02, float)
+
     # ========================================
     # Настройки производительности
     # ========================================
@@ -150,6 +335,57 @@ class TranscriptionServiceConfig:
         """Максимальный размер сообщения для получения (в байтах)"""
         return get_env('GRPC_MAX_RECEIVE_MESSAGE_LENGTH', 200 * 1024 * 1024, int)
 
+    # ========================================
+    # Реестр моделей
+    # ========================================
+
+    @property
+    def MODELS(self) -> str:
+        """Модели сервера: имя=реализация[:модель],... (пусто - одна модель из --implementation)"""
+        return get_env('MODELS', '')
+
+    @property
+    def DEFAULT_MODEL(self) -> str:
+        """Модель для запросов без metadata 'model' (пусто - первая из MODELS)"""
+        return get_env('DEFAULT_MODEL', '')
+
+    @property
+    def MODELS_PRELOAD(self) -> str:
+        """
+        Модели, загружаемые при старте, через запятую (остальные - при первом запросе).
+        Пусто - модель по умолчанию, 'none' - ничего не загружать заранее
+        """
+        return get_env('MODELS_PRELOAD', '')
+
+    @property
+    def MODELS_MEMORY_BUDGET_MB(self) -> int:
+        """Бюджет памяти на все загруженные модели (МБ), 0 - без ограничения"""
+        return get_env('MODELS_MEMORY_BUDGET_MB', 0, int)
+
+    @property
+    def MODELS_ESTIMATED_MB(self) -> int:
+        """Оценка памяти модели, еще не загружавшейся (МБ), 0 - по самой большой из загружавшихся"""
+        return get_env('MODELS_ESTIMATED_MB', 0, int)
+
+    # ========================================
+    # Настройки асинхронных задач
+    # ========================================
+
+    @property
+    def JOBS_ENABLED(self) -> bool:
+        """Включить API асинхронных задач (submit/poll/fetch); задачи хранятся в JOBS_DB_PATH / JOBS_STORAGE_DIR"""
+        return get_env('JOBS_ENABLED', False, bool)
+
+    @property
+    def JOBS_DB_PATH(self) -> str:
+        """Путь к SQLite базе задач"""
+        return get_env('JOBS_DB_PATH', 'jobs/jobs.db')
+
+    @property
+    def JOBS_STORAGE_DIR(self) -> str:
+        """Директория для аудио незавершенных задач"""
+        return get_env('JOBS_STORAGE_DIR', 'jobs/audio')
+
     # ========================================
     # Настройки логирования
     # ========================================
@@ -6,6 +6,20 @@ Transcription Service Package
 Структура:
     - interface.py: Интерфейс ITranscriptionService
     - base_service.py: Базовый класс с общей логикой
+    - raw_audio.py: Быстрый путь для сырого PCM (без декодирования контейнера)
+    - bulk_transcriber.py: Офлайн пакетная транскрипция множества файлов
+    - job_store.py, job_manager.py: Асинхронные задачи с SQLite хранилищем и возобновлением
+    - adaptive_batch.py: Адаптивный batch size с откатом при OOM
+    - metrics.py: In-process метрики сервиса
+    - stopping.py: Ранняя остановка генерации на повторяющихся n-граммах
+    - precision.py: Режимы пониженной точности (bf16/fp16) и проверка по эталону fp32
+    - static_shapes.py: Статические формы генерации без перекомпиляций torch.compile
+    - model_registry.py: Реестр моделей с ленивой загрузкой и LRU вытеснением
+    - segmentation.py: Упаковка речи в полные окна модели (динамическое программирование)
+    - local_audio.py: Аудио по ссылке на локальный файл или shared memory (mmap, allowlist директорий)
+    - chunk_cache.py: LRU кэш транскрипций чанков по отпечатку PCM
+    - runtime_settings.py: Настройки производительности, изменяемые во время работы (admin API)
+    - continuous_batching.py: Пошаговый декодер с continuous batching между запросами
     - implementations/: Конкретные реализации сервиса
         - borealis_service.py: Реализация с использованием Borealis модели
 
@@ -0,0 +1,162 @@
+"""
+Адаптивный размер батча с откатом при нехватке памяти (OOM).
+
+Начальный размер батча выбирается по доступной памяти устройства,
+при OOM уменьшается вдвое, а после серии успешных батчей постепенно
+растет обратно до BATCH_SIZE. Текущий размер публикуется как
+метрика effective_batch_size:<модель> (у каждой модели реестра свой
+контроллер), каждый OOM - как oom_events_total (читаются через
+TranscriptionMetricsService.GetMetrics).
+
+Источник памяти (memory_probe) внедряется через конструктор, поэтому
+логику можно проверять на CPU без GPU:
+
+    sizer = AdaptiveBatchSizer(32, item_memory_bytes=100, memory_probe=lambda: (1000, 4000))
+    sizer.current  # 10
+"""
+
+import logging
+import os
+import threading
+
+from services.transcription.metrics import metrics
+
+
+def cuda_memory_probe(device=None):
+    """Свободная и общая память CUDA устройства в байтах"""
+    import torch
+    return torch.cuda.mem_get_info(device)
+
+
+def read_mem_available(meminfo_path='/proc/meminfo'):
+    """MemAvailable из /proc/meminfo в байтах (свободная память плюс освобождаемый page cache), None если поля нет"""
+    try:
+        with open(meminfo_path, 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def cpu_memory_probe(meminfo_path='/proc/meminfo'):
+    """
+    Доступная и общая оперативная память в байтах (Linux/Unix).
+    SC_AVPHYS_PAGES (MemFree) не учитывает page cache, поэтому используется,
+    только если ядро не отдает MemAvailable.
+    """
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    available = read_mem_available(meminfo_path)
+    if available is None:
+        available = os.sysconf('SC_AVPHYS_PAGES') * page_size
+    return available, os.sysconf('SC_PHYS_PAGES') * page_size
+
+
+def default_memory_probe(device: str):
+    """Выбирает источник памяти по устройству модели"""
+    if device.startswith('cuda'):
+        return lambda: cuda_memory_probe(device)
+    return cpu_memory_probe
+
+
+class AdaptiveBatchSizer:
+    """
+    Потокобезопасный контроллер размера батча.
+
+    Args:
+        max_batch_size: Верхняя граница (BATCH_SIZE из конфигурации)
+        item_memory_bytes: Оценка памяти на один элемент батча
+        memory_probe: Callable без аргументов -> (free_bytes, total_bytes)
+        min_batch_size: Нижняя граница
+        memory_fraction: Доля свободной памяти, которую можно занять батчем
+        grow_after: Количество успешных батчей подряд до увеличения размера
+        name: Имя модели в метриках (effective_batch_size:<name>)
+    """
+
+    def __init__(self, max_batch_size, item_memory_bytes, memory_probe=None,
+                 min_batch_size=1, memory_fraction=0.8, grow_after=20, name='default'):
+        self.max_batch_size = max(1, max_batch_size)
+        self.min_batch_size = max(1, min(min_batch_size, self.max_batch_size))
+        self.item_memory_bytes = item_memory_bytes
+        self.memory_probe = memory_probe
+        self.memory_fraction = memory_fraction
+        self.grow_after = max(1, grow_after)
+        self.name = name
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._successes = 0
+        self._current = self._initial_size()
+        metrics.set_gauge(f'effective_batch_size:{name}', self._current)
+
+    def _initial_size(self):
+        """Размер батча по доступной памяти на старте"""
+        if self.memory_probe is None or self.item_memory_bytes <= 0:
+            return self.max_batch_size
+
+        try:
+            free_bytes, _ = self.memory_probe()
+        except Exception as e:
+            self.logger.warning(f"⚠️  Не удалось определить свободную память: {e}")
+            return self.max_batch_size
+
+        fit = int(free_bytes * self.memory_fraction // self.item_memory_bytes)
+        size = max(self.min_batch_size, min(self.max_batch_size, fit))
+
+        self.logger.info(f"Адаптивный batch size: {size} (свободно {free_bytes / 1e9:.2f}GB, "
+                         f"~{self.item_memory_bytes / 1e6:.0f}MB на элемент, максимум {self.max_batch_size})")
+        return size
+
+    @property
+    def current(self) -> int:
+        """Текущий эффективный размер батча"""
+        with self._lock:
+            return self._current
+
+    def set_max_batch_size(self, size):
+        """
+        Новая верхняя граница (изменение BATCH_SIZE во время работы).
+
+        Текущий размер не уменьшается: запросы в обработке берут
+        min(current, свой снимок BATCH_SIZE), новые - с новой границей.
+        """
+        with self._lock:
+            if size != self.max_batch_size:
+                self.logger.info(f"Адаптивный batch size: максимум {self.max_batch_size} → {size}")
+                self.max_batch_size = max(1, size)
+                self._successes = 0
+
+    def _set(self, size):
+        self._current = size
+        metrics.set_gauge(f'effective_batch_size:{self.name}', size)
+
+    def on_success(self, batch_len):
+        """Регистрирует успешный батч; после grow_after успехов размер растет"""
+        with self._lock:
+            # Неполные батчи (хвост файла) не говорят о запасе памяти
+            if batch_len < self._current:
+                return
+
+            self._successes += 1
+            if self._successes >= self.grow_after and self._current < self.max_batch_size:
+                new_size = min(self.max_batch_size, self._current + max(1, self._current // 4))
+                self.logger.info(f"↗️  Batch size: {self._current} → {new_size}")
+                self._set(new_size)
+                self._successes = 0
+
+    def on_oom(self, batch_len):
+        """
+        Регистрирует OOM на батче размера batch_len.
+
+        Returns:
+            Новый размер батча для повторной попытки
+        """
+        metrics.inc('oom_events_total')
+        with self._lock:
+            self._successes = 0
+            new_size = max(self.min_batch_size, min(self._current, batch_len) // 2)
+            if new_size != self._current:
+                self.logger.warning(f"↘️  OOM на батче {batch_len}: batch size {self._current} → {new_size}")
+                self._set(new_size)
+            return new_size
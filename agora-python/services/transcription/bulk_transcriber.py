@@ -0,0 +1,276 @@
+"""
+Офлайн пакетная транскрипция архивов.
+
+Вместо одного gRPC вызова на файл декодирует и нарезает много файлов
+параллельно, а затем упаковывает чанки разных файлов в полные батчи
+BATCH_SIZE. Хвостовые чанки одного файла больше не оставляют батч
+полупустым.
+
+Результаты пишутся в JSONL (одна строка на файл). Повторный запуск
+с тем же выходным файлом пропускает уже успешно обработанные файлы.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent import futures
+from pathlib import Path
+
+import librosa
+
+from resources.config import config
+
+
+# Поддерживаемые расширения при обходе директории
+SUPPORTED_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.flac', '.ogg', '.aac')
+
+
+def collect_input_files(source):
+    """
+    Возвращает список файлов для обработки.
+
+    Args:
+        source: Директория (обходится рекурсивно) или manifest файл.
+                Manifest: по одному пути на строку или JSONL с полем "path".
+                Относительные пути считаются от директории manifest.
+
+    Returns:
+        Список путей (str) в стабильном порядке
+    """
+    source = Path(source)
+
+    if source.is_dir():
+        return sorted(
+            str(p) for p in source.rglob('*')
+            if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+
+    files = []
+    with open(source, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            if line.startswith('{'):
+                line = json.loads(line)['path']
+
+            path = Path(line)
+            if not path.is_absolute():
+                path = source.parent / path
+            files.append(str(path))
+
+    return files
+
+
+def load_completed(output_path):
+    """Читает JSONL результатов и возвращает множество успешно обработанных путей"""
+    completed = set()
+    output_path = Path(output_path)
+
+    if not output_path.exists():
+        return completed
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Оборванная последняя строка после аварийного завершения
+                continue
+            if record.get('success'):
+                completed.add(record['path'])
+
+    return completed
+
+
+class _FileState:
+    """Состояние одного файла во время пакетной обработки"""
+
+    def __init__(self, path, audio_duration, chunk_count):
+        self.path = path
+        self.audio_duration = audio_duration
+        self.texts = [None] * chunk_count
+        self.remaining = chunk_count
+        self.failed = False
+
+
+class BulkTranscriber:
+    """
+    Пакетная транскрипция множества файлов с упаковкой чанков в полные батчи.
+
+    Использует декодирование, сегментацию и GPU конвейер
+    (_process_chunks_v4) переданной реализации сервиса.
+    """
+
+    def __init__(self, service, batch_size=None, workers=None, flush_batches=4):
+        """
+        Args:
+            service: Экземпляр реализации сервиса (например, BorealisTranscriptionService)
+            batch_size: Фиксированный размер батча (по умолчанию адаптивный размер сервиса)
+            workers: Количество потоков декодирования (по умолчанию config.MAX_WORKERS)
+            flush_batches: Сколько полных батчей накапливать перед отправкой на GPU
+        """
+        self.service = service
+        self.batch_size = batch_size
+        self.workers = workers or config.MAX_WORKERS
+        self.flush_batches = max(1, flush_batches)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _current_batch_size(self):
+        """Фиксированный или текущий адаптивный размер батча сервиса"""
+        if self.batch_size:
+            return self.batch_size
+        sizer = getattr(self.service, 'batch_sizer', None)
+        return min(sizer.current, config.BATCH_SIZE) if sizer is not None else config.BATCH_SIZE
+
+    def _decode_and_split(self, path):
+        """Загружает файл и нарезает его на чанки (выполняется в пуле потоков)"""
+        waveform, sr = librosa.load(path, sr=16_000)
+        cut_points = self.service._find_cut_points(waveform, sr)
+        chunks = self.service._split_audio_by_cut_points(waveform, sr, cut_points)
+        return chunks, len(waveform) / sr
+
+    def run(self, source, output_path):
+        """
+        Обрабатывает все файлы из source и дописывает результаты в output_path.
+
+        Returns:
+            Словарь со сводной статистикой прогона
+        """
+        run_start = time.time()
+
+        all_files = collect_input_files(source)
+        completed = load_completed(output_path)
+        pending_files = [p for p in all_files if p not in completed]
+
+        self.logger.info("=" * 80)
+        self.logger.info(f"📦 Пакетная транскрипция: {len(all_files)} файлов")
+        self.logger.info(f"   Уже обработано: {len(completed)} | К обработке: {len(pending_files)}")
+        self.logger.info(f"   Batch Size: {self._current_batch_size()} | Потоков декодирования: {self.workers}")
+        self.logger.info("=" * 80)
+
+        stats = {
+            'files_total': len(all_files),
+            'files_skipped': len(completed),
+            'files_done': 0,
+            'files_failed': 0,
+            'chunks': 0,
+            'batches': 0,
+            'audio_seconds': 0.0,
+        }
+
+        output_lock = threading.Lock()
+        # Очередь чанков: (FileState, индекс чанка, чанк)
+        pending_chunks = []
+
+        with open(output_path, 'a', encoding='utf-8') as out:
+
+            def write_record(record):
+                with output_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    out.flush()
+
+            def flush(count):
+                """Отправляет первые count чанков очереди на GPU"""
+                batch = pending_chunks[:count]
+                del pending_chunks[:count]
+
+                texts = self.service._process_chunks_v4(
+                    [chunk for _, _, chunk in batch], 16_000, batch_size=self.batch_size
+                )
+                stats['batches'] += -(-len(batch) // self._current_batch_size())
+
+                if len(texts) != len(batch):
+                    # GPU конвейер потерял батч - сопоставить тексты с чанками нельзя
+                    for state in {id(s): s for s, _, _ in batch}.values():
+                        if not state.failed:
+                            state.failed = True
+                            write_record({'path': state.path, 'success': False,
+                                          'error_message': "Ошибка обработки батча на GPU"})
+                            stats['files_failed'] += 1
+                    return
+
+                for (state, idx, _), text in zip(batch, texts):
+                    if state.failed:
+                        continue
+                    state.texts[idx] = text
+                    state.remaining -= 1
+                    if state.remaining == 0:
+                        write_record({
+                            'path': state.path,
+                            'success': True,
+                            'transcript': " ".join(state.texts),
+                            'audio_duration': state.audio_duration,
+                            'chunks': len(state.texts),
+                        })
+                        stats['files_done'] += 1
+                        stats['audio_seconds'] += state.audio_duration
+
+            with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Ограничиваем количество одновременно декодированных файлов в памяти
+                file_iter = iter(pending_files)
+                in_flight = {}
+
+                def submit_next():
+                    path = next(file_iter, None)
+                    if path is not None:
+                        in_flight[executor.submit(self._decode_and_split, path)] = path
+
+                for _ in range(self.workers * 2):
+                    submit_next()
+
+                while in_flight:
+                    done, _ = futures.wait(in_flight, return_when=futures.FIRST_COMPLETED)
+
+                    for future in done:
+                        path = in_flight.pop(future)
+                        submit_next()
+
+                        try:
+                            chunks, audio_duration = future.result()
+                        except Exception as e:
+                            self.logger.error(f"❌ {path}: {e}")
+                            write_record({'path': path, 'success': False, 'error_message': str(e)})
+                            stats['files_failed'] += 1
+                            continue
+
+                        if not chunks:
+                            write_record({
+                                'path': path, 'success': True, 'transcript': "",
+                                'audio_duration': audio_duration, 'chunks': 0,
+                            })
+                            stats['files_done'] += 1
+                            continue
+
+                        state = _FileState(path, audio_duration, len(chunks))
+                        pending_chunks.extend((state, idx, chunk) for idx, chunk in enumerate(chunks))
+                        stats['chunks'] += len(chunks)
+
+                        # Отправляем только полные батчи, остаток ждет следующих файлов
+                        batch_size = self._current_batch_size()
+                        if len(pending_chunks) >= batch_size * self.flush_batches:
+                            flush(len(pending_chunks) - len(pending_chunks) % batch_size)
+
+            # Хвост: последний, возможно неполный, батч
+            if pending_chunks:
+                flush(len(pending_chunks))
+
+        wall_time = time.time() - run_start
+        audio_hours = stats['audio_seconds'] / 3600
+        stats['wall_seconds'] = wall_time
+        stats['audio_hours'] = audio_hours
+        stats['audio_hours_per_hour'] = audio_hours / (wall_time / 3600) if wall_time > 0 else 0.0
+
+        self.logger.info("=" * 80)
+        self.logger.info("РЕЗУЛЬТАТ ПАКЕТНОЙ ТРАНСКРИПЦИИ")
+        self.logger.info("=" * 80)
+        self.logger.info(f"📁 Файлов: обработано={stats['files_done']} | ошибок={stats['files_failed']} | "
+                         f"пропущено={stats['files_skipped']}")
+        self.logger.info(f"🧩 Чанков: {stats['chunks']} в {stats['batches']} батчах")
+        self.logger.info(f"⏱️  Аудио: {audio_hours:.2f} ч за {wall_time / 3600:.2f} ч | "
+                         f"Скорость: {stats['audio_hours_per_hour']:.1f} ч аудио / ч")
+        self.logger.info("=" * 80)
+
+        return stats
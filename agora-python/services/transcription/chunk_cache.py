@@ -0,0 +1,69 @@
+"""
+Кэш транскрипций на уровне чанков.
+
+Повторно загруженная запись с обрезанными или добавленными секундами
+не совпадает по хэшу файла, но большинство чанков после сегментации
+остаются прежними. Ключ кэша - отпечаток PCM чанка (после
+_split_audio_by_cut_points), поэтому в модель уходят только новые
+и измененные чанки.
+
+Отпечаток считается по сэмплам, квантованным до 16 бит (в масштабе
+raw_audio.decode_raw_pcm): одна и та же запись, пришедшая как PCM16
+или как float32, дает один ключ. Сервис дополняет отпечаток моделью,
+точностью и параметрами generate.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services.transcription.metrics import metrics
+
+
+def chunk_fingerprint(chunk) -> bytes:
+    """Отпечаток PCM чанка (blake2b от 16-бит сэмплов)"""
+    samples = np.clip(np.rint(np.asarray(chunk, dtype=np.float32) * 32768.0), -32768, 32767).astype('<i2')
+    return hashlib.blake2b(samples.tobytes(), digest_size=16).digest()
+
+
+class ChunkTranscriptCache:
+    """
+    Потокобезопасный LRU кэш {ключ чанка: текст}.
+
+    Args:
+        max_entries: Максимальное количество чанков в кэше
+        name: Имя модели в метриках (chunk_cache_entries:<name>, chunk_cache_hits_total:<name>, ...)
+    """
+
+    def __init__(self, max_entries, name='default'):
+        self.max_entries = max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Текст чанка или None при промахе"""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+
+        counter = 'chunk_cache_hits_total' if text is not None else 'chunk_cache_misses_total'
+        metrics.inc(counter)
+        metrics.inc(f'{counter}:{self.name}')
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.inc('chunk_cache_evictions_total')
+                metrics.inc(f'chunk_cache_evictions_total:{self.name}')
+            metrics.set_gauge(f'chunk_cache_entries:{self.name}', len(self._entries))
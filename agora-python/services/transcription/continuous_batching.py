@@ -0,0 +1,450 @@
+"""
+Continuous batching на уровне шагов декодера.
+
+model.generate на батче из 32 чанков работает, пока не закончится самая
+длинная последовательность: слоты с короткими транскрипциями сотни шагов
+простаивают. Движок ведет декодирование сам, по одному шагу:
+
+    1. Ожидающие чанки (от любых запросов) проходят аудио энкодер
+       и prefill пачкой и занимают свободные слоты
+    2. Один шаг языковой модели для всех слотов
+    3. Завершенные последовательности (EOS, лимит токенов, зацикливание)
+       освобождают слот, future получает текст
+    4. Освободившиеся слоты на следующей итерации занимают ожидающие чанки
+
+KV кэш выделяется один раз: статические слои transformers на max_slots
+строк (слот = строка). Все слоты пишут новый токен в общую колонку t, какие
+колонки принадлежат слоту, задает маска внимания. Prefill нового чанка
+копируется в его строку на место колонок [t - P, t), остальные строки
+не трогаются. Когда колонки заканчиваются, занятая часть сдвигается
+к началу буфера (одно копирование на ~половину буфера шагов).
+
+Шаг читает только колонки [0, t]: слои кэша отдают окно, маска передается
+готовой 4D, поэтому стоимость шага не зависит от размера буфера.
+
+Модель подключается через DecoderAdapter с явно названными методом
+энкодера и языковой моделью (DECODE_ENCODE_METHOD, DECODE_LANGUAGE_MODEL_ATTR).
+Если их нет, адаптер падает с RuntimeError: движок не подменяется
+молча на generate.
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+import torch
+from transformers.cache_utils import Cache, StaticLayer
+
+from services.transcription.metrics import metrics
+from services.transcription.stopping import is_repetition_loop
+
+
+# Параметры generate, которые движок выполняет сам
+SAMPLING_KEYS = ('do_sample', 'temperature', 'top_k', 'top_p')
+
+
+def sample_tokens(logits, do_sample=True, temperature=1.0, top_k=0, top_p=1.0):
+    """Выбор следующего токена для каждой строки (те же параметры, что у generate)"""
+    logits = logits.float()
+    if not do_sample:
+        return logits.argmax(dim=-1)
+
+    logits = logits / max(temperature, 1e-5)
+
+    if top_k:
+        kth = torch.topk(logits, min(top_k, logits.shape[-1])).values[:, -1:]
+        logits = logits.masked_fill(logits < kth, float('-inf'))
+
+    if top_p < 1.0:
+        sorted_logits, sorted_idx = torch.sort(logits, descending=True)
+        probs = torch.softmax(sorted_logits, dim=-1)
+        # Сдвиг на одну позицию: первый токен за порогом остается
+        remove = probs.cumsum(dim=-1) - probs > top_p
+        sorted_logits = sorted_logits.masked_fill(remove, float('-inf'))
+        logits = torch.full_like(logits, float('-inf')).scatter(1, sorted_idx, sorted_logits)
+
+    return torch.multinomial(torch.softmax(logits, dim=-1), 1).squeeze(-1)
+
+
+def last_real_positions(mask):
+    """Индекс последней реальной позиции каждой строки маски (выравнивание влево или вправо)"""
+    length = mask.shape[1]
+    return length - 1 - torch.flip(mask, dims=[1]).argmax(dim=1)
+
+
+class DecoderAdapter:
+    """
+    Доступ движка к модели: энкодер и языковая модель с явными именами.
+
+    Args:
+        model: Модель (обертка torch.compile снимается)
+        encode_method: Метод модели (mel, att_mask) -> (inputs_embeds [B, T, H], attention_mask [B, T]),
+                       промпт целиком, как его собирает generate модели
+        language_model_attr: Атрибут модели с causal LM transformers (forward с inputs_embeds,
+                             input_ids, attention_mask, position_ids, past_key_values, cache_position)
+
+    Raises:
+        RuntimeError: Имена не заданы или модель их не предоставляет
+    """
+
+    def __init__(self, model, encode_method, language_model_attr):
+        model = getattr(model, '_orig_mod', model)
+        if not encode_method or not language_model_attr:
+            raise RuntimeError("Continuous batching требует DECODE_ENCODE_METHOD и DECODE_LANGUAGE_MODEL_ATTR")
+
+        self.encode_fn = getattr(model, encode_method, None)
+        if not callable(self.encode_fn):
+            raise RuntimeError(f"Модель {type(model).__name__} не предоставляет метод энкодера {encode_method}")
+
+        self.language_model = getattr(model, language_model_attr, None)
+        if not callable(self.language_model):
+            raise RuntimeError(f"Модель {type(model).__name__} не предоставляет языковую модель {language_model_attr}")
+
+    def encode(self, mel, att_mask):
+        result = self.encode_fn(mel=mel, att_mask=att_mask)
+        if not (isinstance(result, tuple) and len(result) == 2 and all(torch.is_tensor(t) for t in result)):
+            raise TypeError(f"Энкодер вернул {type(result).__name__}, ожидается (inputs_embeds, attention_mask)")
+
+        embeds, mask = result
+        if embeds.dim() != 3 or mask.shape != embeds.shape[:2] or embeds.shape[0] != mel.shape[0]:
+            raise TypeError(f"Энкодер вернул формы {tuple(embeds.shape)} и {tuple(mask.shape)} "
+                            f"для батча {mel.shape[0]}")
+        return embeds, mask
+
+
+class _WindowLayer(StaticLayer):
+    """Статический слой KV, который отдает внимание только первые window колонок"""
+
+    def __init__(self, max_cache_len):
+        super().__init__(max_cache_len)
+        self.window = max_cache_len
+
+    def update(self, key_states, value_states, cache_kwargs=None):
+        keys, values = super().update(key_states, value_states, cache_kwargs)
+        return keys[:, :, :self.window], values[:, :, :self.window]
+
+
+class _Slot:
+    """Активная последовательность: future запроса, параметры и сгенерированные токены"""
+
+    __slots__ = ('future', 'params', 'tokens', 'early_stopped')
+
+    def __init__(self, future, params):
+        self.future = future
+        self.params = params
+        self.tokens = []
+        self.early_stopped = False
+
+
+class ContinuousBatchingEngine:
+    """
+    Декодер с пошаговым управлением батчем.
+
+    Один фоновый поток на модель: submit() из любого потока ставит чанк
+    в очередь и возвращает Future[(текст, остановлен на повторе)].
+
+    Args:
+        adapter: DecoderAdapter (encode и language_model)
+        decode: Функция списка токенов -> текст
+        eos_token_id: Токен конца последовательности
+        max_slots: Одновременно декодируемых последовательностей (строк KV кэша)
+        batch_sizer: AdaptiveBatchSizer: ограничивает размер пачки prefill
+                     и уменьшает ее при OOM (None - без ограничения)
+        repetition: Параметры is_repetition_loop или None, если остановка на повторах отключена
+        max_waiting: Предел очереди ожидающих чанков (submit блокируется)
+        context: Фабрика контекста для шагов модели (inference_mode, autocast)
+        is_oom: Проверка исключения на нехватку памяти
+        name: Имя модели в метриках (decode_active_slots:<name>)
+    """
+
+    def __init__(self, adapter, decode, eos_token_id, max_slots=32, batch_sizer=None, repetition=None,
+                 max_waiting=None, context=None, is_oom=None, name='default'):
+        self.adapter = adapter
+        self.decode = decode
+        self.eos_token_id = eos_token_id
+        self.max_slots = max_slots
+        self.batch_sizer = batch_sizer
+        self.repetition = repetition
+        self.max_waiting = max_waiting or max_slots * 2
+        self.context = context or nullcontext
+        self.is_oom = is_oom or (lambda e: False)
+        self.name = name
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._stopped = False
+
+        # Состояние батча (только поток движка)
+        self._slots = [None] * max_slots
+        self._cache = None
+        self._mask = None
+        self._lengths = None
+        self._last_tokens = None
+        self._column = 0
+
+        self._thread = threading.Thread(target=self._loop, name=f"decode-engine-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, mel, att_mask, params):
+        """
+        Ставит один чанк (mel и att_mask с батч-размерностью 1) в очередь.
+
+        Args:
+            params: Параметры generate запроса (max_new_tokens, do_sample, temperature, top_k, top_p)
+
+        Returns:
+            Future[(текст, остановлен на повторе)]
+        """
+        params = {'max_new_tokens': params['max_new_tokens'],
+                  **{key: params[key] for key in SAMPLING_KEYS if key in params}}
+        future = Future()
+        with self._cond:
+            while len(self._waiting) >= self.max_waiting and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                raise RuntimeError("Decode engine остановлен")
+            self._waiting.append((mel, att_mask, params, future))
+            self._cond.notify_all()
+        return future
+
+    def submit_batch(self, mel, att_mask, params):
+        """Ставит в очередь все строки батча. Возвращает список Future"""
+        return [self.submit(mel[i:i + 1], att_mask[i:i + 1], params) for i in range(mel.shape[0])]
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    @property
+    def active_slots(self) -> int:
+        return sum(slot is not None for slot in self._slots)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._waiting and not self.active_slots:
+                    self._cond.wait()
+                if self._stopped:
+                    break
+
+                limit = self.max_slots - self.active_slots
+                if self.batch_sizer is not None:
+                    limit = min(limit, self.batch_sizer.current)
+                admitted = [self._waiting.popleft() for _ in range(min(limit, len(self._waiting)))]
+                if admitted:
+                    self._cond.notify_all()
+
+            if admitted:
+                self._admit_with_backoff(admitted)
+
+            if self.active_slots:
+                try:
+                    with self.context():
+                        self._step()
+                except Exception as e:
+                    self.logger.error(f"❌ Decode engine: шаг декодера: {e}")
+                    self._fail_active(e)
+
+            metrics.set_gauge(f'decode_active_slots:{self.name}', self.active_slots)
+
+        error = RuntimeError("Decode engine остановлен")
+        self._fail_active(error)
+        for *_, future in self._waiting:
+            future.set_exception(error)
+
+    def _admit_with_backoff(self, admitted):
+        """Prefill пачки; при OOM пачка возвращается в начало очереди, batch_sizer уменьшает следующую"""
+        try:
+            with self.context():
+                self._admit(admitted)
+        except Exception as e:
+            if self.is_oom(e) and len(admitted) > 1 and self.batch_sizer is not None:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                self.batch_sizer.on_oom(len(admitted))
+                with self._cond:
+                    self._waiting.extendleft(reversed(admitted))
+                return
+
+            self.logger.error(f"❌ Decode engine: prefill {len(admitted)} чанков: {e}")
+            for *_, future in admitted:
+                future.set_exception(e)
+            return
+
+        if self.batch_sizer is not None:
+            self.batch_sizer.on_success(len(admitted))
+
+    def _admit(self, admitted):
+        """Энкодер + prefill для новых чанков и запись их KV в свободные строки кэша"""
+        mel = torch.cat([item[0] for item in admitted])
+        att_mask = torch.cat([item[1] for item in admitted])
+
+        embeds, mask = self.adapter.encode(mel, att_mask)
+        mask = mask.long()
+        output = self.adapter.language_model(
+            inputs_embeds=embeds, attention_mask=mask,
+            position_ids=(mask.cumsum(dim=-1) - 1).clamp(min=0), use_cache=True,
+        )
+        rows = torch.arange(len(admitted), device=mask.device)
+        logits = output.logits[rows, last_real_positions(mask)]
+        prefill = [(keys, values) for keys, values in output.past_key_values]
+
+        prompt_len = mask.shape[1]
+        max_new = max(item[2]['max_new_tokens'] for item in admitted)
+        self._reserve(prefill, prompt_len, max_new)
+
+        free = [row for row, slot in enumerate(self._slots) if slot is None][:len(admitted)]
+        index = torch.tensor(free, device=self._mask.device)
+        start, end = self._column - prompt_len, self._column
+        for layer, (keys, values) in zip(self._cache.layers, prefill):
+            layer.keys[index, :, start:end] = keys
+            layer.values[index, :, start:end] = values
+        self._mask[index] = 0
+        self._mask[index, start:end] = mask
+        self._lengths[index] = mask.sum(dim=1)
+
+        slots = [_Slot(future, params) for _, _, params, future in admitted]
+        self._sample(logits, slots, free)
+        for row, slot in zip(free, slots):
+            self._slots[row] = slot
+
+        metrics.inc('decode_admitted_total', len(slots))
+        self._retire_finished()
+
+    def _step(self):
+        """Один шаг языковой модели для всех строк (свободные строки считаются, но не читаются)"""
+        if self._column >= self._mask.shape[1]:
+            self._reserve(None, 0, 1)
+
+        column = self._column
+        self._mask[:, column] = 1
+        for layer in self._cache.layers:
+            layer.window = column + 1
+
+        # Готовая аддитивная маска [B, 1, 1, окно]: transformers не строит свою на всю длину буфера
+        dtype = self._cache.layers[0].dtype
+        visible = self._mask[:, None, None, :column + 1]
+        bias = (1 - visible).to(dtype) * torch.finfo(dtype).min
+        output = self.adapter.language_model(
+            input_ids=self._last_tokens.unsqueeze(-1),
+            attention_mask=bias,
+            position_ids=self._lengths.unsqueeze(-1),
+            past_key_values=self._cache,
+            cache_position=torch.tensor([column], device=self._mask.device),
+            use_cache=True,
+        )
+        self._column += 1
+        self._lengths += 1
+
+        active = [row for row, slot in enumerate(self._slots) if slot is not None]
+        self._sample(output.logits[active, -1], [self._slots[row] for row in active], active)
+        self._retire_finished()
+
+    def _sample(self, logits, slots, rows):
+        """Следующий токен для строк rows: слоты с одинаковыми параметрами сэмплирования - одной пачкой"""
+        groups = {}
+        for position, slot in enumerate(slots):
+            key = tuple(slot.params.get(name) for name in SAMPLING_KEYS)
+            groups.setdefault(key, []).append(position)
+
+        tokens = torch.empty(len(slots), dtype=torch.long, device=logits.device)
+        for key, positions in groups.items():
+            sampling = {name: value for name, value in zip(SAMPLING_KEYS, key) if value is not None}
+            index = torch.tensor(positions, device=logits.device)
+            tokens[index] = sample_tokens(logits[index], **sampling)
+
+        self._last_tokens[torch.tensor(rows, device=self._last_tokens.device)] = tokens.to(self._last_tokens.device)
+        for slot, token in zip(slots, tokens.tolist()):
+            slot.tokens.append(token)
+        metrics.inc('decode_tokens_total', len(slots))
+
+    def _is_finished(self, slot):
+        if slot.tokens[-1] == self.eos_token_id or len(slot.tokens) >= slot.params['max_new_tokens']:
+            return True
+        if self.repetition and is_repetition_loop(slot.tokens, **self.repetition):
+            slot.early_stopped = True
+            return True
+        return False
+
+    def _retire_finished(self):
+        """Завершает готовые последовательности и освобождает их слоты"""
+        for row, slot in enumerate(self._slots):
+            if slot is None or not self._is_finished(slot):
+                continue
+
+            tokens = slot.tokens[:-1] if slot.tokens[-1] == self.eos_token_id else slot.tokens
+            self._slots[row] = None
+            try:
+                slot.future.set_result((self.decode(tokens), slot.early_stopped))
+            except Exception as e:
+                slot.future.set_exception(e)
+
+    def _reserve(self, prefill, prompt_len, max_new):
+        """
+        Гарантирует prompt_len колонок перед текущей и свободную колонку после нее.
+
+        Буфер выделяется при первом prefill (слои, головы, dtype - по его KV),
+        при нехватке колонок занятая часть сдвигается к началу, а если и этого
+        мало - буфер увеличивается.
+        """
+        if self._cache is None:
+            self._allocate(prefill, 2 * (prompt_len + max_new))
+            self._column = prompt_len
+            return
+
+        length = self._mask.shape[1]
+        active = [row for row, slot in enumerate(self._slots) if slot is not None]
+        if not active:
+            target = prompt_len
+        else:
+            if prompt_len <= self._column < length:
+                return
+            first = int(self._mask[active].argmax(dim=1).min())
+            target = max(prompt_len, self._column - first)
+
+        if target + max_new >= length:
+            self._grow(2 * (target + max_new))
+            length = self._mask.shape[1]
+
+        shift = self._column - target
+        if active and shift:
+            for layer in self._cache.layers:
+                layer.keys.copy_(torch.roll(layer.keys, -shift, dims=2))
+                layer.values.copy_(torch.roll(layer.values, -shift, dims=2))
+            self._mask.copy_(torch.roll(self._mask, -shift, dims=1))
+        self._column = target
+
+    def _allocate(self, prefill, length):
+        keys = prefill[0][0]
+        self._cache = Cache(layers=[_WindowLayer(length) for _ in prefill])
+        self._cache.early_initialization(self.max_slots, keys.shape[1], keys.shape[3], keys.dtype, keys.device)
+        self._mask = torch.zeros(self.max_slots, length, dtype=torch.long, device=keys.device)
+        self._lengths = torch.zeros(self.max_slots, dtype=torch.long, device=keys.device)
+        self._last_tokens = torch.zeros(self.max_slots, dtype=torch.long, device=keys.device)
+        self.logger.info(f"✓ Decode engine: KV кэш {self.max_slots} слотов x {length} позиций")
+
+    def _grow(self, length):
+        """Увеличивает буфер до length колонок (данные остаются на своих местах)"""
+        old_cache, old_mask = self._cache, self._mask
+        old_length = old_mask.shape[1]
+        layer = old_cache.layers[0]
+        self._cache = Cache(layers=[_WindowLayer(length) for _ in old_cache.layers])
+        self._cache.early_initialization(self.max_slots, layer.num_heads, layer.head_dim, layer.dtype, layer.device)
+        for new, old in zip(self._cache.layers, old_cache.layers):
+            new.keys[:, :, :old_length] = old.keys
+            new.values[:, :, :old_length] = old.values
+        self._mask = torch.zeros(self.max_slots, length, dtype=torch.long, device=old_mask.device)
+        self._mask[:, :old_length] = old_mask
+        self.logger.info(f"Decode engine: KV кэш увеличен до {length} позиций")
+
+    def _fail_active(self, error):
+        """Ошибка шага: все активные последовательности получают исключение"""
+        for row, slot in enumerate(self._slots):
+            if slot is not None:
+                slot.future.set_exception(error)
+                self._slots[row] = None
@@ -5,10 +5,13 @@ Implementations Package
 
 Доступные реализации:
     - BorealisTranscriptionService: Использует Borealis ML модель (Vikhrmodels/Borealis)
+    - StubTranscriptionService: Конвейер Borealis без модели (для нагрузочных тестов)
 """
 
 from services.transcription.implementations.borealis_service import BorealisTranscriptionService
+from services.transcription.implementations.stub_service import StubTranscriptionService
 
 __all__ = [
     'BorealisTranscriptionService',
+    'StubTranscriptionService',
 ]
@@ -10,11 +10,14 @@ Production v4.0 (FULLY OPTIMIZED)
 ✅ Умное разрезание по паузам (контекст сохранен)
 """
 
+import gc
+import itertools
 import os
 import sys
 import time
 import tempfile
 import threading
+from contextlib import contextmanager
 from pathlib import Path
 from queue import Queue
 
@@ -27,12 +30,28 @@ os.environ['HF_HUB_OFFLINE'] = '1'
 from generated.v1 import transcription_pb2
 from generated.v1 import transcription_pb2_grpc
 from services.transcription.base_service import TranscriptionServiceBase
+from services.transcription.adaptive_batch import AdaptiveBatchSizer, default_memory_probe
+from services.transcription.chunk_cache import ChunkTranscriptCache, chunk_fingerprint
+from services.transcription.continuous_batching import ContinuousBatchingEngine, DecoderAdapter
+from services.transcription.local_audio import (
+    LOCAL_REFERENCE_KEYS, check_local_peer, get_local_reference, map_file, parse_allowed_dirs, resolve_local_audio
+)
+from services.transcription.metrics import metrics
+from services.transcription.stopping import RepetitionStoppingCriteria
+from services.transcription.precision import check_reference_set, resolve_dtype, word_error_rate
+from services.transcription.runtime_settings import DECODING_PROFILES
+from services.transcription.segmentation import find_anchored_cut_points, frame_energy, pack_segments
+from services.transcription.static_shapes import RecompileCounter, bucket_for, pad_batch, parse_buckets
+from services.transcription.raw_audio import (
+    TARGET_SAMPLE_RATE, decode_raw_pcm, is_raw_pcm_format, sample_rate_from_metadata, validate_raw_pcm
+)
 from resources.config import config
 
+import grpc
 import torch
 import librosa
 import numpy as np
-from transformers import AutoModelForCausalLM, AutoTokenizer, AutoFeatureExtractor
+from transformers import AutoModelForCausalLM, AutoTokenizer, AutoFeatureExtractor, StoppingCriteriaList
 
 
 class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_grpc.TranscriptionServiceServicer):
@@ -48,46 +67,66 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
     - Умное разрезание аудио по паузам
     """
 
-    def __init__(self):
-        """Инициализация Borealis сервиса транскрипции"""
+    # Окно feature extractor: более длинные чанки обрезаются
+    MODEL_WINDOW_SAMPLES = 480_000
+
+    # generate модели собирает промпт (аудио + текст) в inputs_embeds,
+    # в input_ids критериев остановки попадают только сгенерированные токены
+    GENERATE_PROMPT_TOKENS = 0
+
+    def __init__(self, model_name=None, metrics_name=None):
+        """
+        Инициализация Borealis сервиса транскрипции
+
+        Args:
+            model_name: Название или путь модели (по умолчанию config.MODEL_NAME)
+            metrics_name: Имя модели в метриках, как в реестре MODELS (по умолчанию model_name)
+        """
         super().__init__()
 
+        self.model_name = model_name or config.MODEL_NAME
+        self.metrics_name = metrics_name or self.model_name
+
         self.logger.info("=" * 80)
         self.logger.info("BorealisTranscriptionService - Production v4.0 (FULLY OPTIMIZED)")
         self.logger.info("=" * 80)
 
         # Загрузка конфигурации
         self.logger.info("Загрузка конфигурации...")
-        self.logger.info(f"  MODEL_NAME: {config.MODEL_NAME}")
+        self.logger.info(f"  MODEL_NAME: {self.model_name}")
         self.logger.info(f"  DEVICE: {config.DEVICE}")
+        self.logger.info(f"  PRECISION: {config.MODEL_PRECISION}")
+        self.logger.info(f"  STATIC_SHAPES: {config.STATIC_SHAPES}")
+        self.logger.info(f"  DECODE_ENGINE: {config.DECODE_ENGINE}")
         self.logger.info(f"  BATCH_SIZE: {config.BATCH_SIZE}")
         self.logger.info(f"  TARGET_CHUNK_DURATION: {config.TARGET_CHUNK_DURATION}s")
         self.logger.info(f"  LOCAL_FILES_ONLY: {config.MODEL_LOCAL_FILES_ONLY}")
 
-        # Загрузка модели Borealis
-        self.logger.info("Загрузка модели Borealis...")
+        self.device = config.DEVICE
+        self.use_cuda = self.device.startswith('cuda')
+        self.dtype = resolve_dtype(config.MODEL_PRECISION, self.device)
+        self.static_shapes = config.STATIC_SHAPES
 
-        self.model = AutoModelForCausalLM.from_pretrained(
-            config.MODEL_NAME,
-            trust_remote_code=True,
-            local_files_only=config.MODEL_LOCAL_FILES_ONLY
-        )
-        self.tokenizer = AutoTokenizer.from_pretrained(config.MODEL_NAME, local_files_only=config.MODEL_LOCAL_FILES_ONLY)
-        self.extractor = AutoFeatureExtractor.from_pretrained(config.MODEL_NAME, local_files_only=config.MODEL_LOCAL_FILES_ONLY)
+        self._load_model()
 
-        self.model.eval()
-        self.model.to(config.DEVICE)
-        self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+        self.logger.info(f"✓ Модель загружена на {next(self.model.parameters()).device} ({self.dtype})")
 
-        self.logger.info(f"✓ Модель загружена на {next(self.model.parameters()).device}")
+        # Адаптивный batch size: старт по свободной памяти, откат при OOM
+        self.batch_sizer = AdaptiveBatchSizer(
+            config.BATCH_SIZE,
+            item_memory_bytes=config.BATCH_ITEM_MEMORY_MB * 1024 * 1024,
+            memory_probe=default_memory_probe(self.device),
+            grow_after=config.ADAPTIVE_BATCH_GROW_AFTER,
+            name=self.metrics_name,
+        )
 
-        # CUDA streams
-        self.compute_stream = torch.cuda.default_stream()
-        self.transfer_stream = torch.cuda.Stream()
+        # CUDA streams (на CPU копирование синхронное)
+        self.compute_stream = torch.cuda.default_stream() if self.use_cuda else None
+        self.transfer_stream = torch.cuda.Stream() if self.use_cuda else None
 
-        # Параметры генерации
+        # Параметры генерации (профиль и лимит токенов запроса - см. _request_generation_params)
         self.generation_params = {
-            "max_new_tokens": 350,
+            "max_new_tokens": config.MAX_NEW_TOKENS,
             "do_sample": True,
             "top_p": 0.9,
             "top_k": 50,
@@ -95,49 +134,237 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
             "use_cache": True,
         }
 
+        # Первый generate проверяет, что модель вызывает stopping_criteria (см. _generate_with_backoff)
+        self._stopping_checked = False
+
+        # Статические формы: заранее выделенный KV кэш и фиксированные размеры батча
+        if self.static_shapes:
+            self.generation_params["cache_implementation"] = "static"
+            self.batch_buckets = parse_buckets(config.STATIC_BATCH_BUCKETS, config.BATCH_SIZE)
+            self.recompile_counter = RecompileCounter()
+            self._warmup_static_shapes()
+
+        # Кэш транскрипций чанков (повторные загрузки с небольшими правками)
+        self.chunk_cache = ChunkTranscriptCache(config.CHUNK_CACHE_SIZE, self.metrics_name) if config.CHUNK_CACHE_SIZE else None
+
+        # Проверка пониженной точности на эталонном наборе (после прогрева: тот же путь, что у запросов)
+        if self.dtype != torch.float32 and config.PRECISION_REFERENCE_DIR:
+            self._verify_precision(config.PRECISION_REFERENCE_DIR)
+
+        # Continuous batching: пошаговый декодер, общий для всех запросов.
+        # Ошибка привязки к модели или расхождение с generate останавливают загрузку
+        self.decode_engine = None
+        if config.DECODE_ENGINE == 'continuous':
+            self.decode_engine = self._create_decode_engine()
+        elif config.DECODE_ENGINE != 'generate':
+            raise ValueError(f"Неизвестный DECODE_ENGINE: {config.DECODE_ENGINE} (generate, continuous)")
+
         self.logger.info("✓ BorealisTranscriptionService инициализирован")
         self.logger.info("=" * 80)
 
-    def _find_optimal_cut_points(self, waveform, sr, target_chunk_duration=None, window_duration=5):
-        """Находит оптимальные точки разрезания по энергии"""
-        if target_chunk_duration is None:
-            target_chunk_duration = config.TARGET_CHUNK_DURATION
+    def _load_model(self):
+        """Загружает модель, токенизатор и feature extractor (self.model, self.tokenizer, self.extractor)"""
+        self.logger.info("Загрузка модели Borealis...")
 
-        self.logger.info("Анализ: поиск оптимальных точек разрезания...")
+        revision = config.MODEL_REVISION or None
+        self.model = AutoModelForCausalLM.from_pretrained(
+            self.model_name,
+            revision=revision,
+            trust_remote_code=True,
+            local_files_only=config.MODEL_LOCAL_FILES_ONLY,
+            torch_dtype=self.dtype
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, revision=revision,
+                                                       local_files_only=config.MODEL_LOCAL_FILES_ONLY)
+        self.extractor = AutoFeatureExtractor.from_pretrained(self.model_name, revision=revision,
+                                                              local_files_only=config.MODEL_LOCAL_FILES_ONLY)
 
-        frame_length = 2048
-        hop_length = 512
+        self.model.eval()
+        self.model.to(self.device)
+        self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False,
+                                   dynamic=False if self.static_shapes else None)
 
-        S = librosa.stft(waveform, n_fft=frame_length, hop_length=hop_length)
-        magnitude = np.abs(S)
-        energy = np.sum(magnitude ** 2, axis=0)
-        energy = (energy - np.min(energy)) / (np.max(energy) - np.min(energy) + 1e-10)
+    def memory_footprint(self) -> int:
+        """
+        Память модели для реестра (байт): веса и буферы плюс запас под
+        KV кэш и активации полного батча (BATCH_ITEM_MEMORY_MB на элемент)
+        """
+        tensors = itertools.chain(self.model.parameters(), self.model.buffers())
+        weights = sum(t.numel() * t.element_size() for t in tensors)
+        return weights + self.batch_sizer.item_memory_bytes * self.batch_sizer.max_batch_size
+
+    def unload(self):
+        """Освобождает модель (вызывается реестром моделей при вытеснении)"""
+        if self.decode_engine is not None:
+            self.decode_engine.stop()
+            self.decode_engine = None
+        self._release_model()
+
+    def _release_model(self):
+        """Отпускает веса модели и кэш аллокатора CUDA"""
+        self.model = None
+        gc.collect()
+        if self.use_cuda:
+            torch.cuda.empty_cache()
+
+    @contextmanager
+    def _inference_context(self):
+        """inference_mode и autocast в self.dtype (для fp32 autocast выключен)"""
+        with torch.inference_mode(), torch.autocast(device_type=self.device.split(':')[0], dtype=self.dtype,
+                                                    enabled=self.dtype != torch.float32):
+            yield
+
+    def _create_decode_engine(self):
+        """
+        Движок continuous batching, привязанный к DECODE_ENCODE_METHOD и DECODE_LANGUAGE_MODEL_ATTR.
 
-        def frame_to_time(frame_idx):
-            return (frame_idx * hop_length) / sr
+        Raises:
+            RuntimeError: Модель не предоставляет энкодер или языковую модель,
+                          или вывод движка не совпадает с generate
+            ValueError: Включен STATIC_SHAPES (у движка свой заранее выделенный KV кэш)
+        """
+        if self.static_shapes:
+            raise ValueError("DECODE_ENGINE=continuous несовместим со STATIC_SHAPES")
+        if not config.MODEL_REVISION:
+            self.logger.warning("⚠️  MODEL_REVISION не задан: привязка continuous batching проверена только для текущей ревизии")
+
+        adapter = DecoderAdapter(self.model, config.DECODE_ENCODE_METHOD, config.DECODE_LANGUAGE_MODEL_ATTR)
+
+        repetition = None
+        if config.REPETITION_STOP_ENABLED:
+            repetition = {
+                'max_ngram': config.REPETITION_STOP_MAX_NGRAM,
+                'min_repeats': config.REPETITION_STOP_MIN_REPEATS,
+                'max_token_run': config.REPETITION_STOP_MAX_TOKEN_RUN,
+            }
+
+        max_slots = config.DECODE_MAX_SLOTS or config.BATCH_SIZE
+        engine = ContinuousBatchingEngine(
+            adapter,
+            decode=lambda tokens: self.tokenizer.decode(tokens, skip_special_tokens=True),
+            eos_token_id=self.tokenizer.eos_token_id,
+            max_slots=max_slots,
+            batch_sizer=self.batch_sizer,
+            repetition=repetition,
+            context=self._inference_context,
+            is_oom=self._is_oom_error,
+            name=self.metrics_name,
+        )
 
-        def time_to_frame(time_s):
-            return int((time_s * sr) / hop_length)
+        try:
+            self._verify_decode_engine(engine)
+        except Exception:
+            engine.stop()
+            raise
 
-        total_duration = len(waveform) / sr
-        cut_points = []
+        self.logger.info(f"✓ Continuous batching: {max_slots} слотов")
+        return engine
+
+    def _verify_decode_engine(self, engine, durations=(2, 7, 20)):
+        """
+        Сверяет greedy вывод движка с model.generate на синтетических чанках разной
+        длины (разная длина промпта - проверка дополнения). Допуск - PRECISION_MAX_WER.
+        """
+        rng = np.random.default_rng(0)
+        chunks = []
+        for seconds in durations:
+            t = np.arange(seconds * TARGET_SAMPLE_RATE) / TARGET_SAMPLE_RATE
+            tone = 0.1 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 1.5 * t) > 0)
+            chunks.append((tone + rng.normal(0, 0.01, len(t))).astype(np.float32))
+
+        params = self._request_generation_params('greedy')
+        mel, att_mask = self._prepare_batch_pinned(chunks, 0, len(chunks), TARGET_SAMPLE_RATE)
+        mel, att_mask = mel.to(self.device), att_mask.to(self.device)
+
+        expected = [str(text) for text in self._generate_with_backoff(mel, att_mask, generation_params=params)]
+        actual = [future.result()[0] for future in engine.submit_batch(mel, att_mask, params)]
+
+        mean_wer = sum(word_error_rate(ref, hyp) for ref, hyp in zip(expected, actual)) / len(chunks)
+        if mean_wer > config.PRECISION_MAX_WER:
+            details = "; ".join(f"generate={ref!r} engine={hyp!r}" for ref, hyp in zip(expected, actual))
+            raise RuntimeError(f"Continuous batching расходится с generate (WER {mean_wer:.3f}): {details}")
+
+        self.logger.info(f"✓ Continuous batching совпадает с generate (WER {mean_wer:.3f} на {len(chunks)} чанках)")
+
+    def _warmup_static_shapes(self):
+        """Компилирует и захватывает граф для каждого bucket, чтобы в работе перекомпиляций не было"""
+        self.logger.info(f"Прогрев статических форм: buckets={self.batch_buckets}...")
+        warmup_start = time.time()
+
+        silence = np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32)
+        for size in self.batch_buckets:
+            mel, att_mask = self._prepare_batch_pinned([silence] * size, 0, size, TARGET_SAMPLE_RATE)
+            with self._inference_context():
+                self.model.generate(
+                    mel=mel.to(self.device), att_mask=att_mask.to(self.device),
+                    **self.generation_params
+                )
+
+        self.recompile_counter.mark_warm()
+        self.logger.info(f"✓ Прогрев завершен за {time.time() - warmup_start:.1f}s")
+
+    def _verify_precision(self, reference_dir):
+        """
+        Сравнивает транскрипции в пониженной точности с эталоном fp32.
+        При превышении PRECISION_MAX_WER модель загружается заново в fp32:
+        upcast уже округленных весов точность не возвращает.
+        """
+        self.logger.info(f"Проверка точности {self.dtype} на эталонном наборе {reference_dir}...")
+        passed, mean_wer, per_file = check_reference_set(self, reference_dir, config.PRECISION_MAX_WER)
+
+        for name, wer in per_file.items():
+            self.logger.info(f"  {name}: WER={wer:.3f}")
+
+        if passed:
+            self.logger.info(f"✓ Точность {self.dtype} в норме: WER={mean_wer:.3f} (допуск {config.PRECISION_MAX_WER})")
+            return
+
+        self.logger.error(f"❌ WER={mean_wer:.3f} превышает допуск {config.PRECISION_MAX_WER}, "
+                          f"перезагрузка модели в fp32")
+        self._release_model()
+
+        self.dtype = torch.float32
+        self._load_model()
+        if self.static_shapes:
+            self._warmup_static_shapes()
+
+    def _find_cut_points(self, waveform, sr):
+        """Точки разрезания в режиме config.SEGMENTATION_MODE ('fixed' или 'packed')"""
+        if config.SEGMENTATION_MODE == 'packed':
+            return self._find_packed_cut_points(waveform, sr)
+        return self._find_optimal_cut_points(waveform, sr)
+
+    def _find_packed_cut_points(self, waveform, sr, min_gap_duration=0.5):
+        """
+        Упаковка речи в минимальное число чанков не длиннее окна модели.
+        Границы выбираются среди тихих мест по всему файлу (см. segmentation.pack_segments)
+        """
+        self.logger.info("Анализ: упаковка речи в окна модели...")
+
+        hop_length = 512
+        energy = frame_energy(waveform, hop_length=hop_length)
+
+        max_frames = self.MODEL_WINDOW_SAMPLES * sr // TARGET_SAMPLE_RATE // hop_length
+        min_gap_frames = max(1, int(min_gap_duration * sr / hop_length))
+        cut_frames = pack_segments(energy, max_frames, min_gap_frames)
 
-        for i in range(1, int(total_duration / target_chunk_duration) + 1):
-            target_time = i * target_chunk_duration
-            if target_time >= total_duration:
-                break
+        cut_points = [frame * hop_length / sr for frame in cut_frames]
+        self.logger.info(f"✓ Найдено {len(cut_points)} точек разрезания (окно {self.MODEL_WINDOW_SAMPLES / TARGET_SAMPLE_RATE:.0f}s)")
+        return cut_points
 
-            window_frames = int((window_duration * sr) / hop_length)
-            target_frame = time_to_frame(target_time)
-            start_frame = max(0, target_frame - window_frames // 2)
-            end_frame = min(len(energy), target_frame + window_frames // 2)
+    def _find_optimal_cut_points(self, waveform, sr, target_chunk_duration=None):
+        """
+        Тихие точки разрезания, привязанные к содержимому (см. segmentation.find_anchored_cut_points):
+        обрезка начала записи не сдвигает остальные границы
+        """
+        if target_chunk_duration is None:
+            target_chunk_duration = config.TARGET_CHUNK_DURATION
 
-            window_energy = energy[start_frame:end_frame]
-            min_energy_idx = np.argmin(window_energy)
-            best_frame = start_frame + min_energy_idx
-            best_time = frame_to_time(best_frame)
+        self.logger.info("Анализ: поиск оптимальных точек разрезания...")
 
-            cut_points.append(best_time)
+        max_duration = self.MODEL_WINDOW_SAMPLES / TARGET_SAMPLE_RATE
+        cut_samples = find_anchored_cut_points(waveform, sr, target_chunk_duration, max_duration)
+        cut_points = [sample / sr for sample in cut_samples]
 
         self.logger.info(f"✓ Найдено {len(cut_points)} точек разрезания")
         return cut_points
@@ -148,7 +375,7 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         prev_pos = 0
 
         for best_time in cut_points:
-            cut_sample = int(best_time * sr)
+            cut_sample = int(round(best_time * sr))
             chunk = waveform[prev_pos:cut_sample]
             if len(chunk) > 0:
                 chunks.append(chunk)
@@ -171,20 +398,129 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
 
         for chunk in batch:
             proc = self.extractor(chunk, sampling_rate=sr, padding="max_length",
-                                 max_length=480_000, return_attention_mask=True, return_tensors="pt")
+                                 max_length=self.MODEL_WINDOW_SAMPLES, return_attention_mask=True, return_tensors="pt")
             mel_batch.append(proc.input_features.squeeze(0))
             att_mask_batch.append(proc.attention_mask.squeeze(0))
 
-        mel = torch.stack(mel_batch)
+        # Признаки сразу в dtype модели: в half precision вдвое меньше трафика на GPU
+        mel = torch.stack(mel_batch).to(self.dtype)
         att_mask = torch.stack(att_mask_batch)
 
         # ✅ Зафиксируем в Pinned Memory
-        mel = mel.pin_memory()
-        att_mask = att_mask.pin_memory()
+        if self.use_cuda:
+            mel = mel.pin_memory()
+            att_mask = att_mask.pin_memory()
 
         return mel, att_mask
 
-    def _process_chunks_v4(self, chunks, sr, batch_size=None):
+    def _is_oom_error(self, error):
+        """OOM ошибка устройства (CUDA или CPU аллокатор)"""
+        if isinstance(error, torch.cuda.OutOfMemoryError):
+            return True
+        return isinstance(error, RuntimeError) and 'out of memory' in str(error).lower()
+
+    def _make_stopping_criteria(self, counted_rows=None):
+        """Критерии остановки на один вызов generate (пустой список если отключено)"""
+        if not config.REPETITION_STOP_ENABLED:
+            return StoppingCriteriaList()
+
+        return StoppingCriteriaList([RepetitionStoppingCriteria(
+            prompt_length=self.GENERATE_PROMPT_TOKENS,
+            max_ngram=config.REPETITION_STOP_MAX_NGRAM,
+            min_repeats=config.REPETITION_STOP_MIN_REPEATS,
+            max_token_run=config.REPETITION_STOP_MAX_TOKEN_RUN,
+            ignore_token_ids=(self.tokenizer.eos_token_id, self.tokenizer.pad_token_id),
+            counted_rows=counted_rows,
+        )])
+
+    def _request_generation_params(self, profile=None):
+        """
+        Снимок параметров generate на запрос: DECODING_PROFILE и MAX_NEW_TOKENS могут меняться во время работы.
+        profile - явный профиль декодирования вместо config.DECODING_PROFILE
+        """
+        params = dict(self.generation_params)
+        params.update(DECODING_PROFILES.get(profile or config.DECODING_PROFILE, {}))
+        params["max_new_tokens"] = config.MAX_NEW_TOKENS
+
+        if not params["do_sample"]:
+            for key in ("top_p", "top_k", "temperature"):
+                params.pop(key, None)
+        return params
+
+    def _request_batch_limit(self):
+        """Снимок BATCH_SIZE на запрос (в статическом режиме не больше прогретых buckets)"""
+        batch_limit = config.BATCH_SIZE
+        self.batch_sizer.set_max_batch_size(batch_limit)
+        if self.static_shapes:
+            batch_limit = min(batch_limit, self.batch_buckets[-1])
+        return batch_limit
+
+    def _generate_with_backoff(self, mel, att_mask, stats=None, generation_params=None):
+        """
+        model.generate с откатом при OOM.
+
+        При нехватке памяти батч делится пополам и каждая половина
+        обрабатывается повторно, пока не останется один элемент.
+
+        Args:
+            stats: Необязательный словарь, в 'early_stops' накапливается
+                   количество последовательностей, остановленных на повторах
+            generation_params: Параметры generate (по умолчанию self.generation_params)
+        """
+        if generation_params is None:
+            generation_params = self.generation_params
+
+        batch_len = mel.shape[0]
+        stopping_criteria = self._make_stopping_criteria(batch_len)
+
+        # Статический режим: дополняем батч до ближайшего bucket
+        gen_mel, gen_att_mask = mel, att_mask
+        if self.static_shapes:
+            padded_len = bucket_for(batch_len, self.batch_buckets)
+            gen_mel = pad_batch(mel, padded_len)
+            gen_att_mask = pad_batch(att_mask, padded_len)
+
+        try:
+            with self._inference_context():
+                transcripts = self.model.generate(
+                    mel=gen_mel, att_mask=gen_att_mask,
+                    stopping_criteria=stopping_criteria,
+                    **generation_params
+                )
+        except Exception as e:
+            if not self._is_oom_error(e) or batch_len <= 1:
+                raise
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            self.batch_sizer.on_oom(batch_len)
+
+            half = batch_len // 2
+            return (self._generate_with_backoff(mel[:half], att_mask[:half], stats, generation_params) +
+                    self._generate_with_backoff(mel[half:], att_mask[half:], stats, generation_params))
+
+        if not self._stopping_checked and stopping_criteria:
+            # Модель может не передавать stopping_criteria в свой generate: тогда ранней остановки нет
+            self._stopping_checked = True
+            if not all(criteria.calls for criteria in stopping_criteria):
+                self.logger.warning("⚠️  Критерий остановки на повторах не вызывался в generate: "
+                                    "модель не поддерживает stopping_criteria")
+            else:
+                self.logger.info("✓ Критерий остановки на повторах работает в generate")
+
+        early_stops = sum(criteria.early_stops for criteria in stopping_criteria)
+        if early_stops:
+            metrics.inc('early_stops_total', early_stops)
+            if stats is not None:
+                stats['early_stops'] = stats.get('early_stops', 0) + early_stops
+
+        if self.static_shapes:
+            self.recompile_counter.update()
+
+        self.batch_sizer.on_success(batch_len)
+        return list(transcripts)[:batch_len]
+
+    def _process_chunks_v4(self, chunks, sr, batch_size=None, on_batch=None, stats=None, generation_params=None):
         """
         Оптимизированная асинхронная обработка v4.0
 
@@ -192,15 +528,55 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         ✅ Pinned Memory
         ✅ Асинхронное копирование
         ✅ GPU + CPU параллельно
+
+        Args:
+            batch_size: Фиксированный размер батча. По умолчанию используется
+                        адаптивный размер self.batch_sizer, он может меняться между батчами
+            on_batch: Необязательный callback, вызывается из GPU потока после
+                      каждого батча со списком [(индекс чанка, текст), ...]
+            stats: Необязательный словарь статистики (см. _generate_with_backoff)
+            generation_params: Параметры generate (по умолчанию _request_generation_params())
         """
-        if batch_size is None:
-            batch_size = config.BATCH_SIZE
+        fixed_batch_size = batch_size
+
+        # Снимок настроек: изменения через admin API применяются к следующим запросам
+        batch_limit = fixed_batch_size or self._request_batch_limit()
+        if generation_params is None:
+            generation_params = self._request_generation_params()
 
         results = []
         results_lock = threading.Lock()
-        batch_queue = Queue(maxsize=2)
+        batch_queue = Queue(maxsize=config.PREFETCH_BATCHES)
         stop_event = threading.Event()
 
+        # Continuous batching: батчи, отправленные в decode engine [(индексы, futures), ...],
+        # и первая ошибка движка - она пробрасывается запросу после обработки очереди
+        pending = []
+        engine_errors = []
+
+        def collect_pending(wait):
+            """Забирает результаты батчей decode engine по порядку (все или только готовые)"""
+            while pending and (wait or all(future.done() for future in pending[0][1])):
+                batch_indices, batch_futures = pending.pop(0)
+                try:
+                    outputs = [future.result() for future in batch_futures]
+                except Exception as e:
+                    engine_errors.append(e)
+                    continue
+
+                early_stops = sum(stopped for _, stopped in outputs)
+                if early_stops:
+                    metrics.inc('early_stops_total', early_stops)
+                    if stats is not None:
+                        stats['early_stops'] = stats.get('early_stops', 0) + early_stops
+
+                batch_results = [(idx, text) for idx, (text, _) in zip(batch_indices, outputs)]
+                with results_lock:
+                    results.extend(batch_results)
+
+                if on_batch is not None:
+                    on_batch(batch_results)
+
         def gpu_worker():
             """Поток обработки GPU"""
             try:
@@ -208,28 +584,46 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
                     try:
                         item = batch_queue.get(timeout=1)
                         if item is None:
+                            collect_pending(wait=True)
                             break
 
                         mel, att_mask, batch_indices = item
-
-                        # Асинхронное копирование в отдельном stream
-                        with torch.cuda.stream(self.transfer_stream):
-                            mel = mel.to("cuda", non_blocking=True)
-                            att_mask = att_mask.to("cuda", non_blocking=True)
-
-                        # Синхронизируем
-                        self.transfer_stream.synchronize()
-
-                        # Обработка на GPU
-                        with torch.inference_mode():
-                            transcripts = self.model.generate(
-                                mel=mel, att_mask=att_mask,
-                                **self.generation_params
-                            )
-
+                        if engine_errors:
+                            # Запрос уже завершится ошибкой: остальные батчи только вычитываются из очереди
+                            continue
+
+                        if self.use_cuda:
+                            # Асинхронное копирование в отдельном stream
+                            with torch.cuda.stream(self.transfer_stream):
+                                mel = mel.to(self.device, non_blocking=True)
+                                att_mask = att_mask.to(self.device, non_blocking=True)
+
+                            # Синхронизируем
+                            self.transfer_stream.synchronize()
+                        else:
+                            mel = mel.to(self.device)
+                            att_mask = att_mask.to(self.device)
+
+                        if self.decode_engine is not None:
+                            # Чанки уходят в общий декодер, не дожидаясь завершения предыдущих
+                            try:
+                                batch_futures = self.decode_engine.submit_batch(mel, att_mask, generation_params)
+                            except Exception as e:
+                                engine_errors.append(e)
+                                continue
+                            pending.append((batch_indices, batch_futures))
+                            collect_pending(wait=False)
+                            continue
+
+                        # Обработка на GPU (с делением батча при OOM)
+                        transcripts = self._generate_with_backoff(mel, att_mask, stats, generation_params)
+
+                        batch_results = [(idx, str(transcript)) for idx, transcript in zip(batch_indices, transcripts)]
                         with results_lock:
-                            for idx, transcript in zip(batch_indices, transcripts):
-                                results.append((idx, str(transcript)))
+                            results.extend(batch_results)
+
+                        if on_batch is not None:
+                            on_batch(batch_results)
 
                     except Exception as e:
                         self.logger.error(f"GPU worker ошибка: {e}")
@@ -241,10 +635,15 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         gpu_thread.start()
 
         # ========== MAIN LOOP (CPU) ==========
+        batch_size = fixed_batch_size or min(self.batch_sizer.current, batch_limit)
         self.logger.info(f"Обработка: v4.0 - Асинхронная обработка {len(chunks)} кусков")
         self.logger.info(f"           Batch Size: {batch_size} | Pinned Memory ✓ | GPU + CPU параллельно ⚡")
 
-        for batch_start_idx in range(0, len(chunks), batch_size):
+        batch_start_idx = 0
+        while batch_start_idx < len(chunks):
+            # Размер батча может уменьшиться после OOM или вырасти после серии успехов
+            batch_size = fixed_batch_size or min(self.batch_sizer.current, batch_limit)
+
             # CPU подготавливает батч пока GPU работает
             mel, att_mask = self._prepare_batch_pinned(chunks, batch_start_idx, batch_size, sr)
             batch_indices = list(range(batch_start_idx, min(batch_start_idx + batch_size, len(chunks))))
@@ -257,15 +656,78 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
             progress = (processed / len(chunks)) * 100
             self.logger.info(f"  Прогресс: {processed}/{len(chunks)} ({progress:.0f}%)")
 
+            batch_start_idx += batch_size
+
         # Завершение
         batch_queue.put(None)
         gpu_thread.join()
 
+        if engine_errors:
+            raise engine_errors[0]
+
+        if len(results) != len(chunks):
+            self.logger.error(f"❌ Потеряно {len(chunks) - len(results)} из {len(chunks)} кусков")
+
+        # Счетчики пропускной способности (admin API сравнивает их до и после изменения настроек)
+        processed = {idx for idx, _ in results}
+        metrics.inc('chunks_processed_total', len(processed))
+        metrics.inc('audio_seconds_processed_total', sum(len(chunks[idx]) for idx in processed) / sr)
+
         # Сортируем результаты в правильном порядке
         results.sort(key=lambda x: x[0])
         return [text for _, text in results]
 
-    def _transcribe_audio_file(self, audio_path):
+    def _process_chunks_cached(self, chunks, sr, on_batch=None, stats=None):
+        """
+        _process_chunks_v4 через кэш транскрипций чанков.
+
+        В модель уходят только чанки, отпечатка которых нет в кэше.
+        on_batch получает и результаты из кэша (одним вызовом до обработки).
+        В stats накапливаются 'cache_hits' и 'cache_chunks'.
+
+        Ключ - отпечаток чанка вместе с моделью, точностью и параметрами
+        generate: после смены профиля или MAX_NEW_TOKENS старые тексты не используются.
+        """
+        generation_params = self._request_generation_params()
+        if self.chunk_cache is None:
+            return self._process_chunks_v4(chunks, sr, on_batch=on_batch, stats=stats,
+                                           generation_params=generation_params)
+
+        decode_key = (self.model_name, str(self.dtype), tuple(sorted(generation_params.items())))
+        keys = [(decode_key, chunk_fingerprint(chunk)) for chunk in chunks]
+        texts = {}
+        for idx, key in enumerate(keys):
+            text = self.chunk_cache.get(key)
+            if text is not None:
+                texts[idx] = text
+
+        if stats is not None:
+            stats['cache_hits'] = stats.get('cache_hits', 0) + len(texts)
+            stats['cache_chunks'] = stats.get('cache_chunks', 0) + len(chunks)
+
+        if texts:
+            self.logger.info(f"🗃️  Кэш чанков: {len(texts)}/{len(chunks)} без обработки моделью")
+            if on_batch is not None:
+                on_batch(sorted(texts.items()))
+
+        todo = [idx for idx in range(len(chunks)) if idx not in texts]
+        if todo:
+            def on_todo_batch(batch_results):
+                # Индексы батча относятся к списку todo
+                batch_results = [(todo[i], text) for i, text in batch_results]
+                for idx, text in batch_results:
+                    self.chunk_cache.put(keys[idx], text)
+                texts.update(batch_results)
+
+                if on_batch is not None:
+                    on_batch(batch_results)
+
+            self._process_chunks_v4([chunks[idx] for idx in todo], sr, on_batch=on_todo_batch, stats=stats,
+                                    generation_params=generation_params)
+
+        return [texts[idx] for idx in range(len(chunks)) if idx in texts]
+
+    def _transcribe_audio_file(self, audio_path, stats=None):
         """
         Полная обработка аудио файла с использованием Borealis модели
 
@@ -282,14 +744,46 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         load_start = time.time()
 
         waveform, sr = librosa.load(audio_path, sr=16_000)
-        total_duration = len(waveform) / sr
         load_time = time.time() - load_start
 
+        return self._transcribe_waveform(waveform, sr, load_time, transcription_start, stats)
+
+    def _transcribe_reference(self, audio_path):
+        """
+        Транскрипция файла эталонного набора точности (см. precision.py).
+
+        Greedy декодирование и без кэша чанков: результат детерминирован,
+        поэтому WER против эталона отражает точность, а не шум сэмплирования.
+        """
+        waveform, sr = librosa.load(audio_path, sr=16_000)
+        chunks = self._split_audio_by_cut_points(waveform, sr, self._find_cut_points(waveform, sr))
+        results = self._process_chunks_v4(chunks, sr, generation_params=self._request_generation_params('greedy'))
+        return " ".join(results)
+
+    def _transcribe_waveform(self, waveform, sr, load_time=0.0, transcription_start=None, stats=None):
+        """
+        Транскрипция уже декодированного waveform
+
+        Args:
+            waveform: Одномерный массив float32
+            sr: Частота дискретизации (16 кHz)
+            load_time: Время, затраченное на загрузку/декодирование
+            transcription_start: Время начала обработки (для статистики)
+            stats: Необязательный словарь статистики обработки (ранние остановки, попадания в кэш)
+
+        Returns:
+            Транскрипция текста
+        """
+        if transcription_start is None:
+            transcription_start = time.time() - load_time
+
+        total_duration = len(waveform) / sr
+
         self.logger.info(f"✓ Загружено {total_duration:.1f}s за {load_time:.2f}s")
 
         # Анализ и разрезание
         analysis_start = time.time()
-        cut_points = self._find_optimal_cut_points(waveform, sr)
+        cut_points = self._find_cut_points(waveform, sr)
         chunks = self._split_audio_by_cut_points(waveform, sr, cut_points)
         analysis_time = time.time() - analysis_start
 
@@ -297,7 +791,8 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
 
         # Обработка
         process_start = time.time()
-        results = self._process_chunks_v4(chunks, sr)
+        process_stats = stats if stats is not None else {}
+        results = self._process_chunks_cached(chunks, sr, stats=process_stats)
         process_time = time.time() - process_start
 
         full_transcript = " ".join(results)
@@ -309,7 +804,7 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         total_time = time.time() - transcription_start
         words = len(full_transcript.split())
         chars = len(full_transcript)
-        gpu_mem = torch.cuda.memory_allocated() / 1e9
+        gpu_mem = torch.cuda.memory_allocated() / 1e9 if self.use_cuda else 0.0
 
         self.logger.info("=" * 80)
         self.logger.info("РЕЗУЛЬТАТ v4.0 FULLY OPTIMIZED")
@@ -317,10 +812,72 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         self.logger.info(f"⏱️  Время: Загрузка={load_time:.2f}s | Анализ={analysis_time:.2f}s | Транскрипция={process_time:.2f}s | ИТОГО={total_time:.2f}s")
         self.logger.info(f"📊 Текст: Символов={chars} | Слов={words} | Скорость={total_duration/total_time:.1f}x")
         self.logger.info(f"💾 GPU: Использовано={gpu_mem:.2f}GB")
+        self.logger.info(f"🔁 Ранние остановки на повторах: {process_stats.get('early_stops', 0)}/{len(chunks)} кусков")
+        self.logger.info(f"🗃️  Из кэша: {process_stats.get('cache_hits', 0)}/{len(chunks)} кусков")
         self.logger.info("=" * 80)
 
         return full_transcript
 
+    def _transcribe_raw_pcm(self, audio_data, format_type, sample_rate, stats=None):
+        """
+        Быстрый путь: сырой PCM без временного файла и librosa.load
+
+        Returns:
+            Кортеж (transcript, audio_duration)
+        """
+        transcription_start = time.time()
+
+        self.logger.info(f"⚡ Сырой PCM ({format_type}, {sample_rate} Гц) - без временного файла")
+        waveform = decode_raw_pcm(audio_data, format_type, sample_rate)
+        load_time = time.time() - transcription_start
+
+        transcript = self._transcribe_waveform(waveform, TARGET_SAMPLE_RATE, load_time, transcription_start, stats)
+        return transcript, len(waveform) / TARGET_SAMPLE_RATE
+
+    def _set_cache_metadata(self, context, stats):
+        """
+        Доля чанков из кэша в trailing metadata ответа
+        (в TranscriptionResponse для нее нет поля)
+        """
+        if context is None or not stats.get('cache_chunks'):
+            return
+
+        hit_ratio = stats['cache_hits'] / stats['cache_chunks']
+        context.set_trailing_metadata((
+            ('chunk-cache-hits', str(stats['cache_hits'])),
+            ('chunk-cache-chunks', str(stats['cache_chunks'])),
+            ('chunk-cache-hit-ratio', f"{hit_ratio:.4f}"),
+        ))
+
+    def _validate_audio_request(self, filename, audio_data, format_type, sample_rate):
+        """Валидация аудио запроса: сырой PCM по формату и частоте, контейнеры - по имени и данным"""
+        if is_raw_pcm_format(format_type):
+            return validate_raw_pcm(audio_data, format_type, sample_rate)
+        return self._validate_transcription_request(filename, audio_data)
+
+    def _open_local_reference(self, context, metadata):
+        """
+        Открывает аудио по локальной ссылке (metadata audio-path / shm-name).
+
+        Ссылки принимаются только от клиентов на Unix socket: на TCP порту и
+        для путей вне LOCAL_AUDIO_ALLOWED_DIRS запрос отклоняется с PERMISSION_DENIED.
+
+        Returns:
+            Кортеж (путь, содержимое файла через mmap)
+
+        Raises:
+            FileNotFoundError, ValueError: См. local_audio.resolve_local_audio
+        """
+        try:
+            check_local_peer(context.peer())
+            path = resolve_local_audio(get_local_reference(metadata),
+                                       parse_allowed_dirs(config.LOCAL_AUDIO_ALLOWED_DIRS))
+        except PermissionError as e:
+            context.abort(grpc.StatusCode.PERMISSION_DENIED, str(e))
+
+        metrics.inc('local_audio_requests_total')
+        return path, map_file(path)
+
     def TranscribeAudio(self, request, context):
         """
         Принимает аудио файл и возвращает транскрипцию.
@@ -334,14 +891,36 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
         """
         start_time = time.time()
 
+        audio_data = request.audio_data
+        filename = request.filename
+        local_path = None
+        reference_error = None
+
+        # Пустой audio_data: аудио передано ссылкой на локальный файл или shared memory
+        if not audio_data and context is not None:
+            metadata = context.invocation_metadata()
+            if any(key in LOCAL_REFERENCE_KEYS for key, _ in metadata or ()):
+                try:
+                    local_path, audio_data = self._open_local_reference(context, metadata)
+                    filename = filename or local_path.name
+                except (FileNotFoundError, ValueError) as e:
+                    reference_error = f"Ошибка ссылки на локальное аудио: {e}"
+
         self.logger.info("=" * 80)
-        self.logger.info(f"📥 Получен запрос на транскрипцию файла: {request.filename}")
-        self.logger.info(f"   Размер файла: {len(request.audio_data) / (1024*1024):.2f} МБ")
+        self.logger.info(f"📥 Получен запрос на транскрипцию файла: {filename}")
+        if local_path is not None:
+            self.logger.info(f"   📎 Аудио по ссылке: {local_path}")
+        self.logger.info(f"   Размер файла: {len(audio_data) / (1024*1024):.2f} МБ")
         self.logger.info(f"   Формат: {request.format}")
         self.logger.info("=" * 80)
 
         # Валидация запроса
-        is_valid, error_msg = self._validate_transcription_request(request.filename, request.audio_data)
+        raw_pcm = is_raw_pcm_format(request.format)
+        sample_rate = sample_rate_from_metadata(context.invocation_metadata() if context else None) if raw_pcm else 0
+        if reference_error is not None:
+            is_valid, error_msg = False, reference_error
+        else:
+            is_valid, error_msg = self._validate_audio_request(filename, audio_data, request.format, sample_rate)
 
         if not is_valid:
             self.logger.error(f"❌ Ошибка валидации: {error_msg}")
@@ -361,30 +940,43 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
             )
 
         # Транскрипция с использованием Borealis модели
+        request_stats = {}
         try:
-            # Сохраняем аудио во временный файл
-            with tempfile.NamedTemporaryFile(suffix=f".{request.format}", delete=False) as temp_file:
-                temp_file.write(request.audio_data)
-                temp_audio_path = temp_file.name
-
-            self.logger.info(f"💾 Временный файл создан: {temp_audio_path}")
-
-            # Запускаем транскрипцию с использованием интегрированной логики
-            transcript = self._transcribe_audio_file(temp_audio_path)
-
-            # Вычисляем длительность для статистики
-            waveform, sr = librosa.load(temp_audio_path, sr=16_000)
-            audio_duration = len(waveform) / sr
-
-            # Удаляем временный файл
-            try:
-                Path(temp_audio_path).unlink()
-                self.logger.info(f"🗑️  Временный файл удален")
-            except Exception as e:
-                self.logger.warning(f"⚠️  Не удалось удалить временный файл: {e}")
+            if raw_pcm:
+                # Для локальной ссылки audio_data - mmap файла, PCM интерпретируется без копирования
+                transcript, audio_duration = self._transcribe_raw_pcm(
+                    audio_data, request.format, sample_rate, request_stats
+                )
+            elif local_path is not None:
+                # Локальный файл читается librosa прямо с диска, без временного файла
+                transcript = self._transcribe_audio_file(str(local_path), request_stats)
+                waveform, sr = librosa.load(str(local_path), sr=16_000)
+                audio_duration = len(waveform) / sr
+            else:
+                # Сохраняем аудио во временный файл
+                with tempfile.NamedTemporaryFile(suffix=f".{request.format}", delete=False) as temp_file:
+                    temp_file.write(audio_data)
+                    temp_audio_path = temp_file.name
+
+                self.logger.info(f"💾 Временный файл создан: {temp_audio_path}")
+
+                # Запускаем транскрипцию с использованием интегрированной логики
+                transcript = self._transcribe_audio_file(temp_audio_path, request_stats)
+
+                # Вычисляем длительность для статистики
+                waveform, sr = librosa.load(temp_audio_path, sr=16_000)
+                audio_duration = len(waveform) / sr
+
+                # Удаляем временный файл
+                try:
+                    Path(temp_audio_path).unlink()
+                    self.logger.info(f"🗑️  Временный файл удален")
+                except Exception as e:
+                    self.logger.warning(f"⚠️  Не удалось удалить временный файл: {e}")
 
             if transcript is None or transcript == "":
                 raise Exception("Транскрипция вернула пустой результат")
+            self._set_cache_metadata(context, request_stats)
 
             processing_time = time.time() - start_time
             word_count = len(transcript.split())
@@ -480,7 +1072,10 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
             self.logger.info(f"✓ Получено {chunk_count} чанков, всего {actual_size / (1024*1024):.2f} МБ")
 
             # Валидация
-            is_valid, error_msg = self._validate_transcription_request(filename, audio_data)
+            raw_pcm = is_raw_pcm_format(format_type)
+            if raw_pcm:
+                sample_rate = sample_rate_from_metadata(context.invocation_metadata() if context else None, sample_rate)
+            is_valid, error_msg = self._validate_audio_request(filename, audio_data, format_type, sample_rate)
 
             if not is_valid:
                 self.logger.error(f"❌ Ошибка валидации: {error_msg}")
@@ -500,29 +1095,34 @@ class BorealisTranscriptionService(TranscriptionServiceBase, transcription_pb2_g
                 )
 
             # Транскрипция с использованием Borealis модели
-            # Сохраняем аудио во временный файл
-            with tempfile.NamedTemporaryFile(suffix=f".{format_type}", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_audio_path = temp_file.name
-
-            self.logger.info(f"💾 Временный файл создан: {temp_audio_path}")
-
-            # Запускаем транскрипцию с использованием интегрированной логики
-            transcript = self._transcribe_audio_file(temp_audio_path)
-
-            # Вычисляем длительность для статистики
-            waveform, sr = librosa.load(temp_audio_path, sr=16_000)
-            audio_duration = len(waveform) / sr
-
-            # Удаляем временный файл
-            try:
-                Path(temp_audio_path).unlink()
-                self.logger.info(f"🗑️  Временный файл удален")
-            except Exception as e:
-                self.logger.warning(f"⚠️  Не удалось удалить временный файл: {e}")
+            request_stats = {}
+            if raw_pcm:
+                transcript, audio_duration = self._transcribe_raw_pcm(audio_data, format_type, sample_rate, request_stats)
+            else:
+                # Сохраняем аудио во временный файл
+                with tempfile.NamedTemporaryFile(suffix=f".{format_type}", delete=False) as temp_file:
+                    temp_file.write(audio_data)
+                    temp_audio_path = temp_file.name
+
+                self.logger.info(f"💾 Временный файл создан: {temp_audio_path}")
+
+                # Запускаем транскрипцию с использованием интегрированной логики
+                transcript = self._transcribe_audio_file(temp_audio_path, request_stats)
+
+                # Вычисляем длительность для статистики
+                waveform, sr = librosa.load(temp_audio_path, sr=16_000)
+                audio_duration = len(waveform) / sr
+
+                # Удаляем временный файл
+                try:
+                    Path(temp_audio_path).unlink()
+                    self.logger.info(f"🗑️  Временный файл удален")
+                except Exception as e:
+                    self.logger.warning(f"⚠️  Не удалось удалить временный файл: {e}")
 
             if transcript is None or transcript == "":
                 raise Exception("Транскрипция вернула пустой результат")
+            self._set_cache_metadata(context, request_stats)
 
             processing_time = time.time() - start_time
             word_count = len(transcript.split())
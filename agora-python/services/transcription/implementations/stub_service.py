@@ -0,0 +1,50 @@
+"""
+Stub реализация TranscriptionService для нагрузочного тестирования.
+
+Использует весь конвейер Borealis (декодирование, нарезка, батчи, очереди),
+но вместо модели - заглушка, которая "декодирует" батч за фиксированное
+время. Не требует весов модели и GPU.
+"""
+
+import time
+from types import SimpleNamespace
+
+import torch
+from transformers import WhisperFeatureExtractor
+
+from services.transcription.implementations.borealis_service import BorealisTranscriptionService
+from resources.config import config
+
+
+class _StubModel(torch.nn.Module):
+    """Заглушка модели с интерфейсом generate(mel, att_mask, ...)"""
+
+    def __init__(self, batch_seconds, item_seconds):
+        super().__init__()
+        # Параметр нужен, чтобы model.parameters() и .to() работали как у настоящей модели
+        self.dummy = torch.nn.Parameter(torch.zeros(1), requires_grad=False)
+        self.batch_seconds = batch_seconds
+        self.item_seconds = item_seconds
+
+    def generate(self, mel, att_mask=None, **kwargs):
+        batch_len = mel.shape[0]
+        time.sleep(self.batch_seconds + self.item_seconds * batch_len)
+        return ["стаб транскрипция чанка"] * batch_len
+
+
+class StubTranscriptionService(BorealisTranscriptionService):
+    """
+    TranscriptionService без модели: для нагрузочных тестов gRPC слоя и конвейера.
+
+    Время "декодирования" батча: STUB_BATCH_SECONDS + STUB_ITEM_SECONDS * размер батча.
+    """
+
+    def _load_model(self):
+        self.logger.info("Загрузка stub модели (без весов)...")
+        self.model = _StubModel(config.STUB_BATCH_SECONDS, config.STUB_ITEM_SECONDS).to(self.device)
+        self.tokenizer = SimpleNamespace(eos_token_id=None, pad_token_id=None)
+        self.extractor = WhisperFeatureExtractor()
+
+    def get_version(self) -> str:
+        """Возвращает версию сервиса"""
+        return "stub"
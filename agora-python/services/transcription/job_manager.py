@@ -0,0 +1,142 @@
+"""
+Менеджер асинхронных задач транскрипции.
+
+Длинные файлы больше не держат открытым унарный gRPC вызов:
+клиент отправляет задачу (submit), опрашивает статус (poll)
+и забирает результат (fetch). Транскрипции чанков сохраняются
+в JobStore после каждого батча _process_chunks_v4, поэтому
+после падения задача продолжается с последнего готового чанка.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from queue import Queue
+
+import librosa
+
+from resources.config import config
+from services.transcription.job_store import JobStore
+from services.transcription.raw_audio import TARGET_SAMPLE_RATE, decode_raw_pcm, is_raw_pcm_format
+
+
+def segmentation_fingerprint(mode, cut_points):
+    """Отпечаток разбиения на чанки: режим сегментации и точки разрезания (сек)"""
+    spec = json.dumps([mode, [round(point, 6) for point in cut_points]])
+    return hashlib.sha256(spec.encode('utf-8')).hexdigest()
+
+
+class TranscriptionJobManager:
+    """
+    Выполняет задачи из JobStore в одном фоновом потоке.
+
+    Один поток, потому что задачи делят GPU конвейер реализаций сервиса.
+    """
+
+    def __init__(self, registry, store: JobStore):
+        """
+        Args:
+            registry: Реестр моделей (ModelRegistry), модель задачи выбирается по имени
+            store: Хранилище задач
+        """
+        self.registry = registry
+        self.store = store
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._worker, name="job-worker", daemon=True)
+
+    def start(self):
+        """Запускает фоновый поток и возобновляет незавершенные задачи"""
+        unfinished = self.store.get_unfinished_jobs()
+        if unfinished:
+            self.logger.info(f"♻️  Возобновление {len(unfinished)} незавершенных задач")
+        for job_id in unfinished:
+            self._queue.put(job_id)
+
+        self._thread.start()
+
+    def stop(self):
+        self._queue.put(None)
+
+    def submit(self, audio_data, filename, format_type, sample_rate=0, model=None):
+        """Создает задачу и ставит ее в очередь. Возвращает job_id"""
+        if model is not None and model not in self.registry.names:
+            raise KeyError(model)
+
+        job_id = self.store.create_job(audio_data, filename, format_type, sample_rate, model)
+        self._queue.put(job_id)
+        self.logger.info(f"📝 Задача {job_id} создана: {filename} ({len(audio_data) / (1024*1024):.2f} МБ)")
+        return job_id
+
+    def get_job(self, job_id):
+        return self.store.get_job(job_id)
+
+    def _load_waveform(self, job):
+        audio_path = Path(job['audio_path'])
+        if is_raw_pcm_format(job['format']):
+            return decode_raw_pcm(audio_path.read_bytes(), job['format'],
+                                  job['sample_rate'] or TARGET_SAMPLE_RATE)
+        waveform, _ = librosa.load(str(audio_path), sr=TARGET_SAMPLE_RATE)
+        return waveform
+
+    def _run_job(self, job_id):
+        job = self.store.get_job(job_id)
+        if job is None:
+            return
+
+        with self.registry.acquire(job['model']) as service:
+            self._run_job_with_service(job, service)
+
+    def _run_job_with_service(self, job, service):
+        job_id = job['job_id']
+        sr = TARGET_SAMPLE_RATE
+        waveform = self._load_waveform(job)
+
+        # Сохраненные тексты относятся к чанкам прошлого запуска: они переиспользуются,
+        # только если разбиение (режим и точки разрезания) совпадает полностью
+        cut_points = service._find_cut_points(waveform, sr)
+        chunks = service._split_audio_by_cut_points(waveform, sr, cut_points)
+        segmentation = segmentation_fingerprint(config.SEGMENTATION_MODE, cut_points)
+
+        if job['chunk_count'] is not None and job['segmentation'] != segmentation:
+            # Режим или параметры сегментации изменились после перезапуска - прежние чанки не совпадают
+            self.logger.warning(f"⚠️  Задача {job_id}: сегментация изменилась, обработка заново")
+            self.store.clear_chunks(job_id)
+        self.store.mark_running(job_id, len(chunks), len(waveform) / sr, segmentation)
+
+        done = self.store.get_chunks(job_id)
+        todo = [idx for idx in range(len(chunks)) if idx not in done]
+
+        if done:
+            self.logger.info(f"▶️  Задача {job_id}: продолжение с {len(done)}/{len(chunks)} готовых чанков")
+
+        if todo:
+            def on_batch(batch_results):
+                # Индексы батча относятся к списку todo
+                self.store.save_chunks(job_id, [(todo[i], text) for i, text in batch_results])
+
+            service._process_chunks_cached([chunks[idx] for idx in todo], sr, on_batch=on_batch)
+            done = self.store.get_chunks(job_id)
+
+        missing = len(chunks) - len(done)
+        if missing:
+            raise RuntimeError(f"Не обработано {missing} из {len(chunks)} чанков")
+
+        transcript = " ".join(done[idx] for idx in range(len(chunks)))
+        self.store.mark_done(job_id, transcript)
+        self.logger.info(f"✅ Задача {job_id} завершена")
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                self.logger.error(f"❌ Задача {job_id}: {e}")
+                self.store.mark_failed(job_id, str(e))
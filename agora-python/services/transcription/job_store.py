@@ -0,0 +1,166 @@
+"""
+Персистентное хранилище асинхронных задач транскрипции (SQLite).
+
+Хранит задачи, исходное аудио и транскрипцию каждого чанка по мере
+завершения батчей. После перезапуска сервера незавершенные задачи
+продолжаются с последнего готового чанка.
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+# Статусы задач
+JOB_QUEUED = 'QUEUED'
+JOB_RUNNING = 'RUNNING'
+JOB_DONE = 'DONE'
+JOB_FAILED = 'FAILED'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    format TEXT NOT NULL,
+    sample_rate INTEGER NOT NULL DEFAULT 0,
+    model TEXT,
+    audio_path TEXT NOT NULL,
+    chunk_count INTEGER,
+    segmentation TEXT,
+    audio_duration REAL,
+    transcript TEXT,
+    error_message TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    chunk_idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (job_id, chunk_idx)
+);
+"""
+
+
+class JobStore:
+    """
+    Потокобезопасное SQLite хранилище задач.
+
+    Аудио каждой задачи сохраняется в storage_dir, чтобы задачу
+    можно было продолжить после перезапуска процесса.
+    """
+
+    def __init__(self, db_path, storage_dir):
+        self.db_path = Path(db_path)
+        self.storage_dir = Path(storage_dir)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+            # Базы, созданные до появления реестра моделей
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if 'model' not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN model TEXT")
+            if 'segmentation' not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN segmentation TEXT")
+
+    def create_job(self, audio_data, filename, format_type, sample_rate=0, model=None):
+        """Сохраняет аудио и создает задачу в статусе QUEUED. Возвращает job_id"""
+        job_id = uuid.uuid4().hex
+        suffix = f".{format_type.lstrip('.')}" if format_type else ""
+        audio_path = self.storage_dir / f"{job_id}{suffix}"
+        audio_path.write_bytes(audio_data)
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, filename, format, sample_rate, model, audio_path, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, filename, format_type, sample_rate, model, str(audio_path), now, now)
+            )
+        return job_id
+
+    def get_job(self, job_id):
+        """Возвращает задачу (dict) с количеством готовых чанков или None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            chunks_done = self._conn.execute(
+                "SELECT COUNT(*) FROM job_chunks WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+
+        job = dict(row)
+        job['chunks_done'] = chunks_done
+        return job
+
+    def get_unfinished_jobs(self):
+        """Задачи, которые нужно (до)обработать, в порядке создания"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [row['job_id'] for row in rows]
+
+    def mark_running(self, job_id, chunk_count, audio_duration, segmentation=None):
+        """segmentation - отпечаток разбиения на чанки (режим и точки разрезания)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, chunk_count = ?, segmentation = ?, audio_duration = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (JOB_RUNNING, chunk_count, segmentation, audio_duration, time.time(), job_id)
+            )
+
+    def save_chunks(self, job_id, chunk_results):
+        """Сохраняет транскрипции чанков [(chunk_idx, text), ...] одной транзакцией"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_chunks (job_id, chunk_idx, text) VALUES (?, ?, ?)",
+                [(job_id, idx, text) for idx, text in chunk_results]
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (time.time(), job_id))
+
+    def clear_chunks(self, job_id):
+        """Удаляет сохраненные транскрипции чанков задачи"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def get_chunks(self, job_id):
+        """Возвращает {chunk_idx: text} для готовых чанков"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_idx, text FROM job_chunks WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {row['chunk_idx']: row['text'] for row in rows}
+
+    def mark_done(self, job_id, transcript):
+        """Завершает задачу и удаляет сохраненное аудио"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT audio_path FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, transcript = ?, updated_at = ? WHERE job_id = ?",
+                (JOB_DONE, transcript, time.time(), job_id)
+            )
+        if row is not None:
+            Path(row['audio_path']).unlink(missing_ok=True)
+
+    def mark_failed(self, job_id, error_message):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error_message = ?, updated_at = ? WHERE job_id = ?",
+                (JOB_FAILED, error_message, time.time(), job_id)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,115 @@
+"""
+Локальная загрузка аудио по ссылке вместо передачи байтов.
+
+Клиент на том же хосте (например, Java gateway через Unix socket)
+отправляет AudioRequest с пустым audio_data и ссылкой в gRPC metadata:
+
+    audio-path: абсолютный путь к файлу
+    shm-name:   имя POSIX shared memory сегмента (файл /dev/shm/<имя>)
+
+Сырой PCM отображается в память (mmap) и интерпретируется без копирования
+(см. raw_audio.decode_raw_pcm), контейнерные форматы читаются librosa
+прямо с диска - без временного файла. Валидация и логирование те же,
+что у запроса с байтами.
+
+Ссылки принимаются только от клиентов на Unix socket (context.peer()
+'unix:...'), на TCP порту запрос отклоняется с PERMISSION_DENIED.
+Доступ разрешен только к файлам внутри LOCAL_AUDIO_ALLOWED_DIRS
+(символические ссылки и '..' разрешаются до проверки). Существование
+файла проверяется только после allowlist: по ответу нельзя узнать,
+есть ли файл вне разрешенных директорий. Для shared memory в список
+нужно добавить /dev/shm.
+"""
+
+import mmap
+import os
+from pathlib import Path
+
+
+AUDIO_PATH_METADATA_KEY = 'audio-path'
+SHM_NAME_METADATA_KEY = 'shm-name'
+LOCAL_REFERENCE_KEYS = (AUDIO_PATH_METADATA_KEY, SHM_NAME_METADATA_KEY)
+
+# POSIX shared memory в Linux - файлы в /dev/shm
+SHM_DIR = Path('/dev/shm')
+
+
+def parse_allowed_dirs(spec: str):
+    """'/data/audio,/dev/shm' -> список разрешенных директорий (абсолютные пути)"""
+    return [Path(item.strip()).resolve() for item in spec.split(',') if item.strip()]
+
+
+def get_local_reference(metadata):
+    """
+    Ссылка на локальное аудио из gRPC metadata.
+
+    Returns:
+        Path или None, если ссылки нет
+
+    Raises:
+        ValueError: Некорректное имя shared memory сегмента
+    """
+    for key, value in metadata or ():
+        if key == AUDIO_PATH_METADATA_KEY:
+            return Path(value)
+        if key == SHM_NAME_METADATA_KEY:
+            name = value.lstrip('/')
+            if not name or '/' in name or name in ('.', '..'):
+                raise ValueError(f"Некорректное имя shared memory: {value!r}")
+            return SHM_DIR / name
+    return None
+
+
+def check_local_peer(peer: str):
+    """
+    Ссылки на локальные файлы принимаются только от клиентов на Unix socket.
+
+    Raises:
+        PermissionError: Клиент подключен не через Unix socket (context.peer())
+    """
+    if not peer.startswith('unix:'):
+        raise PermissionError("Ссылки на локальное аудио принимаются только через Unix socket")
+
+
+def resolve_local_audio(path: Path, allowed_dirs):
+    """
+    Проверяет, что путь находится в разрешенной директории и указывает на файл.
+
+    Returns:
+        Разрешенный (resolved) путь
+
+    Raises:
+        PermissionError: Локальные ссылки отключены или путь вне allowlist
+        FileNotFoundError: Файл не существует
+        ValueError: Относительный путь или не обычный файл
+    """
+    if not allowed_dirs:
+        raise PermissionError("Локальные ссылки на аудио отключены (LOCAL_AUDIO_ALLOWED_DIRS пуст)")
+
+    if not path.is_absolute():
+        raise ValueError(f"Путь должен быть абсолютным: {path}")
+
+    # Без strict: для путей вне allowlist ответ не должен зависеть от существования файла
+    resolved = path.resolve()
+    if not any(resolved.is_relative_to(directory) for directory in allowed_dirs):
+        raise PermissionError(f"Путь вне разрешенных директорий: {path}")
+
+    if not resolved.exists():
+        raise FileNotFoundError(f"Файл не найден: {path}")
+    if not resolved.is_file():
+        raise ValueError(f"Не является файлом: {path}")
+
+    return resolved
+
+
+def map_file(path: Path):
+    """
+    Отображает файл в память только для чтения (пустой файл - b'').
+
+    mmap остается открытым, пока на него ссылается waveform
+    (np.frombuffer в raw_audio.decode_raw_pcm держит ссылку на буфер).
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,50 @@
+"""
+Простые in-process метрики сервиса транскрипции.
+
+Потокобезопасные счетчики и gauge значения без внешних зависимостей.
+Снимок метрик (snapshot) можно логировать или отдавать через API.
+
+Использование:
+    from services.transcription.metrics import metrics
+
+    metrics.inc('oom_events_total')
+    metrics.set_gauge('effective_batch_size:default', 16)
+    metrics.snapshot()  # {'counters': {...}, 'gauges': {...}}
+"""
+
+import threading
+
+
+class MetricsRegistry:
+    """Реестр счетчиков и gauge значений"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+
+    def inc(self, name: str, value=1):
+        """Увеличивает счетчик"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value):
+        """Устанавливает текущее значение gauge"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str, default=None):
+        """Возвращает значение счетчика или gauge"""
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name]
+            return self._gauges.get(name, default)
+
+    def snapshot(self) -> dict:
+        """Копия всех метрик"""
+        with self._lock:
+            return {'counters': dict(self._counters), 'gauges': dict(self._gauges)}
+
+
+# Глобальный реестр метрик процесса
+metrics = MetricsRegistry()
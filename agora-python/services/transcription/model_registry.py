@@ -0,0 +1,197 @@
+"""
+Реестр моделей: несколько именованных моделей в одном процессе.
+
+Каждая модель загружается при первом запросе, запросы выбирают модель
+по имени. Если суммарная память загруженных моделей превышает бюджет,
+вытесняются давно не использованные (LRU) и не занятые запросами модели.
+События загрузки и вытеснения публикуются как метрики.
+
+Размер модели - service.memory_footprint(): веса и запас под KV кэш и
+активации полного батча. Место под модель, которая еще не загружалась,
+освобождается до загрузки по оценке: estimated_footprint_bytes или
+размер самой большой из загружавшихся моделей.
+
+Формат MODELS (config):
+    имя=реализация[:модель],...
+
+    MODELS=borealis=borealis,borealis-ft=borealis:/models/borealis-ft
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from services.transcription.metrics import metrics
+
+
+def parse_models_spec(spec: str):
+    """
+    Разбирает MODELS.
+
+    Returns:
+        OrderedDict {имя: (реализация, модель или None)}
+    """
+    models = OrderedDict()
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, target = item.partition('=')
+        implementation, _, model_name = (target or name).partition(':')
+        models[name.strip()] = (implementation.strip(), model_name.strip() or None)
+    return models
+
+
+class _Entry:
+    """Загруженная модель реестра"""
+
+    def __init__(self, service, footprint):
+        self.service = service
+        self.footprint = footprint
+        self.in_use = 0
+
+
+class ModelRegistry:
+    """
+    Потокобезопасный реестр с ленивой загрузкой и LRU вытеснением.
+
+    Args:
+        factories: {имя: callable без аргументов -> экземпляр сервиса}
+        default_name: Модель для запросов без явного имени
+        memory_budget_bytes: Бюджет памяти на все модели, 0 - без ограничения
+        estimated_footprint_bytes: Оценка размера еще не загружавшейся модели,
+                                   0 - по самой большой из загружавшихся
+    """
+
+    def __init__(self, factories, default_name, memory_budget_bytes=0, estimated_footprint_bytes=0):
+        if default_name not in factories:
+            raise ValueError(f"Модель по умолчанию '{default_name}' не зарегистрирована")
+
+        self.factories = dict(factories)
+        self.default_name = default_name
+        self.memory_budget_bytes = memory_budget_bytes
+        self.estimated_footprint_bytes = estimated_footprint_bytes
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Condition()
+        self._loaded = OrderedDict()           # имя -> _Entry, порядок LRU (последний - свежий)
+        self._loading = set()
+        self._known_footprints = {}            # размер моделей, загружавшихся ранее
+
+    @property
+    def names(self):
+        return list(self.factories)
+
+    def _expected_footprint(self, name):
+        """Ожидаемый размер модели до загрузки (под self._lock)"""
+        if name in self._known_footprints:
+            return self._known_footprints[name]
+        return self.estimated_footprint_bytes or max(self._known_footprints.values(), default=0)
+
+    def _total_memory(self):
+        return sum(entry.footprint for entry in self._loaded.values())
+
+    def _evict_for(self, required_bytes, keep=None):
+        """Вытесняет свободные модели в порядке LRU, пока не освободится required_bytes (под self._lock)"""
+        if not self.memory_budget_bytes:
+            return
+
+        for name in list(self._loaded):
+            if self._total_memory() + required_bytes <= self.memory_budget_bytes:
+                return
+
+            entry = self._loaded[name]
+            if name == keep or entry.in_use:
+                continue
+
+            del self._loaded[name]
+            self.logger.info(f"⏏️  Вытеснение модели '{name}' ({entry.footprint / 1e9:.2f}GB)")
+            unload = getattr(entry.service, 'unload', None)
+            if unload is not None:
+                unload()
+
+            metrics.inc('model_evictions_total')
+            metrics.inc(f'model_evictions_total:{name}')
+            self._update_gauges()
+
+        if self._total_memory() + required_bytes > self.memory_budget_bytes:
+            self.logger.warning(f"⚠️  Бюджет памяти моделей превышен: все остальные модели заняты запросами")
+
+    def _update_gauges(self):
+        metrics.set_gauge('models_loaded', len(self._loaded))
+        metrics.set_gauge('models_memory_bytes', self._total_memory())
+
+    def _load(self, name):
+        """Загружает модель вне блокировки реестра"""
+        self.logger.info(f"📥 Загрузка модели '{name}'...")
+        service = self.factories[name]()
+        footprint_fn = getattr(service, 'memory_footprint', None)
+        footprint = footprint_fn() if footprint_fn is not None else 0
+        self.logger.info(f"✓ Модель '{name}' загружена ({footprint / 1e9:.2f}GB)")
+        return service, footprint
+
+    @contextmanager
+    def acquire(self, name=None):
+        """
+        Контекст использования модели: загружает при необходимости и
+        защищает от вытеснения на время запроса.
+
+        Raises:
+            KeyError: Неизвестное имя модели
+        """
+        name = name or self.default_name
+        if name not in self.factories:
+            raise KeyError(name)
+
+        with self._lock:
+            while name in self._loading:
+                self._lock.wait()
+
+            entry = self._loaded.get(name)
+            if entry is not None:
+                entry.in_use += 1
+                self._loaded.move_to_end(name)
+            else:
+                self._loading.add(name)
+                # Освобождаем место до загрузки: иначе загрузка рядом с другими моделями может упасть по OOM
+                self._evict_for(self._expected_footprint(name))
+
+        if entry is None:
+            try:
+                service, footprint = self._load(name)
+            except Exception:
+                with self._lock:
+                    self._loading.discard(name)
+                    self._lock.notify_all()
+                raise
+
+            with self._lock:
+                entry = _Entry(service, footprint)
+                entry.in_use = 1
+                self._loaded[name] = entry
+                self._known_footprints[name] = footprint
+                self._loading.discard(name)
+                self._evict_for(0, keep=name)
+                self._update_gauges()
+                self._lock.notify_all()
+
+            metrics.inc('model_loads_total')
+            metrics.inc(f'model_loads_total:{name}')
+
+        try:
+            yield entry.service
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+
+    def preload(self, names):
+        """Загружает модели заранее (например, модель по умолчанию при старте)"""
+        for name in names:
+            with self.acquire(name):
+                pass
+
+    def loaded(self):
+        """Снимок загруженных моделей: {имя: {'memory_bytes', 'in_use'}}"""
+        with self._lock:
+            return {name: {'memory_bytes': e.footprint, 'in_use': e.in_use} for name, e in self._loaded.items()}
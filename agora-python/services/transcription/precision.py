@@ -0,0 +1,111 @@
+"""
+Режимы пониженной точности инференса (bf16/fp16).
+
+Веса модели загружаются в выбранном dtype, mel признаки готовятся
+сразу в половинной точности (вдвое меньше трафика host→device и
+pinned памяти), model.generate выполняется под autocast.
+
+Защита качества: эталонный набор - директория с аудио файлами и
+транскрипциями fp32 рядом (<имя>.txt). При старте транскрипции в
+пониженной точности сравниваются с эталоном по WER. И эталон, и проверка
+декодируются greedy (service._transcribe_reference), чтобы WER не
+включал расхождения от сэмплирования.
+
+Использование:
+    python start.py --build-precision-reference reference/   # с MODEL_PRECISION=fp32
+"""
+
+import logging
+from pathlib import Path
+
+import torch
+
+
+PRECISION_DTYPES = {
+    'fp32': torch.float32,
+    'bf16': torch.bfloat16,
+    'fp16': torch.float16,
+}
+
+REFERENCE_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.flac', '.ogg', '.aac')
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_dtype(precision: str, device: str):
+    """
+    Возвращает torch dtype для режима точности на устройстве.
+
+    fp16 на CPU не поддерживается autocast, вместо него используется bf16.
+    """
+    precision = (precision or 'fp32').lower()
+    if precision not in PRECISION_DTYPES:
+        raise ValueError(f"Неизвестный режим точности: {precision} (доступно: {', '.join(PRECISION_DTYPES)})")
+
+    dtype = PRECISION_DTYPES[precision]
+    if dtype == torch.float16 and not device.startswith('cuda'):
+        logger.warning("⚠️  fp16 не поддерживается на CPU, используется bf16")
+        dtype = torch.bfloat16
+
+    if dtype == torch.bfloat16 and device.startswith('cuda') and not torch.cuda.is_bf16_supported():
+        logger.warning("⚠️  GPU не поддерживает bf16, используется fp16")
+        dtype = torch.float16
+
+    return dtype
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER: расстояние Левенштейна по словам, нормированное на длину эталона"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    prev = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ref_word != hyp_word))
+        prev = cur
+
+    return prev[-1] / len(ref)
+
+
+def _reference_files(reference_dir):
+    return sorted(
+        p for p in Path(reference_dir).iterdir()
+        if p.is_file() and p.suffix.lower() in REFERENCE_EXTENSIONS
+    )
+
+
+def write_reference_transcripts(service, reference_dir):
+    """Записывает эталонные транскрипции (<имя>.txt) для всех аудио в reference_dir"""
+    for audio_path in _reference_files(reference_dir):
+        transcript = service._transcribe_reference(str(audio_path))
+        audio_path.with_suffix('.txt').write_text(transcript, encoding='utf-8')
+        logger.info(f"✓ Эталон записан: {audio_path.with_suffix('.txt').name}")
+
+
+def check_reference_set(service, reference_dir, max_wer):
+    """
+    Сравнивает транскрипции сервиса с эталонами fp32.
+
+    Returns:
+        Кортеж (passed, mean_wer, per_file), per_file - {имя файла: WER}
+    """
+    per_file = {}
+    for audio_path in _reference_files(reference_dir):
+        reference_path = audio_path.with_suffix('.txt')
+        if not reference_path.exists():
+            continue
+
+        transcript = service._transcribe_reference(str(audio_path))
+        per_file[audio_path.name] = word_error_rate(reference_path.read_text(encoding='utf-8'), transcript)
+
+    if not per_file:
+        logger.warning(f"⚠️  В {reference_dir} нет эталонных транскрипций, проверка точности пропущена")
+        return True, 0.0, per_file
+
+    mean_wer = sum(per_file.values()) / len(per_file)
+    return mean_wer <= max_wer, mean_wer, per_file
@@ -0,0 +1,116 @@
+"""
+Быстрый путь для сырого PCM аудио.
+
+Записывающие устройства уже отдают 16 кHz mono PCM, поэтому такие данные
+не нужно сохранять во временный файл и декодировать через librosa.
+Байты интерпретируются как NumPy массив без копирования (np.frombuffer),
+ресемплинг выполняется только если частота отличается от 16 кHz.
+
+Поддерживаемые форматы (поле format запроса):
+    - pcm_s16le / s16le / pcm16: знаковый 16-бит little-endian
+    - pcm_f32le / f32le / float32: 32-бит float little-endian
+"""
+
+import librosa
+import numpy as np
+
+
+# Частота дискретизации, которую ожидает модель
+TARGET_SAMPLE_RATE = 16_000
+
+# Формат запроса -> dtype сэмплов
+RAW_PCM_FORMATS = {
+    'pcm_s16le': np.dtype('<i2'),
+    's16le': np.dtype('<i2'),
+    'pcm16': np.dtype('<i2'),
+    'pcm_f32le': np.dtype('<f4'),
+    'f32le': np.dtype('<f4'),
+    'float32': np.dtype('<f4'),
+}
+
+
+def is_raw_pcm_format(format_type: str) -> bool:
+    """Проверяет, является ли формат запроса сырым PCM"""
+    return (format_type or '').lower().lstrip('.') in RAW_PCM_FORMATS
+
+
+def sample_rate_from_metadata(metadata, sample_rate=0) -> int:
+    """
+    Частота дискретизации для сырого PCM.
+
+    Стриминговый AudioChunk передает sample_rate в первом чанке,
+    для унарного запроса используется gRPC metadata 'sample-rate'.
+    По умолчанию 16 кHz.
+    """
+    if sample_rate:
+        return sample_rate
+
+    for key, value in metadata or ():
+        if key == 'sample-rate':
+            try:
+                return int(value)
+            except ValueError:
+                break
+
+    return TARGET_SAMPLE_RATE
+
+
+def validate_raw_pcm(audio_data, format_type: str, sample_rate: int) -> tuple:
+    """
+    Валидирует сырые PCM данные.
+
+    Returns:
+        Кортеж (is_valid, error_message)
+    """
+    dtype = RAW_PCM_FORMATS.get((format_type or '').lower().lstrip('.'))
+    if dtype is None:
+        return False, f"Неподдерживаемый PCM формат: {format_type}"
+
+    if not audio_data:
+        return False, "Аудио данные пусты"
+
+    if len(audio_data) % dtype.itemsize != 0:
+        return False, (f"Размер PCM данных ({len(audio_data)} байт) не кратен "
+                       f"размеру сэмпла ({dtype.itemsize} байт)")
+
+    if sample_rate <= 0:
+        return False, f"Некорректная частота дискретизации: {sample_rate}"
+
+    return True, ""
+
+
+def decode_raw_pcm(audio_data, format_type: str, sample_rate: int = TARGET_SAMPLE_RATE):
+    """
+    Преобразует сырые PCM байты в float32 waveform с частотой 16 кHz.
+
+    float32 данные отображаются на исходный буфер без копирования,
+    PCM16 требует одного преобразования в float32. Ресемплинг
+    пропускается, если sample_rate уже равен 16 кHz.
+
+    Args:
+        audio_data: Байты PCM (bytes, bytearray или memoryview)
+        format_type: Формат из RAW_PCM_FORMATS
+        sample_rate: Частота дискретизации входных данных
+
+    Returns:
+        Одномерный np.ndarray float32 с частотой TARGET_SAMPLE_RATE
+    """
+    is_valid, error_msg = validate_raw_pcm(audio_data, format_type, sample_rate)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    dtype = RAW_PCM_FORMATS[format_type.lower().lstrip('.')]
+
+    # Представление буфера без копирования
+    samples = np.frombuffer(audio_data, dtype=dtype)
+
+    if dtype.kind == 'i':
+        waveform = samples.astype(np.float32)
+        waveform *= 1.0 / 32768.0
+    else:
+        waveform = samples if samples.dtype == np.float32 else samples.astype(np.float32)
+
+    if sample_rate != TARGET_SAMPLE_RATE:
+        waveform = librosa.resample(waveform, orig_sr=sample_rate, target_sr=TARGET_SAMPLE_RATE)
+
+    return waveform
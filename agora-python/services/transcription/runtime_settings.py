@@ -0,0 +1,104 @@
+"""
+Настройки производительности, изменяемые во время работы (admin API).
+
+Значения применяются как переопределения конфигурации
+(resources.config.set_overrides) поверх окружения. Каждый запрос берет
+снимок настроек в начале обработки:
+    - TARGET_CHUNK_DURATION - при сегментации
+    - BATCH_SIZE, PREFETCH_BATCHES, DECODING_PROFILE, MAX_NEW_TOKENS -
+      в начале _process_chunks_v4
+поэтому запросы, уже начавшие обработку, дорабатывают со старыми значениями.
+
+SERVER_MAX_WORKERS (пул потоков gRPC) во время работы не меняется, очередь
+ограничивается MAX_CONCURRENT_REQUESTS. При STATIC_SHAPES не меняется и
+MAX_NEW_TOKENS: от него зависит длина статического KV кэша, прогретого
+при старте, и каждое новое значение вызывало бы перекомпиляцию.
+"""
+
+from resources.config import config, get_overrides, set_overrides
+
+
+# Профили декодирования: поверх базовых параметров generate сервиса
+DECODING_PROFILES = {
+    'sampling': {"do_sample": True, "top_p": 0.9, "top_k": 50, "temperature": 0.2},
+    'greedy': {"do_sample": False},
+}
+
+# Имя настройки (атрибут config) -> (ключ окружения, тип, минимальное значение)
+RUNTIME_SETTINGS = {
+    'BATCH_SIZE': ('MODEL_BATCH_SIZE', int, 1),
+    'TARGET_CHUNK_DURATION': ('MODEL_CHUNK_DURATION', int, 1),
+    'PREFETCH_BATCHES': ('MODEL_PREFETCH_BATCHES', int, 1),
+    'MAX_CONCURRENT_REQUESTS': ('SERVER_MAX_CONCURRENT_REQUESTS', int, 0),
+    'DECODING_PROFILE': ('DECODING_PROFILE', str, None),
+    'MAX_NEW_TOKENS': ('MAX_NEW_TOKENS', int, 1),
+}
+
+
+def current_settings() -> dict:
+    """Текущие значения изменяемых настроек {имя: значение}"""
+    return {name: getattr(config, name) for name in RUNTIME_SETTINGS}
+
+
+def current_overrides() -> dict:
+    """Переопределенные во время работы настройки {имя: значение}"""
+    overrides = get_overrides()
+    return {name: getattr(config, name) for name, (env_key, _, _) in RUNTIME_SETTINGS.items()
+            if env_key in overrides}
+
+
+def validate_updates(updates: dict) -> dict:
+    """
+    Проверяет изменения {имя: значение}, None - вернуть значение из окружения.
+
+    Returns:
+        Переопределения {ключ окружения: значение} для set_overrides
+
+    Raises:
+        ValueError: Неизвестная настройка или недопустимое значение
+    """
+    validated = {}
+    for name, value in updates.items():
+        if name not in RUNTIME_SETTINGS:
+            raise ValueError(f"Настройка {name} не изменяется во время работы "
+                             f"(доступно: {', '.join(RUNTIME_SETTINGS)})")
+
+        env_key, cast_type, minimum = RUNTIME_SETTINGS[name]
+        if name == 'MAX_NEW_TOKENS' and value is not None and config.STATIC_SHAPES:
+            raise ValueError(f"{name} не изменяется при STATIC_SHAPES: длина статического KV кэша "
+                             f"задается при прогреве")
+
+        if value is None:
+            validated[env_key] = None
+            continue
+
+        if cast_type is int:
+            if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).lstrip('-').isdigit():
+                raise ValueError(f"{name}: ожидается целое число, получено {value!r}")
+            value = int(value)
+            if value < minimum:
+                raise ValueError(f"{name}: значение {value} меньше {minimum}")
+        else:
+            value = str(value).lower()
+            if name == 'DECODING_PROFILE' and value not in DECODING_PROFILES:
+                raise ValueError(f"{name}: неизвестный профиль {value} (доступно: {', '.join(DECODING_PROFILES)})")
+
+        validated[env_key] = value
+
+    return validated
+
+
+def apply_updates(updates: dict):
+    """
+    Атомарно применяет изменения: либо все, либо ни одного.
+
+    Returns:
+        Кортеж (настройки до, настройки после)
+
+    Raises:
+        ValueError: См. validate_updates
+    """
+    validated = validate_updates(updates)
+    before = current_settings()
+    set_overrides(validated)
+    return before, current_settings()
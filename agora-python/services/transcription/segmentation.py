@@ -0,0 +1,260 @@
+"""
+Сегментация аудио: тихие границы, привязанные к содержимому, и упаковка
+речи в полные окна модели.
+
+Режим 'fixed': граница - кадр, самый тихий в своей окрестности
+±target/2. Решение зависит только от аудио вокруг границы, а не от ее
+смещения от начала файла, поэтому после обрезки или добавления секунд в
+начале остальные границы (и чанки) не меняются - на этом держится кэш
+транскрипций чанков. Граница уточняется до сэмпла по скользящей энергии.
+
+Режим 'packed': по всему файлу ищутся тихие границы (локальные минимумы
+энергии), затем динамическое программирование выбирает из них
+минимальное количество чанков, каждый из которых не длиннее окна
+модели (480 000 сэмплов = 30 s). Среди разбиений с одинаковым числом
+чанков выбирается то, где границы тише.
+
+Меньше чанков - меньше вызовов generate на файл, а ограничение длины
+гарантирует, что feature extractor не обрежет аудио.
+"""
+
+import librosa
+import numpy as np
+from scipy.ndimage import minimum_filter1d
+
+
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+
+def frame_energy(waveform, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """Нормированная в [0, 1] энергия STFT кадров"""
+    S = librosa.stft(waveform, n_fft=frame_length, hop_length=hop_length)
+    energy = np.sum(np.abs(S) ** 2, axis=0)
+    return (energy - np.min(energy)) / (np.max(energy) - np.min(energy) + 1e-10)
+
+
+def find_candidate_boundaries(energy, min_gap_frames, quantile=0.3, smooth_frames=3):
+    """
+    Тихие кадры-кандидаты для разрезания.
+
+    Локальные минимумы сглаженной энергии ниже quantile, прореженные так,
+    чтобы между кандидатами было не меньше min_gap_frames (оставляются более тихие).
+
+    Returns:
+        Отсортированный массив индексов кадров
+    """
+    if len(energy) < 3:
+        return np.array([], dtype=int)
+
+    if smooth_frames > 1:
+        kernel = np.ones(smooth_frames) / smooth_frames
+        energy = np.convolve(energy, kernel, mode='same')
+
+    is_min = (energy[1:-1] <= energy[:-2]) & (energy[1:-1] <= energy[2:])
+    minima = np.nonzero(is_min)[0] + 1
+    minima = minima[energy[minima] <= np.quantile(energy, quantile)]
+
+    # Non-maximum suppression: сначала самые тихие
+    taken = np.zeros(len(energy), dtype=bool)
+    selected = []
+    for idx in minima[np.argsort(energy[minima], kind='stable')]:
+        lo, hi = max(0, idx - min_gap_frames + 1), idx + min_gap_frames
+        if not taken[lo:hi].any():
+            taken[idx] = True
+            selected.append(idx)
+
+    return np.sort(np.array(selected, dtype=int))
+
+
+def _ensure_feasible(positions, energy, max_frames, min_gap_frames):
+    """Добавляет принудительные границы в самом тихом месте там, где речь длиннее окна"""
+    result = [positions[0]]
+    for nxt in positions[1:]:
+        while nxt - result[-1] > max_frames:
+            lo = result[-1] + min(min_gap_frames, max_frames // 2)
+            hi = result[-1] + max_frames
+            result.append(lo + int(np.argmin(energy[lo:hi + 1])))
+        result.append(nxt)
+    return result
+
+
+def pack_segments(energy, max_frames, min_gap_frames):
+    """
+    Разбиение на минимальное количество сегментов не длиннее max_frames.
+
+    Динамическое программирование по кандидатам-границам:
+    dp[j] = лучшее (количество сегментов, суммарная энергия границ)
+    для префикса, заканчивающегося на кандидате j.
+
+    Args:
+        energy: Нормированная энергия кадров
+        max_frames: Максимальная длина сегмента в кадрах
+        min_gap_frames: Минимальное расстояние между кандидатами
+
+    Returns:
+        Список кадров разрезания (без начала и конца файла)
+    """
+    n_frames = len(energy)
+    if n_frames <= max_frames:
+        return []
+
+    candidates = find_candidate_boundaries(energy, min_gap_frames)
+    positions = [0] + [int(c) for c in candidates if 0 < c < n_frames] + [n_frames]
+    positions = _ensure_feasible(positions, energy, max_frames, min_gap_frames)
+    costs = [0.0] + [float(energy[p]) for p in positions[1:-1]] + [0.0]
+
+    k = len(positions)
+    best = [(0, 0.0)] + [(np.inf, np.inf)] * (k - 1)
+    prev = [-1] * k
+
+    lo = 0
+    for j in range(1, k):
+        while positions[j] - positions[lo] > max_frames:
+            lo += 1
+        for i in range(lo, j):
+            count, cost = best[i]
+            candidate = (count + 1, cost + costs[j])
+            if candidate < best[j]:
+                best[j] = candidate
+                prev[j] = i
+
+    cuts = []
+    j = prev[k - 1]
+    while j > 0:
+        cuts.append(positions[j])
+        j = prev[j]
+
+    return cuts[::-1]
+
+
+def _moving_energy(waveform, start, end, window):
+    """Средняя энергия в окне window сэмплов с центром в каждом сэмпле [start, end)"""
+    half = window // 2
+    lo, hi = max(0, start - half), min(len(waveform), end + half)
+    squared = np.square(waveform[lo:hi], dtype=np.float64)
+    cumsum = np.concatenate(([0.0], np.cumsum(squared)))
+
+    centers = np.arange(start, end)
+    left = np.clip(centers - half, lo, hi) - lo
+    right = np.clip(centers + half, lo, hi) - lo
+    return (cumsum[right] - cumsum[left]) / window
+
+
+def _quietest_sample(waveform, start, end, window):
+    """Самый тихий сэмпл в [start, end); среди равных - середина первой серии"""
+    moving = _moving_energy(waveform, start, end, window)
+    is_min = moving <= moving.min()
+    first = int(np.argmax(is_min))
+    run = int(np.argmin(is_min[first:])) or len(is_min) - first
+    return start + first + run // 2
+
+
+def _refine_cut(waveform, center, radius, window, max_steps=16):
+    """
+    Сэмпл, самый тихий в своей окрестности ±radius (спуск от кадра center).
+
+    Такой сэмпл в окрестности один, поэтому он определяется аудио вокруг
+    паузы, а не сеткой кадров. None - окрестность выходит за край файла.
+    """
+    for _ in range(max_steps):
+        if center - radius < 0 or center + radius >= len(waveform):
+            return None
+        cut = _quietest_sample(waveform, center - radius, center + radius + 1, window)
+        if cut == center:
+            break
+        center = cut
+    return center
+
+
+def _flat_run_middle(waveform, cut, window, block):
+    """
+    Середина плоской серии сэмплов вокруг cut, где скользящая энергия
+    равна энергии в cut (цифровая тишина): граница не зависит от сетки кадров.
+    Серия, упирающаяся в край файла, границу не сдвигает.
+    """
+    level = _moving_energy(waveform, cut, cut + 1, window)[0]
+
+    lo = cut
+    while lo > 0:
+        start = max(0, lo - block)
+        uneven = np.nonzero(_moving_energy(waveform, start, lo, window) != level)[0]
+        if len(uneven):
+            lo = start + int(uneven[-1]) + 1
+            break
+        lo = start
+
+    hi = cut + 1
+    while hi < len(waveform):
+        end = min(len(waveform), hi + block)
+        uneven = np.nonzero(_moving_energy(waveform, hi, end, window) != level)[0]
+        if len(uneven):
+            hi = hi + int(uneven[0])
+            break
+        hi = end
+
+    if lo == 0 or hi == len(waveform):
+        return cut
+    return (lo + hi) // 2
+
+
+def _run_middles(frames):
+    """Середины серий подряд идущих кадров: плоская пауза (цифровая тишина) дает один кандидат"""
+    if len(frames) == 0:
+        return frames
+    breaks = np.nonzero(np.diff(frames) > 1)[0] + 1
+    return np.array([run[len(run) // 2] for run in np.split(frames, breaks)], dtype=int)
+
+
+def find_anchored_cut_points(waveform, sr, target_duration, max_duration,
+                             smooth_duration=0.25, hop_length=HOP_LENGTH):
+    """
+    Границы, привязанные к содержимому (режим 'fixed').
+
+    Граница - сэмпл, в котором скользящая энергия (окно smooth_duration)
+    минимальна на окрестности ±target_duration/2 целиком внутри файла.
+    Кандидаты ищутся по кадрам, затем уточняются до сэмпла. Если между
+    соседними границами больше max_duration, добавляется принудительная
+    граница в самом тихом месте второй половины допустимого отрезка,
+    отсчитанного от предыдущей границы.
+
+    В плоской паузе минимум не единственный: серия равных кадров сводится
+    к своей середине, граница ставится в середину плоской серии сэмплов,
+    а границы ближе target_duration/2 друг к другу (равные минимумы)
+    сводятся к первой.
+
+    Returns:
+        Отсортированный список сэмплов разрезания (без начала и конца файла)
+    """
+    n_samples = len(waveform)
+    max_samples = int(max_duration * sr)
+    if n_samples <= max_samples:
+        return []
+
+    smooth_samples = max(1, int(smooth_duration * sr))
+    radius_samples = max(1, int(target_duration * sr) // 2)
+
+    energy = frame_energy(waveform, hop_length=hop_length)
+    smooth_frames = max(1, smooth_samples // hop_length)
+    energy = np.convolve(energy, np.ones(smooth_frames) / smooth_frames, mode='same')
+
+    # Окрестность, выходящая за край файла, границу не дает: край сдвигается при обрезке
+    radius = max(1, radius_samples // hop_length)
+    local_min = minimum_filter1d(energy, size=2 * radius + 1, mode='constant', cval=-np.inf)
+    anchor_frames = _run_middles(np.nonzero(energy <= local_min)[0])
+
+    refined = {_refine_cut(waveform, int(frame) * hop_length, radius_samples, smooth_samples) for frame in anchor_frames}
+    refined = {_flat_run_middle(waveform, cut, smooth_samples, radius_samples) for cut in refined if cut is not None}
+    cuts = []
+    for cut in sorted(refined):
+        if not cuts or cut - cuts[-1] >= radius_samples:
+            cuts.append(cut)
+
+    positions = [0]
+    for nxt in cuts + [n_samples]:
+        while nxt - positions[-1] > max_samples:
+            start = positions[-1] + max_samples // 2
+            positions.append(_quietest_sample(waveform, start, positions[-1] + max_samples + 1, smooth_samples))
+        positions.append(nxt)
+
+    return positions[1:-1]
@@ -0,0 +1,97 @@
+"""
+Статические формы для генерации под torch.compile.
+
+Переменный размер батча (хвост каждого файла) и переменные длины KV кэша
+вызывают перекомпиляцию и повторный захват CUDA graph в
+mode="reduce-overhead" - это случайные многосекундные задержки.
+
+В статическом режиме:
+    - батч дополняется до ближайшего размера из фиксированного набора (buckets)
+    - KV кэш выделяется заранее (cache_implementation="static")
+    - все buckets прогреваются при старте
+    - количество перекомпиляций после прогрева публикуется как метрика
+"""
+
+import logging
+
+import torch
+
+from services.transcription.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_buckets(spec: str, max_batch_size: int):
+    """
+    Разбирает набор размеров батча.
+
+    Args:
+        spec: Размеры через запятую ("1,2,4,8,16,32") или пустая строка -
+              степени двойки до max_batch_size
+        max_batch_size: Максимальный размер батча, всегда входит в набор
+
+    Returns:
+        Отсортированный список размеров
+    """
+    if spec:
+        buckets = {int(size) for size in spec.split(',') if size.strip()}
+    else:
+        buckets = set()
+        size = 1
+        while size < max_batch_size:
+            buckets.add(size)
+            size *= 2
+
+    buckets = {size for size in buckets if 0 < size <= max_batch_size}
+    buckets.add(max_batch_size)
+    return sorted(buckets)
+
+
+def bucket_for(batch_len: int, buckets):
+    """Наименьший bucket, вмещающий batch_len (или batch_len, если он больше всех)"""
+    for size in buckets:
+        if size >= batch_len:
+            return size
+    return batch_len
+
+
+def pad_batch(tensor, size: int):
+    """Дополняет батч до size повтором последнего элемента (без нулевых масок внимания)"""
+    missing = size - tensor.shape[0]
+    if missing <= 0:
+        return tensor
+    return torch.cat([tensor, tensor[-1:].expand(missing, *tensor.shape[1:])], dim=0)
+
+
+class RecompileCounter:
+    """
+    Счетчик перекомпиляций torch.compile после прогрева.
+
+    Читает счетчик графов TorchDynamo; значение после mark_warm()
+    публикуется как метрика torch_recompiles_total.
+    """
+
+    def __init__(self):
+        self._baseline = self._graphs()
+
+    def _graphs(self):
+        try:
+            from torch._dynamo.utils import counters
+            return counters['stats']['unique_graphs']
+        except Exception:
+            return 0
+
+    def mark_warm(self):
+        """Фиксирует количество графов после прогрева"""
+        self._baseline = self._graphs()
+        metrics.set_gauge('torch_recompiles_total', 0)
+
+    def update(self):
+        """Обновляет метрику, возвращает количество перекомпиляций после прогрева"""
+        recompiles = max(0, self._graphs() - self._baseline)
+        previous = metrics.get('torch_recompiles_total', 0)
+        if recompiles > previous:
+            logger.warning(f"⚠️  torch.compile перекомпиляция после прогрева (всего: {recompiles})")
+        metrics.set_gauge('torch_recompiles_total', recompiles)
+        return recompiles
@@ -0,0 +1,106 @@
+"""
+Ранняя остановка генерации на зацикленных последовательностях.
+
+На шумных и тихих чанках декодер часто зацикливается ("да да да да ...")
+до max_new_tokens, а весь батч ждет самую длинную последовательность.
+RepetitionStoppingCriteria завершает такие последовательности по отдельности:
+
+    - повтор n-граммы: последние n * min_repeats токенов - одна n-грамма,
+      повторенная min_repeats раз (n = 2..max_ngram)
+    - вырожденная серия: последние max_token_run токенов одинаковы
+
+Проверка векторизована на устройстве и не синхронизирует GPU на каждом шаге.
+is_repetition_loop - те же правила для одной последовательности в виде
+списка токенов (пошаговый декодер continuous_batching).
+"""
+
+import torch
+from transformers import StoppingCriteria
+
+
+class RepetitionStoppingCriteria(StoppingCriteria):
+    """
+    Per-sequence критерий остановки для model.generate.
+
+    Создается на один вызов generate. Длину промпта в input_ids передает
+    вызывающий: при первом вызове критерия input_ids уже содержит первый
+    сгенерированный токен, поэтому определить ее здесь нельзя.
+
+    Args:
+        prompt_length: Количество токенов промпта в начале input_ids
+                       (0 - generate по inputs_embeds, в input_ids только новые токены)
+        max_ngram: Максимальная длина повторяющейся n-граммы
+        min_repeats: Сколько раз n-грамма должна повториться подряд
+        max_token_run: Длина серии одинаковых токенов
+        ignore_token_ids: Токены (eos/pad), которыми дополняются уже завершенные
+                          последовательности - такие строки не считаются остановками
+        counted_rows: Сколько первых строк батча учитывать в early_stops
+                      (остальные - дополнение батча до статического размера)
+    """
+
+    def __init__(self, prompt_length=0, max_ngram=10, min_repeats=4, max_token_run=12, ignore_token_ids=(),
+                 counted_rows=None):
+        self.prompt_length = prompt_length
+        self.max_ngram = max_ngram
+        self.min_repeats = max(2, min_repeats)
+        self.max_token_run = max(2, max_token_run)
+        self.ignore_token_ids = [t for t in ignore_token_ids if t is not None]
+        self.counted_rows = counted_rows
+
+        # Количество вызовов: 0 после generate - модель не передала stopping_criteria
+        self.calls = 0
+        self._stopped = None
+
+    def _is_repeating(self, tokens, size, repeats):
+        """Последние size * repeats токенов - одна и та же группа из size токенов"""
+        tail = tokens[:, -size * repeats:].reshape(tokens.shape[0], repeats, size)
+        return (tail == tail[:, :1, :]).all(dim=2).all(dim=1)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self._stopped is None:
+            self._stopped = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        self.calls += 1
+
+        generated = input_ids[:, self.prompt_length:]
+        gen_len = generated.shape[1]
+        is_done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+        if gen_len >= self.max_token_run:
+            is_done |= self._is_repeating(generated, 1, self.max_token_run)
+
+        for size in range(2, self.max_ngram + 1):
+            if size * self.min_repeats > gen_len:
+                break
+            is_done |= self._is_repeating(generated, size, self.min_repeats)
+
+        if self.ignore_token_ids and gen_len > 0:
+            ignore = torch.tensor(self.ignore_token_ids, device=input_ids.device)
+            is_done &= ~torch.isin(generated[:, -1], ignore)
+
+        self._stopped |= is_done
+        return is_done
+
+    @property
+    def early_stops(self) -> int:
+        """Количество последовательностей, остановленных этим критерием"""
+        if self._stopped is None:
+            return 0
+        return int(self._stopped[:self.counted_rows].sum().item())
+
+
+
+def is_repetition_loop(tokens, max_ngram=10, min_repeats=4, max_token_run=12):
+    """Зациклена ли последовательность tokens (список id) по правилам RepetitionStoppingCriteria"""
+    min_repeats = max(2, min_repeats)
+    max_token_run = max(2, max_token_run)
+
+    if len(tokens) >= max_token_run and len(set(tokens[-max_token_run:])) == 1:
+        return True
+
+    for size in range(2, max_ngram + 1):
+        if size * min_repeats > len(tokens):
+            break
+        tail = tokens[-size * min_repeats:]
+        if all(tail[i] == tail[i % size] for i in range(size, len(tail))):
+            return True
+    return False
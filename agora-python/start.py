@@ -6,6 +6,8 @@
     python start.py --port 50052                       # Кастомный порт
     python start.py --implementation borealis          # Выбор реализации
     python start.py --port 50052 --implementation borealis
+    python start.py --batch archive/ --output results.jsonl   # Пакетная офлайн транскрипция
+    python start.py --build-precision-reference reference/     # Эталон fp32 для проверки bf16/fp16
 """
 
 import sys
@@ -18,6 +20,42 @@ sys.path.insert(0, str(Path(__file__).parent))
 from api.grpc.transcription_server import serve, AVAILABLE_IMPLEMENTATIONS
 
 
+def run_batch(args):
+    """Пакетная офлайн транскрипция без gRPC"""
+    import json
+    import logging
+    from resources.config import config
+    from services.transcription.bulk_transcriber import BulkTranscriber
+
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL),
+        format=config.LOG_FORMAT
+    )
+
+    service = AVAILABLE_IMPLEMENTATIONS[args.implementation]()
+    stats = BulkTranscriber(service, workers=args.workers).run(args.batch, args.output)
+
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+def build_precision_reference(args):
+    """Эталонные транскрипции для проверки пониженной точности"""
+    import logging
+    from resources.config import config
+    from services.transcription.precision import write_reference_transcripts
+
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL),
+        format=config.LOG_FORMAT
+    )
+
+    if config.MODEL_PRECISION != 'fp32':
+        logging.getLogger(__name__).warning(f"⚠️  Эталон строится в {config.MODEL_PRECISION}, ожидается fp32")
+
+    service = AVAILABLE_IMPLEMENTATIONS[args.implementation]()
+    write_reference_transcripts(service, args.build_precision_reference)
+
+
 def main():
     """Главная функция запуска сервера"""
     parser = argparse.ArgumentParser(
@@ -29,6 +67,8 @@ def main():
   python start.py --port 50052
   python start.py --implementation borealis
   python start.py --port 50052 --implementation borealis
+  python start.py --batch archive/ --output results.jsonl
+  python start.py --batch manifest.txt --output results.jsonl --workers 8
 
 Доступные реализации: {}
         """.format(', '.join(AVAILABLE_IMPLEMENTATIONS.keys()))
@@ -49,8 +89,48 @@ def main():
         help='Реализация сервиса (по умолчанию: borealis)'
     )
 
+    parser.add_argument(
+        '--batch',
+        type=str,
+        default=None,
+        metavar='PATH',
+        help='Пакетный режим: директория с аудио или manifest файл (вместо запуска сервера)'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='transcripts.jsonl',
+        help='Пакетный режим: JSONL файл результатов, повторный запуск продолжает с места остановки '
+             '(по умолчанию: transcripts.jsonl)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Пакетный режим: количество потоков декодирования (по умолчанию: SERVER_MAX_WORKERS)'
+    )
+
+    parser.add_argument(
+        '--build-precision-reference',
+        type=str,
+        default=None,
+        metavar='DIR',
+        help='Записать эталонные транскрипции (<имя>.txt, greedy декодирование) для аудио в DIR и выйти. '
+             'Запускать с MODEL_PRECISION=fp32'
+    )
+
     args = parser.parse_args()
 
+    if args.build_precision_reference:
+        build_precision_reference(args)
+        return
+
+    if args.batch:
+        run_batch(args)
+        return
+
     # Запуск сервера
     serve(port=args.port, implementation=args.implementation)
 
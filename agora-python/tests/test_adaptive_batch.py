@@ -0,0 +1,116 @@
+import os
+
+from services.transcription.adaptive_batch import AdaptiveBatchSizer, cpu_memory_probe
+from services.transcription.metrics import metrics
+
+
+MB = 1024 * 1024
+
+
+def _probe(free_bytes, total_bytes=None):
+    return lambda: (free_bytes, total_bytes or free_bytes)
+
+
+def test_initial_size_fits_free_memory():
+    # 80% от 1000 MB по 100 MB на элемент
+    sizer = AdaptiveBatchSizer(32, item_memory_bytes=100 * MB, memory_probe=_probe(1000 * MB))
+    assert sizer.current == 8
+    assert metrics.get('effective_batch_size:default') == 8
+
+
+def test_initial_size_is_clamped():
+    assert AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB)).current == 32
+    assert AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(10 * MB), min_batch_size=2).current == 2
+
+
+def test_probe_failure_falls_back_to_max():
+    def failing_probe():
+        raise RuntimeError("нет устройства")
+
+    assert AdaptiveBatchSizer(16, 100 * MB, memory_probe=failing_probe).current == 16
+
+
+def test_oom_halves_batch_size():
+    sizer = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB))
+    oom_before = metrics.get('oom_events_total', 0)
+
+    assert sizer.on_oom(32) == 16
+    assert sizer.on_oom(16) == 8
+    assert sizer.current == 8
+    assert metrics.get('effective_batch_size:default') == 8
+    assert metrics.get('oom_events_total') == oom_before + 2
+
+
+def test_oom_on_split_batch_uses_batch_len():
+    sizer = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB))
+    assert sizer.on_oom(10) == 5
+
+
+def test_oom_never_goes_below_min():
+    sizer = AdaptiveBatchSizer(4, 100 * MB, memory_probe=_probe(100_000 * MB), min_batch_size=2)
+    sizer.on_oom(4)
+    assert sizer.on_oom(2) == 2
+
+
+def test_grows_after_successes():
+    sizer = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB), grow_after=3)
+    sizer.on_oom(32)
+    sizer.on_oom(16)
+    assert sizer.current == 8
+
+    sizer.on_success(8)
+    sizer.on_success(8)
+    assert sizer.current == 8
+
+    sizer.on_success(8)
+    assert sizer.current == 10
+    assert metrics.get('effective_batch_size:default') == 10
+
+
+def test_partial_batches_do_not_grow():
+    sizer = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB), grow_after=1)
+    sizer.on_oom(32)
+    sizer.on_success(5)
+    assert sizer.current == 16
+
+
+def test_growth_stops_at_max():
+    sizer = AdaptiveBatchSizer(10, 100 * MB, memory_probe=_probe(100_000 * MB), grow_after=1)
+    sizer.on_oom(10)
+    for _ in range(10):
+        sizer.on_success(sizer.current)
+    assert sizer.current == 10
+
+
+def test_oom_resets_success_streak():
+    sizer = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB), grow_after=2)
+    sizer.on_oom(32)
+    sizer.on_success(16)
+    sizer.on_oom(16)
+    sizer.on_success(8)
+    assert sizer.current == 8
+
+
+def test_cpu_probe_counts_reclaimable_page_cache(tmp_path):
+    meminfo = tmp_path / 'meminfo'
+    meminfo.write_text("MemTotal:       16000000 kB\nMemFree:          500000 kB\nMemAvailable:   12000000 kB\n")
+    available, _ = cpu_memory_probe(str(meminfo))
+    assert available == 12_000_000 * 1024
+
+
+def test_cpu_probe_falls_back_to_sysconf_without_mem_available(tmp_path, monkeypatch):
+    pages = {'SC_PAGE_SIZE': 4096, 'SC_AVPHYS_PAGES': 1000, 'SC_PHYS_PAGES': 4000}
+    monkeypatch.setattr(os, 'sysconf', pages.__getitem__)
+    meminfo = tmp_path / 'meminfo'
+    meminfo.write_text("MemTotal:       16000 kB\nMemFree:          4000 kB\n")
+
+    assert cpu_memory_probe(str(meminfo)) == (1000 * 4096, 4000 * 4096)
+    assert cpu_memory_probe(str(tmp_path / 'missing')) == (1000 * 4096, 4000 * 4096)
+
+
+def test_gauge_is_per_model():
+    small = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(1000 * MB), name='small')
+    large = AdaptiveBatchSizer(32, 100 * MB, memory_probe=_probe(100_000 * MB), name='large')
+    small.on_oom(8)
+    assert metrics.get('effective_batch_size:small') == 4
+    assert metrics.get('effective_batch_size:large') == large.current == 32
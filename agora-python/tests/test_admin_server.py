@@ -0,0 +1,53 @@
+import json
+from concurrent import futures
+
+import grpc
+import pytest
+
+from api.grpc.admin_server import ADMIN_SERVICE_NAME, add_admin_service_to_server
+from resources.config import config, set_overrides
+
+
+@pytest.fixture
+def update_settings():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    add_admin_service_to_server(server, metrics_window=3600)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    channel = grpc.insecure_channel(f'127.0.0.1:{port}')
+    # Сырые байты запроса: клиентский сериализатор не должен исправлять некорректный JSON
+    call = channel.unary_unary(f'/{ADMIN_SERVICE_NAME}/UpdateSettings', response_deserializer=json.loads)
+    try:
+        yield call
+    finally:
+        channel.close()
+        server.stop(None)
+        set_overrides({'MAX_NEW_TOKENS': None, 'STATIC_SHAPES': None, 'MODEL_BATCH_SIZE': None})
+
+
+@pytest.mark.parametrize("body", [b'{"settings": ', b'\xff\xfe', b'[1, 2]', b'"settings"', b'{"settings": []}'],
+                         ids=["truncated", "not-utf8", "list", "string", "settings-list"])
+def test_malformed_body_is_invalid_argument(update_settings, body):
+    with pytest.raises(grpc.RpcError) as error:
+        update_settings(body, timeout=10)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_update_applies_settings(update_settings):
+    response = update_settings(json.dumps({'settings': {'BATCH_SIZE': 7}}).encode(), timeout=10)
+    assert response['after']['BATCH_SIZE'] == 7
+    assert config.BATCH_SIZE == 7
+
+
+def test_max_new_tokens_is_fixed_with_static_shapes(update_settings):
+    set_overrides({'STATIC_SHAPES': 'true'})
+    before = config.MAX_NEW_TOKENS
+
+    with pytest.raises(grpc.RpcError) as error:
+        update_settings(json.dumps({'settings': {'MAX_NEW_TOKENS': before + 100}}).encode(), timeout=10)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert config.MAX_NEW_TOKENS == before
+
+    set_overrides({'STATIC_SHAPES': None})
+    response = update_settings(json.dumps({'settings': {'MAX_NEW_TOKENS': before + 100}}).encode(), timeout=10)
+    assert response['after']['MAX_NEW_TOKENS'] == before + 100
@@ -0,0 +1,88 @@
+import numpy as np
+
+from services.transcription.chunk_cache import ChunkTranscriptCache, chunk_fingerprint
+from services.transcription.metrics import metrics
+from services.transcription.segmentation import find_anchored_cut_points
+
+
+SR = 16000
+
+
+def _speech_like(seconds, seed=0):
+    """Шумовые "фразы" 0.5-4 s, разделенные тихими паузами 0.1-1 s"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    while sum(len(p) for p in parts) < seconds * SR:
+        parts.append(rng.normal(0, 0.3, int(rng.uniform(0.5, 4) * SR)))
+        parts.append(rng.normal(0, rng.uniform(0.002, 0.02), int(rng.uniform(0.1, 1.0) * SR)))
+    return np.concatenate(parts).astype(np.float32)
+
+
+def _chunks(waveform):
+    return np.split(waveform, find_anchored_cut_points(waveform, SR, target_duration=30, max_duration=30))
+
+
+def test_fingerprint_matches_pcm16_and_float32():
+    pcm16 = np.array([0, 1000, -32768, 32767], dtype=np.int16)
+    assert chunk_fingerprint(pcm16.astype(np.float32) / 32768.0) == chunk_fingerprint(pcm16 / 32768.0)
+
+
+def test_chunks_are_capped_by_max_duration():
+    chunks = _chunks(_speech_like(600))
+    assert max(len(chunk) for chunk in chunks) <= 30 * SR
+
+
+def test_unchanged_chunks_hit_after_head_trim():
+    waveform = _speech_like(600)
+    cache = ChunkTranscriptCache(max_entries=1000)
+    for idx, chunk in enumerate(_chunks(waveform)):
+        cache.put(chunk_fingerprint(chunk), f"chunk {idx}")
+
+    for trim in (17, 3 * SR + 1234, 45 * SR + 1):
+        trimmed = _chunks(waveform[trim:])
+        hits = [cache.get(chunk_fingerprint(chunk)) is not None for chunk in trimmed]
+
+        # Меняются только чанки в начале: граница в пределах target/2 от нового края пропадает
+        first_hit = hits.index(True)
+        assert all(hits[first_hit:])
+        assert sum(len(chunk) for chunk in trimmed[:first_hit]) <= (30 + 15) * SR
+
+
+def test_digital_silence_gives_one_cut_per_pause():
+    speech = _speech_like(80)
+    waveform = np.concatenate([speech[:40 * SR], np.zeros(60 * SR, dtype=np.float32), speech[40 * SR:80 * SR]])
+    cuts = find_anchored_cut_points(waveform, SR, target_duration=30, max_duration=30)
+
+    # Граница в середине тишины (40 + 30 s), не в каждом кадре тишины
+    assert 70 * SR in cuts
+    assert len(cuts) <= len(waveform) // (15 * SR)
+    assert min(np.diff([0] + cuts + [len(waveform)])) >= 15 * SR
+
+    # Середина плоской тишины не зависит от сетки кадров
+    trim = 3 * SR + 17
+    assert 70 * SR - trim in find_anchored_cut_points(waveform[trim:], SR, target_duration=30, max_duration=30)
+
+
+def test_lru_eviction():
+    cache = ChunkTranscriptCache(max_entries=2)
+    cache.put(b'a', 'A')
+    cache.put(b'b', 'B')
+    cache.get(b'a')
+    cache.put(b'c', 'C')
+
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == 'A'
+    assert len(cache) == 2
+
+
+def test_metrics_are_per_model():
+    first, second = ChunkTranscriptCache(10, name='first'), ChunkTranscriptCache(10, name='second')
+    hits = metrics.get('chunk_cache_hits_total:first', 0)
+    first.put(b'a', 'A')
+    first.put(b'b', 'B')
+    second.put(b'a', 'A')
+    first.get(b'a')
+
+    assert metrics.get('chunk_cache_entries:first') == 2
+    assert metrics.get('chunk_cache_entries:second') == 1
+    assert metrics.get('chunk_cache_hits_total:first') == hits + 1
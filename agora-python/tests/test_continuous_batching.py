@@ -0,0 +1,217 @@
+import pytest
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from services.transcription.adaptive_batch import AdaptiveBatchSizer
+from services.transcription.continuous_batching import ContinuousBatchingEngine, DecoderAdapter, last_real_positions
+
+
+EOS = 5
+PAD = -1
+
+
+@pytest.fixture(scope='module')
+def lm():
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=512)
+    return LlamaForCausalLM(config).eval()
+
+
+class TokenAdapter:
+    """"mel" - id токенов промпта, дополненные справа PAD; энкодер - эмбеддинги языковой модели"""
+
+    def __init__(self, lm, fail_on=None, oom_times=0):
+        self.language_model = lm
+        self.fail_on = fail_on
+        self.oom_times = oom_times
+        self.prefill_sizes = []
+
+    def encode(self, mel, att_mask):
+        self.prefill_sizes.append(mel.shape[0])
+        if self.oom_times and mel.shape[0] > 1:
+            self.oom_times -= 1
+            raise RuntimeError("CUDA out of memory")
+        if self.fail_on is not None and (mel == self.fail_on).any():
+            raise ValueError("битый чанк")
+        mask = (mel != PAD).long()
+        return self.language_model.get_input_embeddings()(mel.clamp(min=0)), mask
+
+
+def _prompts(lengths, seed=1):
+    generator = torch.Generator().manual_seed(seed)
+    return [torch.randint(6, 64, (n,), generator=generator) for n in lengths]
+
+
+def _padded(prompt, width=16):
+    """("mel", att_mask) одного чанка"""
+    mel = torch.cat([prompt, torch.full((width - len(prompt),), PAD)])[None]
+    return mel, (mel != PAD).long()
+
+
+def _reference(lm, prompt, max_new_tokens):
+    tokens = lm.generate(inputs_embeds=lm.get_input_embeddings()(prompt[None]),
+                         attention_mask=torch.ones(1, len(prompt), dtype=torch.long),
+                         max_new_tokens=max_new_tokens, do_sample=False, eos_token_id=EOS, pad_token_id=0)[0].tolist()
+    return tokens[:-1] if tokens and tokens[-1] == EOS else tokens
+
+
+def _engine(adapter, **kwargs):
+    return ContinuousBatchingEngine(adapter, decode=list, eos_token_id=EOS, context=torch.inference_mode, **kwargs)
+
+
+def test_last_real_positions_left_and_right_padding():
+    mask = torch.tensor([[1, 1, 1, 0], [0, 1, 1, 1], [1, 0, 0, 0]])
+    assert last_real_positions(mask).tolist() == [2, 3, 0]
+
+
+def test_greedy_matches_generate_while_slots_are_refilled(lm):
+    prompts = _prompts((3, 9, 5, 12, 4, 7, 6, 16))
+    limits = (20, 40, 7, 33, 50, 25, 60, 10)
+    engine = _engine(TokenAdapter(lm), max_slots=3)
+    try:
+        futures = [engine.submit(*_padded(p), {'max_new_tokens': m, 'do_sample': False})
+                   for p, m in zip(prompts, limits)]
+        results = [future.result(timeout=60) for future in futures]
+
+        # Первая пачка выделяет 2 * (16 + 40) = 112 колонок: последующие чанки требуют сдвига занятой части
+        with torch.inference_mode():
+            for prompt, limit, (tokens, early_stopped) in zip(prompts, limits, results):
+                assert tokens == _reference(lm, prompt, limit)
+                assert len(tokens) <= limit
+                assert not early_stopped
+    finally:
+        engine.stop()
+
+
+def test_eos_and_max_new_tokens_finish_sequences(lm):
+    prompt = _prompts((6,))[0]
+    with torch.inference_mode():
+        full = _reference(lm, prompt, 30)
+    engine = _engine(TokenAdapter(lm), max_slots=2)
+    engine.eos_token_id = full[3]
+    try:
+        stopped_at_eos, _ = engine.submit(*_padded(prompt), {'max_new_tokens': 30, 'do_sample': False}).result(60)
+        engine.eos_token_id = EOS
+        capped, _ = engine.submit(*_padded(prompt), {'max_new_tokens': 4, 'do_sample': False}).result(60)
+    finally:
+        engine.stop()
+
+    assert stopped_at_eos == full[:full.index(full[3])]
+    assert capped == full[:4]
+    assert engine.active_slots == 0
+
+
+def test_repetition_loop_is_reported_per_sequence(lm):
+    engine = _engine(TokenAdapter(lm), max_slots=2, repetition={'max_ngram': 4, 'min_repeats': 3, 'max_token_run': 3})
+    try:
+        outputs = [engine.submit(*_padded(p), {'max_new_tokens': 200, 'do_sample': False})
+                   for p in _prompts((3, 9, 5, 12))]
+        results = [future.result(timeout=60) for future in outputs]
+    finally:
+        engine.stop()
+
+    assert any(stopped for _, stopped in results)
+    assert all(len(tokens) < 200 for tokens, stopped in results if stopped)
+
+
+def test_sampling_parameters_per_request(lm):
+    engine = _engine(TokenAdapter(lm), max_slots=4)
+    try:
+        sampled = [engine.submit(*_padded(p), {'max_new_tokens': 8, 'do_sample': True, 'temperature': 0.7,
+                                                    'top_k': 10, 'top_p': 0.9}) for p in _prompts((4, 5))]
+        greedy = engine.submit(*_padded(_prompts((7,))[0]), {'max_new_tokens': 8, 'do_sample': False})
+        results = [future.result(timeout=60)[0] for future in sampled + [greedy]]
+    finally:
+        engine.stop()
+
+    assert all(0 <= token < 64 for tokens in results for token in tokens)
+    with torch.inference_mode():
+        assert results[-1] == _reference(lm, _prompts((7,))[0], 8)
+
+
+def test_encoder_error_fails_only_its_chunks(lm):
+    prompts = _prompts((4, 6, 8))
+    prompts[1][0] = 0
+    adapter = TokenAdapter(lm, fail_on=0)
+    engine = _engine(adapter, max_slots=1)
+    try:
+        futures = [engine.submit(*_padded(p), {'max_new_tokens': 5, 'do_sample': False}) for p in prompts]
+        with pytest.raises(ValueError):
+            futures[1].result(timeout=60)
+        assert len(futures[0].result(timeout=60)[0]) <= 5
+        assert len(futures[2].result(timeout=60)[0]) <= 5
+    finally:
+        engine.stop()
+
+
+def test_step_error_fails_active_sequences(lm):
+    class BrokenStep(TokenAdapter):
+        def __init__(self, lm):
+            super().__init__(lm)
+            self.language_model = self._forward
+            self._lm = lm
+
+        def encode(self, mel, att_mask):
+            mask = (mel != PAD).long()
+            return self._lm.get_input_embeddings()(mel.clamp(min=0)), mask
+
+        def _forward(self, **kwargs):
+            if 'input_ids' in kwargs:
+                raise RuntimeError("device-side assert")
+            return self._lm(**kwargs)
+
+    engine = _engine(BrokenStep(lm), max_slots=2)
+    try:
+        future = engine.submit(*_padded(_prompts((5,))[0]), {'max_new_tokens': 10, 'do_sample': False})
+        with pytest.raises(RuntimeError, match="device-side assert"):
+            future.result(timeout=60)
+    finally:
+        engine.stop()
+    assert engine.active_slots == 0
+
+
+def test_prefill_oom_shrinks_batch_and_retries(lm):
+    sizer = AdaptiveBatchSizer(4, item_memory_bytes=0)
+    adapter = TokenAdapter(lm, oom_times=1)
+    engine = _engine(adapter, max_slots=4, batch_sizer=sizer, is_oom=lambda e: 'out of memory' in str(e))
+    try:
+        # Пока поток движка занят, очередь копит все четыре чанка
+        with engine._cond:
+            futures = [engine.submit(*_padded(p), {'max_new_tokens': 3, 'do_sample': False})
+                       for p in _prompts((4, 5, 6, 7))]
+        results = [future.result(timeout=60) for future in futures]
+    finally:
+        engine.stop()
+
+    assert len(results) == 4
+    assert sizer.current < 4
+    assert max(adapter.prefill_sizes[1:]) <= sizer.current
+
+
+def test_stopped_engine_rejects_and_fails_waiting(lm):
+    engine = _engine(TokenAdapter(lm), max_slots=1)
+    engine.stop()
+    with pytest.raises(RuntimeError):
+        engine.submit(*_padded(_prompts((4,))[0]), {'max_new_tokens': 3})
+
+
+def test_adapter_fails_loudly_without_bound_interface(lm):
+    class Model(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.llm = lm
+
+        def embed_audio(self, mel, att_mask):
+            return {'inputs_embeds': mel}
+
+    with pytest.raises(RuntimeError, match="DECODE_ENCODE_METHOD"):
+        DecoderAdapter(Model(), '', 'llm')
+    with pytest.raises(RuntimeError, match="prepare_inputs_embeds"):
+        DecoderAdapter(Model(), 'prepare_inputs_embeds', 'llm')
+    with pytest.raises(RuntimeError, match="language_model"):
+        DecoderAdapter(Model(), 'embed_audio', 'language_model')
+
+    adapter = DecoderAdapter(Model(), 'embed_audio', 'llm')
+    with pytest.raises(TypeError):
+        adapter.encode(torch.zeros(1, 4, 8), torch.ones(1, 4))
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.transcription.job_manager import TranscriptionJobManager
+from services.transcription.job_store import JOB_DONE, JobStore
+
+
+SR = 16000
+
+
+class FakeService:
+    """Сегментация по заданным точкам, текст чанка - его длина и первая точка разрезания"""
+
+    def __init__(self, cut_points):
+        self.cut_points = cut_points
+        self.processed = []
+        self.crash = False
+
+    def _find_cut_points(self, waveform, sr):
+        return list(self.cut_points)
+
+    def _split_audio_by_cut_points(self, waveform, sr, cut_points):
+        return np.split(waveform, [int(round(point * sr)) for point in cut_points])
+
+    def _process_chunks_cached(self, chunks, sr, on_batch=None, stats=None):
+        for idx, chunk in enumerate(chunks):
+            self.processed.append(len(chunk))
+            on_batch([(idx, f"{len(chunk)}/{self.cut_points[0]}")])
+            if self.crash:
+                # Процесс упал после первого батча
+                raise SystemExit
+
+
+class FakeRegistry:
+    names = ['default']
+
+    def __init__(self, service):
+        self.service = service
+
+    @contextmanager
+    def acquire(self, name=None):
+        yield self.service
+
+
+def _crashed_job(tmp_path, service):
+    """Задача, прерванная после первого чанка"""
+    store = JobStore(tmp_path / 'jobs.db', tmp_path / 'audio')
+    manager = TranscriptionJobManager(FakeRegistry(service), store)
+    job_id = manager.submit(np.zeros(3 * SR, dtype=np.int16).tobytes(), 'a.pcm', 'pcm_s16le', SR)
+
+    service.crash = True
+    try:
+        manager._run_job(job_id)
+    except SystemExit:
+        pass
+    service.crash = False
+    service.processed.clear()
+    return store, manager, job_id
+
+
+def test_resume_continues_from_saved_chunks(tmp_path):
+    service = FakeService([1.0, 2.0])
+    store, manager, job_id = _crashed_job(tmp_path, service)
+    assert store.get_job(job_id)['chunks_done'] == 1
+
+    manager._run_job(job_id)
+
+    job = store.get_job(job_id)
+    assert job['status'] == JOB_DONE
+    assert service.processed == [SR, SR]
+    assert job['transcript'] == f"{SR}/1.0 {SR}/1.0 {SR}/1.0"
+
+
+def test_resume_drops_chunks_when_cut_points_change(tmp_path):
+    service = FakeService([1.0, 2.0])
+    store, manager, job_id = _crashed_job(tmp_path, service)
+
+    # То же число чанков, но другие границы: сохраненный текст первого чанка не подходит
+    service.cut_points = [0.5, 2.5]
+    manager._run_job(job_id)
+
+    job = store.get_job(job_id)
+    assert service.processed == [SR // 2, 2 * SR, SR // 2]
+    assert job['transcript'] == f"{SR // 2}/0.5 {2 * SR}/0.5 {SR // 2}/0.5"
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+
+from services.transcription.local_audio import (
+    SHM_DIR, check_local_peer, get_local_reference, parse_allowed_dirs, resolve_local_audio
+)
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    allowed = tmp_path / 'allowed'
+    outside = tmp_path / 'outside'
+    allowed.mkdir()
+    outside.mkdir()
+    (allowed / 'call.pcm').write_bytes(b'\0' * 32)
+    (outside / 'secret.pcm').write_bytes(b'\0' * 32)
+    return allowed, outside
+
+
+def test_file_inside_allowlist_is_resolved(dirs):
+    allowed, _ = dirs
+    assert resolve_local_audio(allowed / 'call.pcm', [allowed.resolve()]) == (allowed / 'call.pcm').resolve()
+
+
+def test_empty_allowlist_disables_references(dirs):
+    allowed, _ = dirs
+    with pytest.raises(PermissionError):
+        resolve_local_audio(allowed / 'call.pcm', [])
+
+
+def test_relative_path_is_rejected(dirs):
+    allowed, _ = dirs
+    with pytest.raises(ValueError):
+        resolve_local_audio(Path('call.pcm'), [allowed.resolve()])
+
+
+def test_outside_path_does_not_reveal_existence(dirs):
+    # Существующий и несуществующий файлы вне allowlist дают одну и ту же ошибку
+    allowed, outside = dirs
+    for path in (outside / 'secret.pcm', outside / 'missing.pcm'):
+        with pytest.raises(PermissionError):
+            resolve_local_audio(path, [allowed.resolve()])
+
+
+def test_missing_file_inside_allowlist(dirs):
+    allowed, _ = dirs
+    with pytest.raises(FileNotFoundError):
+        resolve_local_audio(allowed / 'missing.pcm', [allowed.resolve()])
+
+
+def test_dot_dot_cannot_escape_allowlist(dirs):
+    allowed, _ = dirs
+    with pytest.raises(PermissionError):
+        resolve_local_audio(allowed / '..' / 'outside' / 'secret.pcm', [allowed.resolve()])
+
+
+def test_symlink_is_checked_by_target(dirs):
+    allowed, outside = dirs
+    (allowed / 'escape.pcm').symlink_to(outside / 'secret.pcm')
+    (outside / 'inside.pcm').symlink_to(allowed / 'call.pcm')
+
+    with pytest.raises(PermissionError):
+        resolve_local_audio(allowed / 'escape.pcm', [allowed.resolve()])
+    assert resolve_local_audio(outside / 'inside.pcm', [allowed.resolve()]) == (allowed / 'call.pcm').resolve()
+
+
+def test_directory_is_not_a_file(dirs):
+    allowed, _ = dirs
+    (allowed / 'nested').mkdir()
+    with pytest.raises(ValueError):
+        resolve_local_audio(allowed / 'nested', [allowed.resolve()])
+
+
+def test_parse_allowed_dirs_skips_empty_items(dirs):
+    allowed, outside = dirs
+    assert parse_allowed_dirs(f' {allowed}, ,{outside},') == [allowed.resolve(), outside.resolve()]
+
+
+@pytest.mark.parametrize("peer", ["ipv4:127.0.0.1:50512", "ipv6:[::1]:50512"])
+def test_tcp_peer_is_rejected(peer):
+    with pytest.raises(PermissionError):
+        check_local_peer(peer)
+
+
+def test_unix_peer_is_accepted():
+    check_local_peer("unix:/run/agora/transcription.sock")
+
+
+def test_shm_reference():
+    assert get_local_reference([('shm-name', '/agora-42')]) == SHM_DIR / 'agora-42'
+    for name in ('../etc/passwd', '..', ''):
+        with pytest.raises(ValueError):
+            get_local_reference([('shm-name', name)])
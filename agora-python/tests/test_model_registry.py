@@ -0,0 +1,58 @@
+from services.transcription.model_registry import ModelRegistry
+
+
+GB = 1024 ** 3
+
+
+class FakeService:
+    def __init__(self, name, footprint, events):
+        self.name = name
+        self.footprint = footprint
+        self.events = events
+        events.append(('load', name))
+
+    def memory_footprint(self):
+        return self.footprint
+
+    def unload(self):
+        self.events.append(('unload', self.name))
+
+
+def _registry(footprints, budget, estimated=0):
+    events = []
+    factories = {name: (lambda name=name, size=size: FakeService(name, size, events))
+                 for name, size in footprints.items()}
+    return ModelRegistry(factories, next(iter(footprints)), budget, estimated), events
+
+
+def test_cold_load_evicts_before_loading_by_estimate():
+    registry, events = _registry({'a': 6 * GB, 'b': 6 * GB}, budget=10 * GB, estimated=6 * GB)
+    registry.preload(['a'])
+    registry.preload(['b'])
+
+    # 'a' выгружается до загрузки 'b', а не после
+    assert events == [('load', 'a'), ('unload', 'a'), ('load', 'b')]
+
+
+def test_cold_load_estimate_defaults_to_largest_known_model():
+    registry, events = _registry({'a': 6 * GB, 'b': 6 * GB}, budget=10 * GB)
+    registry.preload(['a'])
+    registry.preload(['b'])
+
+    assert events == [('load', 'a'), ('unload', 'a'), ('load', 'b')]
+
+
+def test_models_in_use_are_not_evicted():
+    registry, events = _registry({'a': 6 * GB, 'b': 6 * GB}, budget=10 * GB)
+    with registry.acquire('a'):
+        with registry.acquire('b'):
+            pass
+
+    assert ('unload', 'a') not in events
+    assert set(registry.loaded()) == {'a', 'b'}
+
+
+def test_default_model_is_used_without_name():
+    registry, _ = _registry({'a': GB, 'b': GB}, budget=0)
+    with registry.acquire() as service:
+        assert service.name == 'a'
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from services.transcription.raw_audio import (
+    TARGET_SAMPLE_RATE, decode_raw_pcm, sample_rate_from_metadata, validate_raw_pcm
+)
+
+
+@pytest.mark.parametrize("metadata, sample_rate, expected", [
+    ([('sample-rate', '8000')], 0, 8000),
+    ([('model', 'default'), ('sample-rate', '44100')], 0, 44100),
+    ([('sample-rate', '8000')], 22050, 22050),
+    ([('sample-rate', 'fast')], 0, TARGET_SAMPLE_RATE),
+    (None, 0, TARGET_SAMPLE_RATE),
+])
+def test_sample_rate_from_metadata(metadata, sample_rate, expected):
+    assert sample_rate_from_metadata(metadata, sample_rate) == expected
+
+
+@pytest.mark.parametrize("data, format_type, sample_rate", [
+    (b'', 'pcm_s16le', 16000),
+    (b'\0' * 3, 'pcm_s16le', 16000),
+    (b'\0' * 4, 'pcm_s16le', 0),
+    (b'\0' * 4, 'pcm_u8', 16000),
+])
+def test_invalid_raw_pcm(data, format_type, sample_rate):
+    is_valid, error_msg = validate_raw_pcm(data, format_type, sample_rate)
+    assert not is_valid and error_msg
+
+
+def test_decode_resamples_to_target_rate():
+    samples = (np.sin(np.arange(8000) / 10) * 1000).astype('<i2')
+    assert validate_raw_pcm(samples.tobytes(), 'pcm_s16le', 8000) == (True, "")
+    assert len(decode_raw_pcm(samples.tobytes(), 'pcm_s16le', 8000)) == TARGET_SAMPLE_RATE
@@ -0,0 +1,78 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.transcription.segmentation import _ensure_feasible, find_candidate_boundaries, pack_segments
+
+
+MAX_FRAMES = 900
+MIN_GAP = 15
+
+
+def _segments(cuts, n_frames):
+    bounds = [0] + list(cuts) + [n_frames]
+    return [end - start for start, end in zip(bounds, bounds[1:])]
+
+
+def _greedy_count(positions, max_frames):
+    """Минимальное число сегментов по тем же позициям: каждый раз самый дальний достижимый кандидат"""
+    count, current = 0, 0
+    while positions[current] != positions[-1]:
+        reachable = [i for i in range(current + 1, len(positions)) if positions[i] - positions[current] <= max_frames]
+        current = reachable[-1]
+        count += 1
+    return count
+
+
+def _random_energy(n_frames, seed):
+    rng = np.random.default_rng(seed)
+    energy = np.abs(rng.normal(0, 1, n_frames)).cumsum()
+    energy = np.abs(np.sin(energy / 50)) * rng.uniform(0.2, 1.0, n_frames)
+    return (energy - energy.min()) / (energy.max() - energy.min())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_segments_never_exceed_max_frames(seed):
+    n_frames = 500 + seed * 700
+    cuts = pack_segments(_random_energy(n_frames, seed), MAX_FRAMES, MIN_GAP)
+    assert cuts == sorted(cuts)
+    assert all(0 < length <= MAX_FRAMES for length in _segments(cuts, n_frames))
+
+
+def test_short_input_is_not_cut():
+    assert pack_segments(_random_energy(MAX_FRAMES, 0), MAX_FRAMES, MIN_GAP) == []
+
+
+@pytest.mark.parametrize("energy", [
+    np.ones(10_000),
+    np.linspace(0.0, 1.0, 10_000),
+    np.linspace(1.0, 0.0, 10_000),
+], ids=["constant", "rising", "falling"])
+def test_input_without_silence_gets_forced_cuts(energy):
+    cuts = pack_segments(energy, MAX_FRAMES, MIN_GAP)
+    assert all(0 < length <= MAX_FRAMES for length in _segments(cuts, len(energy)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunk_count_is_minimal_for_candidates(seed):
+    n_frames = 3000 + seed * 500
+    energy = _random_energy(n_frames, seed)
+
+    positions = [0] + [int(c) for c in find_candidate_boundaries(energy, MIN_GAP) if 0 < c < n_frames] + [n_frames]
+    positions = _ensure_feasible(positions, energy, MAX_FRAMES, MIN_GAP)
+
+    cuts = pack_segments(energy, MAX_FRAMES, MIN_GAP)
+    assert len(cuts) + 1 == _greedy_count(positions, MAX_FRAMES)
+
+
+def test_dense_silences_pack_full_windows():
+    # Пауза (3 кадра, не размывается сглаживанием) каждые MIN_GAP кадров: число чанков упирается в длину окна
+    n_frames = 10_000
+    energy = np.ones(n_frames)
+    for center in range(MIN_GAP, n_frames - 1, MIN_GAP):
+        energy[center - 1:center + 2] = 0.0
+
+    cuts = pack_segments(energy, MAX_FRAMES, MIN_GAP)
+    assert len(cuts) + 1 == math.ceil(n_frames / MAX_FRAMES)
+    assert all(energy[cut] == 0.0 for cut in cuts)
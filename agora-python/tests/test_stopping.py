@@ -0,0 +1,87 @@
+import torch
+
+from services.transcription.stopping import RepetitionStoppingCriteria
+
+
+EOS, PAD = 0, 1
+
+
+def _criteria(**kwargs):
+    params = dict(max_ngram=4, min_repeats=3, max_token_run=5, ignore_token_ids=(EOS, PAD))
+    params.update(kwargs)
+    return RepetitionStoppingCriteria(**params)
+
+
+def _run(criteria, rows):
+    """Вызывает критерий по шагу на каждый токен, как generate. Returns: маска остановки после каждого шага"""
+    input_ids = torch.tensor(rows)
+    return [criteria(input_ids[:, :step], None) for step in range(1, input_ids.shape[1] + 1)]
+
+
+def test_ngram_loop_stops_only_looping_row():
+    criteria = _criteria()
+    steps = _run(criteria, [
+        [5, 6, 7, 8, 9, 10, 11, 12, 13],
+        [5, 6, 7, 6, 7, 6, 7, 8, 9],
+    ])
+
+    assert steps[6].tolist() == [False, True]
+    assert not any(step[0] for step in steps)
+    assert criteria.early_stops == 1
+    assert criteria.calls == 9
+
+
+def test_identical_token_run():
+    steps = _run(_criteria(), [[3, 4, 4, 4, 4, 4]])
+    assert [bool(step[0]) for step in steps] == [False, False, False, False, False, True]
+
+
+def test_first_generated_token_is_counted():
+    # Без промпта серия из max_token_run токенов начинается с первого сгенерированного
+    steps = _run(_criteria(), [[4, 4, 4, 4, 4]])
+    assert bool(steps[-1][0])
+
+
+def test_prompt_tokens_are_not_checked():
+    steps = _run(_criteria(prompt_length=3), [[4, 4, 4, 4, 4, 4, 4, 5]])
+    assert not any(bool(step[0]) for step in steps[:7])
+
+
+def test_pad_and_eos_rows_are_ignored():
+    criteria = _criteria(counted_rows=1)
+    steps = _run(criteria, [
+        [5, 6, EOS, PAD, PAD, PAD, PAD, PAD],
+        [PAD] * 8,
+        [EOS] * 8,
+    ])
+
+    assert not any(step.any() for step in steps)
+    assert criteria.early_stops == 0
+
+
+def test_padding_rows_are_not_counted():
+    criteria = _criteria(counted_rows=1)
+    _run(criteria, [[5, 6, 7, 8, 9, 10], [4, 4, 4, 4, 4, 4]])
+    assert criteria.early_stops == 0
+
+
+def test_generate_with_inputs_embeds_calls_criteria_on_new_tokens():
+    from transformers import GPT2Config, GPT2LMHeadModel, StoppingCriteriaList
+
+    torch.manual_seed(0)
+    model = GPT2LMHeadModel(GPT2Config(vocab_size=16, n_positions=64, n_embd=8, n_layer=1, n_head=2)).eval()
+
+    lengths = []
+
+    class Recording(RepetitionStoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            lengths.append(input_ids.shape[1])
+            return super().__call__(input_ids, scores, **kwargs)
+
+    criteria = Recording(max_token_run=100)
+    model.generate(inputs_embeds=torch.randn(2, 5, 8), attention_mask=torch.ones(2, 5, dtype=torch.long),
+                   max_new_tokens=4, do_sample=False, pad_token_id=PAD,
+                   stopping_criteria=StoppingCriteriaList([criteria]))
+
+    assert criteria.calls > 0
+    assert lengths[0] == 1
@@ -0,0 +1,389 @@
+"""
+Нагрузочный тест gRPC TranscriptionService.
+
+Воспроизводит смесь аудио разной длины с фиксированной конкурентностью
+(закрытая модель) или с заданной интенсивностью поступления (открытая
+модель, пуассоновский поток) и собирает:
+    - задержки p50/p95/p99 (в открытой модели - от запланированного момента
+      поступления, включая ожидание свободного потока: без coordinated omission)
+    - сколько запросов открытой модели ждали свободного потока или были отброшены
+    - пропускную способность в часах аудио за час
+    - real-time factor (время обработки / длительность аудио)
+    - долю ошибок по кодам gRPC
+    - память сервера во времени (RSS)
+
+Результат пишется в JSON для сравнения прогонов.
+
+Все запросы одной длительности отправляют один и тот же файл, поэтому
+кэш транскрипций чанков сервера превратил бы прогон в замер попаданий
+в кэш: stub сервер запускается с MODEL_CHUNK_CACHE_SIZE=0, а для
+существующего сервера попадания в кэш за прогон попадают в отчет
+с предупреждением.
+
+Использование:
+    # Локальный сервер со stub моделью (запускается автоматически)
+    python tools/load_generator.py --spawn-stub --concurrency 16 --duration 120 --output run.json
+
+    # Существующий сервер, 2 запроса/сек, смесь 30s/5min/30min
+    python tools/load_generator.py --server localhost:50051 --rate 2 --mix 30:5,300:3,1800:1 --server-pid 1234
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent import futures
+from pathlib import Path
+
+import grpc
+
+# Добавляем корневую директорию в путь для импортов
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from client.transcription_client import TranscriptionClient
+
+
+SAMPLE_RATE = 16_000
+
+
+def parse_mix(spec):
+    """'30:5,300:3' -> [(30.0, 5.0), (300.0, 3.0)] (длительность в сек : вес)"""
+    mix = []
+    for item in spec.split(','):
+        duration, _, weight = item.partition(':')
+        mix.append((float(duration), float(weight or 1)))
+    return mix
+
+
+def write_test_audio(directory, duration):
+    """Записывает WAV 16 кГц mono с шумом заданной длительности"""
+    path = Path(directory) / f"load_{int(duration)}s.wav"
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        remaining = int(duration * SAMPLE_RATE)
+        while remaining > 0:
+            frames = min(remaining, SAMPLE_RATE * 60)
+            wav.writeframes(os.urandom(frames * 2))
+            remaining -= frames
+    return path
+
+
+def percentile(values, pct):
+    """Percentile по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def read_rss_mb(pid):
+    """RSS процесса в МБ (Linux /proc), None если недоступно"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Периодически снимает RSS процесса сервера"""
+
+    def __init__(self, pid, interval, start_time):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.start_time = start_time
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = read_rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append({'t': round(time.time() - self.start_time, 2), 'rss_mb': round(rss, 1)})
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def spawn_stub_server(port):
+    """Запускает start.py со stub реализацией на CPU и ждет готовности"""
+    env = dict(os.environ, MODEL_DEVICE='cpu', JOBS_ENABLED='false', MODEL_CHUNK_CACHE_SIZE='0')
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent.parent / 'start.py'),
+         '--implementation', 'stub', '--port', str(port)],
+        env=env
+    )
+
+    channel = grpc.insecure_channel(f'localhost:{port}')
+    try:
+        grpc.channel_ready_future(channel).result(timeout=120)
+    except grpc.FutureTimeoutError:
+        process.kill()
+        raise RuntimeError("Stub сервер не запустился за 120s")
+    finally:
+        channel.close()
+
+    return process
+
+
+def read_chunk_cache_counters(target):
+    """Счетчики кэша чанков сервера (TranscriptionMetricsService), None если сервис недоступен"""
+    channel = grpc.insecure_channel(target)
+    try:
+        get_metrics = channel.unary_unary('/agora.v1.TranscriptionMetricsService/GetMetrics',
+                                          request_serializer=lambda obj: json.dumps(obj).encode(),
+                                          response_deserializer=json.loads)
+        counters = get_metrics({}, timeout=10)['counters']
+    except grpc.RpcError:
+        return None
+    finally:
+        channel.close()
+    return {name: counters.get(f'chunk_cache_{name}_total', 0) for name in ('hits', 'misses')}
+
+
+def run_load(client, audio_files, mix, args):
+    """
+    Выполняет нагрузку.
+
+    Returns:
+        Кортеж (результаты запросов, статистика поступления открытой модели или None)
+    """
+    durations = [duration for duration, _ in mix]
+    weights = [weight for _, weight in mix]
+    results = []
+    results_lock = threading.Lock()
+    deadline = time.time() + args.duration
+
+    def one_request(scheduled_at=None):
+        duration = random.choices(durations, weights)[0]
+        method = 'stream' if random.random() < args.stream_fraction else 'unary'
+
+        # Открытая модель: задержка от запланированного поступления, а не от старта потока
+        start = scheduled_at if scheduled_at is not None else time.time()
+        record = {'audio_duration': duration, 'method': method, 'code': 'OK'}
+        if scheduled_at is not None:
+            record['queue_wait'] = time.time() - scheduled_at
+        try:
+            response = client.transcribe(audio_files[duration], method=method)
+            if not response.success:
+                record['code'] = 'APPLICATION_ERROR'
+        except grpc.RpcError as e:
+            record['code'] = e.code().name
+        record['latency'] = time.time() - start
+        record['finished_at'] = time.time()
+
+        with results_lock:
+            results.append(record)
+
+    arrivals = None
+    if args.rate:
+        # Открытая модель: пуассоновский поток запросов. Моменты поступления планируются
+        # заранее и не сдвигаются, даже если все потоки заняты (запрос ждет в очереди)
+        arrivals = {'scheduled': 0, 'queued': 0, 'dropped': 0}
+        in_flight = [0]
+        in_flight_lock = threading.Lock()
+
+        def on_done(_):
+            with in_flight_lock:
+                in_flight[0] -= 1
+
+        next_arrival = time.time()
+        with futures.ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+            while next_arrival < deadline and (not args.requests or arrivals['scheduled'] < args.requests):
+                delay = next_arrival - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                arrivals['scheduled'] += 1
+
+                with in_flight_lock:
+                    waiting = in_flight[0] - args.max_in_flight
+                    if args.max_queue is not None and waiting >= args.max_queue:
+                        arrivals['dropped'] += 1
+                        waiting = None
+                    else:
+                        in_flight[0] += 1
+
+                if waiting is not None:
+                    if waiting >= 0:
+                        arrivals['queued'] += 1
+                    executor.submit(one_request, next_arrival).add_done_callback(on_done)
+
+                next_arrival += random.expovariate(args.rate)
+    else:
+        # Закрытая модель: фиксированная конкурентность
+        counter = iter(range(args.requests)) if args.requests else None
+
+        def worker():
+            while time.time() < deadline:
+                if counter is not None and next(counter, None) is None:
+                    break
+                one_request()
+
+        threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return results, arrivals
+
+
+def summarize(results, wall_seconds, arrivals=None):
+    """Сводная статистика прогона (arrivals - статистика поступления открытой модели)"""
+    ok = [r for r in results if r['code'] == 'OK']
+    latencies = [r['latency'] for r in ok]
+    audio_seconds = sum(r['audio_duration'] for r in ok)
+
+    errors_by_code = {}
+    for r in results:
+        if r['code'] != 'OK':
+            errors_by_code[r['code']] = errors_by_code.get(r['code'], 0) + 1
+
+    per_length = {}
+    for duration in sorted({r['audio_duration'] for r in ok}):
+        lat = [r['latency'] for r in ok if r['audio_duration'] == duration]
+        per_length[str(int(duration))] = {
+            'requests': len(lat),
+            'p50_s': percentile(lat, 50),
+            'p95_s': percentile(lat, 95),
+            'p99_s': percentile(lat, 99),
+        }
+
+    summary = {
+        'requests': len(results),
+        'succeeded': len(ok),
+        'error_rate': (len(results) - len(ok)) / len(results) if results else 0.0,
+        'errors_by_code': errors_by_code,
+        'latency_s': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'max': max(latencies) if latencies else 0.0,
+        },
+        'real_time_factor_mean': (sum(r['latency'] / r['audio_duration'] for r in ok) / len(ok)) if ok else 0.0,
+        'throughput_audio_hours_per_hour': audio_seconds / wall_seconds if wall_seconds > 0 else 0.0,
+        'requests_per_second': len(ok) / wall_seconds if wall_seconds > 0 else 0.0,
+        'wall_seconds': wall_seconds,
+        'per_audio_length': per_length,
+    }
+
+    if arrivals is not None:
+        queue_waits = [r['queue_wait'] for r in results if 'queue_wait' in r]
+        summary['arrivals'] = dict(arrivals, queue_wait_s={
+            'p50': percentile(queue_waits, 50),
+            'p95': percentile(queue_waits, 95),
+            'max': max(queue_waits) if queue_waits else 0.0,
+        })
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест TranscriptionService')
+    parser.add_argument('--server', default='localhost:50051', help='Адрес сервера')
+    parser.add_argument('--spawn-stub', action='store_true', help='Запустить локальный сервер со stub моделью')
+    parser.add_argument('--port', type=int, default=50071, help='Порт для --spawn-stub')
+    parser.add_argument('--server-pid', type=int, default=None, help='PID сервера для замера памяти')
+    parser.add_argument('--mix', default='30:5,300:3,1800:1',
+                        help='Смесь длительностей аудио "секунды:вес,..." (по умолчанию: 30:5,300:3,1800:1)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Одновременных запросов (закрытая модель)')
+    parser.add_argument('--rate', type=float, default=None, help='Запросов в секунду (открытая модель)')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Предел одновременных запросов для --rate')
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help='Для --rate: сколько запросов может ждать свободного потока, остальные '
+                             'отбрасываются и учитываются в arrivals.dropped (по умолчанию без предела)')
+    parser.add_argument('--duration', type=float, default=60, help='Длительность нагрузки (сек)')
+    parser.add_argument('--requests', type=int, default=None, help='Остановиться после N запросов')
+    parser.add_argument('--stream-fraction', type=float, default=0.5, help='Доля запросов через TranscribeAudioStream')
+    parser.add_argument('--memory-interval', type=float, default=1.0, help='Интервал замера памяти сервера (сек)')
+    parser.add_argument('--output', default=None, help='JSON файл результатов')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    server_process = None
+    target = args.server
+    server_pid = args.server_pid
+
+    if args.spawn_stub:
+        server_process = spawn_stub_server(args.port)
+        target = f'localhost:{args.port}'
+        server_pid = server_process.pid
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            audio_files = {duration: write_test_audio(tmp_dir, duration) for duration, _ in mix}
+
+            cache_before = read_chunk_cache_counters(target)
+
+            # Без повторов: иначе задержки и ошибки искажаются
+            concurrency = args.max_in_flight if args.rate else args.concurrency
+            with TranscriptionClient(target, pool_size=min(8, concurrency), max_concurrency=concurrency,
+                                     max_retries=0) as client:
+                start_time = time.time()
+                sampler = MemorySampler(server_pid, args.memory_interval, start_time) if server_pid else None
+                if sampler:
+                    sampler.start()
+
+                results, arrivals = run_load(client, audio_files, mix, args)
+                wall_seconds = time.time() - start_time
+
+                if sampler:
+                    sampler.stop()
+
+            cache_after = read_chunk_cache_counters(target)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait(timeout=30)
+
+    chunk_cache = None
+    if cache_before is not None and cache_after is not None:
+        chunk_cache = {name: cache_after[name] - cache_before[name] for name in cache_before}
+        if chunk_cache['hits']:
+            print(f"⚠️ Сервер отвечал из кэша чанков ({chunk_cache['hits']} попаданий): результаты завышены, "
+                  f"запустите сервер с MODEL_CHUNK_CACHE_SIZE=0", file=sys.stderr)
+
+    report = {
+        'config': {
+            'server': target,
+            'stub': args.spawn_stub,
+            'mix': [{'audio_seconds': d, 'weight': w} for d, w in mix],
+            'concurrency': None if args.rate else args.concurrency,
+            'rate': args.rate,
+            'max_in_flight': args.max_in_flight if args.rate else None,
+            'max_queue': args.max_queue if args.rate else None,
+            'duration': args.duration,
+            'stream_fraction': args.stream_fraction,
+        },
+        'summary': summarize(results, wall_seconds, arrivals),
+        'server_chunk_cache': chunk_cache,
+        'server_memory': {
+            'samples': sampler.samples if sampler else [],
+            'peak_rss_mb': max((s['rss_mb'] for s in sampler.samples), default=None) if sampler else None,
+        },
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()